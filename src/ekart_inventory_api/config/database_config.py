@@ -1,8 +1,8 @@
 from typing import Optional
 
-from sqlalchemy import URL
+from sqlalchemy import URL, make_url
 
-from .settings.config import settings
+from ..settings.config import settings
 
 
 class DatabaseConfig:
@@ -12,6 +12,17 @@ class DatabaseConfig:
     db_host: Optional[str]
     db_port: Optional[str]
     db_name: Optional[str]
+    pool_size: int
+    max_overflow: int
+    pool_timeout: float
+    pool_recycle: int
+    pool_pre_ping: bool
+    statement_cache_size: int
+    pool_warm_connections: int
+    replica_urls: list[str]
+    replica_max_lag_seconds: float
+    replica_sticky_seconds: float
+    replica_lag_check_interval: float
 
     def __init__(self, conf: dict = {}) -> None:
         conf_src = conf or settings
@@ -25,6 +36,34 @@ class DatabaseConfig:
         self.db_port = conf_src.get("DB_PORT", "") or conf_src.get("PGPORT", "5432")
         self.db_name = conf_src.get("DB_NAME", "") or conf_src.get("PGDATABASE", "")
 
+        # Connection pool, per worker process
+        self.pool_size = int(conf_src.get("DB_POOL_SIZE", 10))
+        self.max_overflow = int(conf_src.get("DB_MAX_OVERFLOW", 10))
+        self.pool_timeout = float(conf_src.get("DB_POOL_TIMEOUT", 30))
+        self.pool_recycle = int(conf_src.get("DB_POOL_RECYCLE", 1800))
+        self.pool_pre_ping = bool(conf_src.get("DB_POOL_PRE_PING", True))
+        # asyncpg prepared statements per connection; 0 behind PgBouncer in
+        # transaction mode
+        self.statement_cache_size = int(conf_src.get("DB_STATEMENT_CACHE_SIZE", 100))
+        self.pool_warm_connections = int(conf_src.get("DB_POOL_WARM_CONNECTIONS", 2))
+
+        # Read replicas, as URLs; credentials default to the primary's
+        replica_urls = conf_src.get("DB_REPLICA_URLS", []) or []
+        if isinstance(replica_urls, str):
+            replica_urls = [url for url in replica_urls.split(",") if url.strip()]
+        self.replica_urls = [url.strip() for url in replica_urls]
+        self.replica_max_lag_seconds = float(
+            conf_src.get("DB_REPLICA_MAX_LAG_SECONDS", 10)
+        )
+        # A tenant's reads on the worker that wrote stay on the primary this
+        # long after the write; other workers do not know about it
+        self.replica_sticky_seconds = float(
+            conf_src.get("DB_REPLICA_STICKY_SECONDS", 5)
+        )
+        self.replica_lag_check_interval = float(
+            conf_src.get("DB_REPLICA_LAG_CHECK_INTERVAL", 5)
+        )
+
         if self.db_engine == "postgres":
             # Handle default engine string from SSM
             self.db_engine = "postgresql"
@@ -47,5 +86,33 @@ class DatabaseConfig:
         )
         return url_object
 
+    def build_replica_urls(self, async_driver: bool = False) -> list[URL]:
+        driver = "postgresql+asyncpg" if async_driver else "postgresql+psycopg2"
+        urls = []
+        for replica_url in self.replica_urls:
+            url_object = make_url(replica_url)
+            urls.append(
+                url_object.set(
+                    drivername=driver,
+                    username=url_object.username or self.db_username,
+                    password=url_object.password or self.db_password,
+                    database=url_object.database or self.db_name,
+                )
+            )
+        return urls
+
+    def engine_options(self) -> dict:
+        """
+        Keyword arguments for `create_async_engine`.
+        """
+        return {
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "pool_timeout": self.pool_timeout,
+            "pool_recycle": self.pool_recycle,
+            "pool_pre_ping": self.pool_pre_ping,
+            "connect_args": {"statement_cache_size": self.statement_cache_size},
+        }
+
     def build_url_as_string(self) -> str:
         return self.build_db_url().render_as_string(hide_password=False)
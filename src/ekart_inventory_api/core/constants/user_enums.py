@@ -0,0 +1,10 @@
+from enum import Enum
+
+
+class UserAccess(Enum):
+    """Per agency roles, each one bit of the hex access score on a user."""
+
+    ADMIN = "0x1"
+    MANAGER = "0x2"
+    CLERK = "0x4"
+    VIEWER = "0x8"
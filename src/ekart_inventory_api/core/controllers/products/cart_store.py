@@ -0,0 +1,400 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Annotated, Optional
+
+from cachetools import LRUCache
+from fastapi import Depends, HTTPException
+from sqlalchemy import delete, func, insert, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ....settings.config import settings
+from ....utils.auth.auth_token_decoder import JWTAuthorizationCredentials, auth
+from ....utils.common.logger import logger
+from ....utils.database.connections import get_async_engine
+from ....utils.database.session_context_manager import session_context
+from ...models.products.products import Cart, ProductInventory, User
+from ..dependencies import get_client_header
+
+# Written as `created_by`/`modified_by` by flushes, which run outside requests
+CART_STORE_USER = "cart_store"
+
+
+class InMemoryCartBackend:
+    """
+    Default key-value layer, private to the worker: an LRU of carts, keyed by
+    `(agency, user_id)`, and the changes not written to the `cart` table yet.
+    Anything with the same async methods, e.g. a Redis wrapper, can replace it
+    to share carts and pending changes between workers; with this one,
+    requests of a user must stay on one worker.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.carts = LRUCache(maxsize=maxsize)
+        # agency -> {(user_id, product_id): (quantity, added_at)}, quantity 0
+        # meaning the line was removed. Never evicted: until flushed, this is
+        # the only copy of a change.
+        self.pending: dict[str, dict[tuple[int, int], tuple]] = {}
+
+    async def get(self, key) -> Optional[dict]:
+        return self.carts.get(key)
+
+    async def set(self, key, cart: dict) -> None:
+        self.carts[key] = cart
+
+    async def delete(self, key) -> None:
+        self.carts.pop(key, None)
+
+    async def stage(self, agency: str, user_id: int, product_id: int, line) -> None:
+        self.pending.setdefault(agency, {})[(user_id, product_id)] = line
+
+    async def staged(self, agency: str, user_id: Optional[int] = None) -> dict:
+        """
+        The tenant's pending changes, or only one user's.
+        """
+        return {
+            key: line
+            for key, line in self.pending.get(agency, {}).items()
+            if user_id is None or key[0] == user_id
+        }
+
+    async def unstage(self, agency: str, lines: dict) -> None:
+        """
+        Drops changes once written, except lines changed again since.
+        """
+        pending = self.pending.get(agency, {})
+        for key, line in lines.items():
+            if pending.get(key) == line:
+                del pending[key]
+        if not pending:
+            self.pending.pop(agency, None)
+
+    async def staged_agencies(self) -> list[str]:
+        return list(self.pending)
+
+    async def staged_count(self) -> int:
+        return sum(len(pending) for pending in self.pending.values())
+
+
+class CartStore:
+    """
+    Write-behind store of carts. Reads and changes are served by `backend`;
+    changes are coalesced per `(user_id, product_id)` and written to the
+    `cart` table every `CART_FLUSH_INTERVAL` seconds, on checkout (`flush`
+    for the user) and on shutdown, so a line changed ten times between
+    flushes costs one write.
+
+    A cart is `{product_id: (quantity, added_at)}`. Pending changes are
+    staged in the backend apart from the carts until committed, so a cart
+    evicted or reloaded before its flush still sees them.
+    """
+
+    def __init__(self, backend) -> None:
+        self.backend = backend
+        self.interval = settings.get("CART_FLUSH_INTERVAL", 5)
+        # One flush per tenant at a time in this worker; `write` also takes an
+        # advisory lock for workers sharing a backend. The delete then insert
+        # of two overlapping flushes could otherwise duplicate rows.
+        self.flush_locks: dict[str, asyncio.Lock] = {}
+        self.async_engine: Optional[AsyncEngine] = None
+        self.task: Optional[asyncio.Task] = None
+        self.changes = 0
+        self.rows_written = 0
+        self.rows_rejected = 0
+        self.flushes = 0
+        self.flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    async def get_cart(
+        self, agency: str, user_id: int, async_engine: AsyncEngine
+    ) -> dict:
+        cart = await self.backend.get((agency, user_id))
+        if cart is None:
+            cart = await self.load_cart(agency, user_id, async_engine)
+            await self.backend.set((agency, user_id), cart)
+        return cart
+
+    async def load_cart(
+        self, agency: str, user_id: int, async_engine: AsyncEngine
+    ) -> dict:
+        """
+        The user's `cart` rows with their pending changes applied. The pending
+        changes are read first: a flush that commits in between is then in
+        both reads rather than in neither.
+        """
+        staged = await self.backend.staged(agency, user_id)
+        cart = None
+        async with session_context(async_engine, agency) as session:
+            result = await session.execute(
+                select(Cart.product_id, Cart.quantity, Cart.added_at).where(
+                    Cart.user_id == user_id
+                )
+            )
+            cart = {row.product_id: (row.quantity, row.added_at) for row in result}
+        if cart is None:
+            raise HTTPException(status_code=503, detail="Cart could not be loaded")
+        for (_, product_id), line in staged.items():
+            if line[0]:
+                cart[product_id] = line
+            else:
+                cart.pop(product_id, None)
+        return cart
+
+    async def set_quantity(
+        self,
+        agency: str,
+        user_id: int,
+        product_id: int,
+        quantity: int,
+        async_engine: AsyncEngine,
+    ) -> dict:
+        """
+        Sets a line's quantity, removing the line at 0, and returns the cart.
+        """
+        cart = await self.get_cart(agency, user_id, async_engine)
+        if quantity:
+            line = (quantity, cart.get(product_id, (0, datetime.utcnow()))[1])
+            cart[product_id] = line
+        else:
+            line = (0, None)
+            cart.pop(product_id, None)
+        await self.backend.set((agency, user_id), cart)
+        await self.backend.stage(agency, user_id, product_id, line)
+        self.changes += 1
+        return cart
+
+    async def add(
+        self,
+        agency: str,
+        user_id: int,
+        product_id: int,
+        quantity: int,
+        async_engine: AsyncEngine,
+    ) -> dict:
+        cart = await self.get_cart(agency, user_id, async_engine)
+        current = cart.get(product_id, (0, None))[0]
+        return await self.set_quantity(
+            agency, user_id, product_id, max(current + quantity, 0), async_engine
+        )
+
+    async def flush(self, agency: str, user_id: Optional[int] = None) -> None:
+        """
+        Writes the tenant's pending changes, or only one user's, in one
+        transaction. If a constraint rejects the batch, e.g. for a product
+        deleted since it was added, the lines are written one by one and the
+        rejected ones dropped, so they cannot hold back the tenant's other
+        changes.
+        """
+        lock = self.flush_locks.setdefault(agency, asyncio.Lock())
+        async with lock:
+            batch = await self.backend.staged(agency, user_id)
+            if not batch:
+                return
+
+            started = time.perf_counter()
+            rejected = self.rows_rejected
+            written = await self.write(agency, batch)
+            if written is None:
+                raise HTTPException(status_code=503, detail="Cart flush failed")
+            done = batch if written else await self.write_each(agency, batch)
+            await self.backend.unstage(agency, done)
+            elapsed = time.perf_counter() - started
+            self.rows_written += len(done) - (self.rows_rejected - rejected)
+            self.flushes += 1
+            self.flush_seconds += elapsed
+            self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+            if len(done) < len(batch):
+                raise HTTPException(status_code=503, detail="Cart flush failed")
+
+    async def write(self, agency: str, lines: dict) -> Optional[bool]:
+        """
+        Replaces `lines` in the `cart` table in one transaction: the changed
+        lines are deleted and the ones still in a cart inserted again.
+        Returns True once committed, False if a constraint rejected them and
+        None on any other failure.
+        """
+        rows = [
+            {
+                "user_id": key[0],
+                "product_id": key[1],
+                "quantity": quantity,
+                "added_at": added_at,
+                "created_by": CART_STORE_USER,
+                "modified_by": CART_STORE_USER,
+            }
+            for key, (quantity, added_at) in lines.items()
+            if quantity
+        ]
+        written = None
+        async with session_context(self.async_engine, agency) as session:
+            await session.execute(
+                select(func.pg_advisory_xact_lock(func.hashtext(f"cart:{agency}")))
+            )
+            try:
+                await session.execute(
+                    delete(Cart).where(
+                        tuple_(Cart.user_id, Cart.product_id).in_(list(lines))
+                    )
+                )
+                if rows:
+                    await session.execute(insert(Cart), rows)
+                await session.commit()
+                written = True
+            except IntegrityError as ex:
+                await session.rollback()
+                logger.error(f"Cart changes for {agency} rejected: {ex}")
+                written = False
+        return written
+
+    async def write_each(self, agency: str, batch: dict) -> dict:
+        """
+        Writes lines one transaction each and returns the ones that are done
+        with: written, or rejected and dropped. Lines that failed otherwise
+        stay pending.
+        """
+        done = {}
+        for key, line in batch.items():
+            written = await self.write(agency, {key: line})
+            if written is None:
+                continue
+            if not written:
+                logger.error(f"Dropping cart change {key} {line} for {agency}")
+                self.rows_rejected += 1
+            done[key] = line
+        return done
+
+    async def forget(self, agency: str, user_id: int) -> None:
+        """
+        Drops a user's cart from the backend after the table changed under it,
+        e.g. on checkout; the next read loads it again.
+        """
+        await self.backend.delete((agency, user_id))
+
+    async def flush_all(self) -> None:
+        for agency in await self.backend.staged_agencies():
+            try:
+                await self.flush(agency)
+            except Exception as ex:
+                logger.error(f"Cart flush for {agency} failed: {ex}")
+
+    def start(self, async_engine: AsyncEngine) -> None:
+        self.async_engine = async_engine
+        self.task = asyncio.ensure_future(self.run())
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush_all()
+
+    async def stop(self) -> None:
+        """
+        Stops periodic flushing and writes whatever is still pending, so a
+        graceful shutdown loses no cart changes.
+        """
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        await self.flush_all()
+
+    async def metrics(self) -> dict:
+        return {
+            "changes": self.changes,
+            "rows_written": self.rows_written,
+            "rows_rejected": self.rows_rejected,
+            "write_reduction": (
+                1 - self.rows_written / self.changes if self.changes else 0.0
+            ),
+            "pending": await self.backend.staged_count(),
+            "flushes": self.flushes,
+            "avg_flush_seconds": (
+                self.flush_seconds / self.flushes if self.flushes else 0.0
+            ),
+            "max_flush_seconds": self.max_flush_seconds,
+        }
+
+
+cart_store = CartStore(InMemoryCartBackend(settings.get("CART_STORE_SIZE", 10000)))
+
+# (agency, user name) -> `users.id`
+cart_owner_ids = LRUCache(maxsize=settings.get("CART_STORE_SIZE", 10000))
+
+
+async def lookup_user_id(
+    async_engine: AsyncEngine, agency: str, user_name: str
+) -> Optional[int]:
+    user_id = cart_owner_ids.get((agency, user_name))
+    if user_id is None:
+        async with session_context(async_engine, agency) as session:
+            result = await session.execute(
+                select(User.id).where(User.username == user_name)
+            )
+            user_id = result.scalar_one_or_none()
+        if user_id is not None:
+            cart_owner_ids[(agency, user_name)] = user_id
+    return user_id
+
+
+async def require_cart_owner(
+    user_id: int,
+    async_engine: Annotated[AsyncEngine, Depends(get_async_engine)],
+    credentials: JWTAuthorizationCredentials = Depends(auth),
+    agency: str = Depends(get_client_header),
+) -> None:
+    """
+    Only lets callers reach their own cart: the `user_id` in the path must be
+    the `users` row of the authenticated user. Changes are therefore only
+    accepted for users that exist.
+    """
+    if await lookup_user_id(async_engine, agency, credentials.user_name) != user_id:
+        raise HTTPException(status_code=403, detail="Operation not permitted")
+
+
+class CartController:
+    def __init__(
+        self,
+        async_engine: Annotated[AsyncEngine, Depends(get_async_engine)],
+        agency: str = Depends(get_client_header),
+    ) -> None:
+        self.async_engine = async_engine
+        self.agency = agency
+
+    @staticmethod
+    def to_response(user_id: int, cart: dict) -> dict:
+        return {
+            "user_id": user_id,
+            "items": [
+                {"product_id": product_id, "quantity": quantity, "added_at": added_at}
+                for product_id, (quantity, added_at) in cart.items()
+            ],
+        }
+
+    async def get_cart(self, user_id: int) -> dict:
+        cart = await cart_store.get_cart(self.agency, user_id, self.async_engine)
+        return self.to_response(user_id, cart)
+
+    async def check_product(self, product_id: int) -> None:
+        # A line for an unknown product would be rejected by its flush
+        async with session_context(
+            self.async_engine, self.agency, read_only=True
+        ) as session:
+            result = await session.execute(
+                select(ProductInventory.id).where(ProductInventory.id == product_id)
+            )
+            if result.first() is None:
+                raise HTTPException(status_code=404, detail="Product not found")
+
+    async def add_item(self, user_id: int, product_id: int, quantity: int) -> dict:
+        await self.check_product(product_id)
+        cart = await cart_store.add(
+            self.agency, user_id, product_id, quantity, self.async_engine
+        )
+        return self.to_response(user_id, cart)
+
+    async def set_item(self, user_id: int, product_id: int, quantity: int) -> dict:
+        if quantity:
+            await self.check_product(product_id)
+        cart = await cart_store.set_quantity(
+            self.agency, user_id, product_id, quantity, self.async_engine
+        )
+        return self.to_response(user_id, cart)
@@ -0,0 +1,293 @@
+from typing import Iterable, Optional
+
+from sqlalchemy import String, exists, false, func, or_, select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from ....settings.config import settings
+from ....utils.common.logger import logger
+from ....utils.database.session_context_manager import session_context
+from ...models.agency.agency import (
+    CaseChargeAssociation,
+    CaseRecord,
+    Charge,
+    DefendantDetails,
+)
+from ...models.products.case_search import case_search_documents
+
+
+class SearchBackends:
+    POSTGRES = "postgres"
+    IN_PROCESS = "in_process"
+
+
+def text_columns(model) -> list:
+    return [
+        column for column in model.__table__.columns if isinstance(column.type, String)
+    ]
+
+
+def build_document_query(case_record_ids: Optional[Iterable[int]] = None):
+    """
+    Selects `(case_record_id, document)` for the given cases, or for every case
+    when no ids are passed. The document joins the text columns of the case,
+    its defendant and all of its charges into one lowercased string.
+    """
+    charges_text = func.string_agg(func.concat_ws(" ", *text_columns(Charge)), " ")
+    query = (
+        select(
+            CaseRecord.id.label("case_record_id"),
+            func.lower(
+                func.concat_ws(
+                    " ",
+                    *text_columns(CaseRecord),
+                    *text_columns(DefendantDetails),
+                    charges_text,
+                )
+            ).label("document"),
+        )
+        .select_from(CaseRecord)
+        .join(DefendantDetails)
+        .outerjoin(CaseChargeAssociation)
+        .outerjoin(Charge)
+        .group_by(CaseRecord.id, DefendantDetails.id)
+    )
+    if case_record_ids is not None:
+        query = query.where(CaseRecord.id.in_(list(case_record_ids)))
+    return query
+
+
+def build_referencing_case_ids_query(
+    defendant_ids: Iterable[int] = (), charge_ids: Iterable[int] = ()
+):
+    """
+    Selects the ids of the cases whose document includes one of the given
+    defendants or charges, i.e. the documents to rebuild after editing them.
+    """
+    conditions = []
+    defendant_ids, charge_ids = list(defendant_ids), list(charge_ids)
+    if defendant_ids:
+        conditions.append(CaseRecord.defendant_id.in_(defendant_ids))
+    if charge_ids:
+        conditions.append(
+            CaseRecord.id.in_(
+                select(CaseChargeAssociation.case_record_id).where(
+                    CaseChargeAssociation.charge_id.in_(charge_ids)
+                )
+            )
+        )
+    return select(CaseRecord.id).where(or_(false(), *conditions))
+
+
+def build_document_upsert(
+    case_record_ids: Optional[Iterable[int]] = None, missing_only: bool = False
+):
+    query = build_document_query(case_record_ids)
+    if missing_only:
+        query = query.where(
+            ~exists().where(case_search_documents.c.case_record_id == CaseRecord.id)
+        )
+    statement = insert(case_search_documents).from_select(
+        ["case_record_id", "document"], query
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[case_search_documents.c.case_record_id],
+        set_={"document": statement.excluded.document},
+    )
+
+
+class SearchBackend:
+    """
+    Resolves `search_string` to a filter on `CaseRecord.id`.
+
+    Writers call `index_cases` inside their transaction after changing a case,
+    and `index_related_cases` after changing a defendant or charge, which
+    every case referencing it shares.
+
+    `shared` backends keep their index in the database, where one worker's
+    backfill serves them all; the others keep one per process.
+    """
+
+    shared = True
+
+    def match(self, agency: str, search_string: str):
+        raise NotImplementedError
+
+    async def index_cases(
+        self, session, agency: str, case_record_ids: Iterable[int]
+    ) -> None:
+        raise NotImplementedError
+
+    async def index_related_cases(
+        self,
+        session,
+        agency: str,
+        defendant_ids: Iterable[int] = (),
+        charge_ids: Iterable[int] = (),
+    ) -> None:
+        case_record_ids = await session.scalars(
+            build_referencing_case_ids_query(defendant_ids, charge_ids)
+        )
+        await self.index_cases(session, agency, list(case_record_ids))
+
+    async def backfill(self, session, agency: str) -> None:
+        """
+        Indexes the tenant's cases that have no document yet, e.g. every case
+        after the documents table is first created.
+        """
+        raise NotImplementedError
+
+
+class PostgresTrigramSearchBackend(SearchBackend):
+    """
+    Matches against `case_search_documents`, whose `document` column carries a
+    pg_trgm GIN index, so the substring match is an index scan per tenant
+    schema rather than an `ILIKE` over every column of the case join.
+    """
+
+    def match(self, agency: str, search_string: str):
+        # The tenant schema comes from the session's schema_translate_map
+        return CaseRecord.id.in_(
+            select(case_search_documents.c.case_record_id).where(
+                case_search_documents.c.document.ilike(f"%{search_string}%")
+            )
+        )
+
+    async def index_cases(
+        self, session, agency: str, case_record_ids: Iterable[int]
+    ) -> None:
+        await session.execute(build_document_upsert(case_record_ids))
+
+    async def backfill(self, session, agency: str) -> None:
+        await session.execute(build_document_upsert(missing_only=True))
+
+
+class TrigramIndex:
+    """
+    Trigram inverted index over one tenant's case documents. Mirrors the
+    pg_trgm lookup: candidates share every trigram of the search term and are
+    then confirmed with a substring check.
+    """
+
+    def __init__(self) -> None:
+        self.documents: dict[int, str] = {}
+        self.trigrams: dict[str, set[int]] = {}
+
+    @staticmethod
+    def make_trigrams(text: str) -> set[str]:
+        return {text[i : i + 3] for i in range(len(text) - 2)}
+
+    def add_document(self, case_record_id: int, document: str) -> None:
+        self.remove_document(case_record_id)
+        document = (document or "").lower()
+        self.documents[case_record_id] = document
+        for trigram in self.make_trigrams(document):
+            self.trigrams.setdefault(trigram, set()).add(case_record_id)
+
+    def remove_document(self, case_record_id: int) -> None:
+        document = self.documents.pop(case_record_id, None)
+        if document is None:
+            return
+        for trigram in self.make_trigrams(document):
+            ids = self.trigrams.get(trigram)
+            if ids:
+                ids.discard(case_record_id)
+
+    def search(self, search_string: str) -> set[int]:
+        term = search_string.lower()
+        term_trigrams = self.make_trigrams(term)
+        if term_trigrams:
+            candidates = set.intersection(
+                *(self.trigrams.get(trigram, set()) for trigram in term_trigrams)
+            )
+        else:
+            # Terms shorter than a trigram cannot use the index
+            candidates = set(self.documents)
+        return {
+            case_record_id
+            for case_record_id in candidates
+            if term in self.documents[case_record_id]
+        }
+
+
+class InProcessSearchBackend(SearchBackend):
+    """
+    Keeps a `TrigramIndex` per tenant in memory, for tests and local
+    development.
+    """
+
+    shared = False
+
+    def __init__(self) -> None:
+        self.indexes: dict[str, TrigramIndex] = {}
+
+    def match(self, agency: str, search_string: str):
+        case_record_ids = self.indexes.get(agency, TrigramIndex()).search(search_string)
+        if not case_record_ids:
+            return false()
+        return CaseRecord.id.in_(case_record_ids)
+
+    async def index_cases(
+        self, session, agency: str, case_record_ids: Iterable[int]
+    ) -> None:
+        index = self.indexes.setdefault(agency, TrigramIndex())
+        result = await session.execute(build_document_query(case_record_ids))
+        for row in result:
+            index.add_document(row.case_record_id, row.document)
+
+    async def backfill(self, session, agency: str) -> None:
+        # The index starts empty in every process, so every case is missing
+        index = self.indexes.setdefault(agency, TrigramIndex())
+        result = await session.execute(build_document_query())
+        for row in result:
+            index.add_document(row.case_record_id, row.document)
+
+
+search_backends: dict[str, SearchBackend] = {}
+
+
+def get_search_backend() -> SearchBackend:
+    backend_name = settings.get("CASE_SEARCH_BACKEND", SearchBackends.POSTGRES)
+    if backend_name not in search_backends:
+        if backend_name == SearchBackends.POSTGRES:
+            search_backends[backend_name] = PostgresTrigramSearchBackend()
+        elif backend_name == SearchBackends.IN_PROCESS:
+            search_backends[backend_name] = InProcessSearchBackend()
+        else:
+            raise ValueError(f"Unknown case search backend: {backend_name}")
+    return search_backends[backend_name]
+
+
+async def backfill_search_documents(async_engine) -> None:
+    """
+    Runs the configured backend's `backfill` for every tenant at startup, so
+    cases written before the backend was introduced, or before this process
+    started for the in-process backend, are searchable.
+
+    Every worker runs this on startup. For a `shared` backend only the worker
+    that wins a tenant's advisory lock backfills it; the others skip the
+    tenant instead of repeating the same upsert behind it.
+    """
+    backend = get_search_backend()
+    async with async_engine.connect() as connection:
+        result = await connection.execute(text("SELECT name FROM config.agencies"))
+        agencies = [row[0] for row in result]
+
+    for agency in agencies:
+        backfilled = False
+        async with session_context(async_engine, agency) as session:
+            if backend.shared:
+                locked = await session.scalar(
+                    select(
+                        func.pg_try_advisory_xact_lock(
+                            func.hashtext(f"case_search_backfill:{agency}")
+                        )
+                    )
+                )
+                if not locked:
+                    logger.info(f"Case search backfill for {agency} runs elsewhere")
+                    continue
+            await backend.backfill(session, agency)
+            await session.commit()
+            backfilled = True
+        if backfilled:
+            logger.info(f"Case search documents backfilled for {agency}")
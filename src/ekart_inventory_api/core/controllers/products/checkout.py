@@ -0,0 +1,183 @@
+from typing import Annotated
+
+from fastapi import Depends, HTTPException
+from sqlalchemy import delete, func, insert, literal, select, true
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ....utils.database.connections import get_async_engine
+from ....utils.database.session_context_manager import session_context
+from ...models import current_user
+from ...models.products.products import (
+    Cart,
+    CheckoutRequest,
+    OrderHistory,
+    ProductInventory,
+)
+from ..dependencies import get_client_header
+from .cart_store import cart_store
+from .stock_reservation import (
+    ReservationStatus,
+    reserve_stock,
+)
+
+
+def build_order_insert(user_id: int, checkout_id: int, user_name: str):
+    """
+    Moves every line of the user's cart into `order_history` with one
+    `INSERT ... SELECT`, pricing each line in SQL from the product's current
+    price.
+    """
+    now = func.now()
+    lines = (
+        select(
+            Cart.user_id,
+            Cart.product_id,
+            Cart.quantity,
+            (Cart.quantity * ProductInventory.price).label("total_price"),
+            now,
+            literal(checkout_id),
+            true(),
+            literal(user_name),
+            now,
+            literal(user_name),
+            now,
+        )
+        .join(ProductInventory, ProductInventory.id == Cart.product_id)
+        .where(Cart.user_id == user_id)
+    )
+    return (
+        insert(OrderHistory)
+        .from_select(
+            [
+                OrderHistory.user_id,
+                OrderHistory.product_id,
+                OrderHistory.quantity,
+                OrderHistory.total_price,
+                OrderHistory.order_date,
+                OrderHistory.checkout_id,
+                OrderHistory.is_active,
+                OrderHistory.created_by,
+                OrderHistory.created_on,
+                OrderHistory.modified_by,
+                OrderHistory.modified_on,
+            ],
+            lines,
+        )
+        .returning(
+            OrderHistory.id,
+            OrderHistory.product_id,
+            OrderHistory.quantity,
+            OrderHistory.total_price,
+        )
+    )
+
+
+class CheckoutController:
+    def __init__(
+        self,
+        async_engine: Annotated[AsyncEngine, Depends(get_async_engine)],
+        agency: str = Depends(get_client_header),
+    ) -> None:
+        self.async_engine = async_engine
+        self.agency = agency
+
+    @staticmethod
+    def to_response(checkout_id: int, orders, replayed: bool) -> dict:
+        orders = [
+            {
+                "order_id": order.id,
+                "product_id": order.product_id,
+                "quantity": order.quantity,
+                "total_price": order.total_price,
+            }
+            for order in orders
+        ]
+        return {
+            "checkout_id": checkout_id,
+            "orders": orders,
+            "total_price": sum(order["total_price"] for order in orders),
+            "replayed": replayed,
+        }
+
+    async def checkout(self, user_id: int, idempotency_key: str) -> dict:
+        """
+        Places the user's whole cart as orders in one transaction: the key is
+        claimed, stock is reserved for every line, the lines are copied into
+        `order_history` and the cart is emptied. Any line that cannot be
+        reserved rolls everything back, key included, so the client may retry.
+
+        A retry with the same key waits for the first attempt to finish and
+        returns its orders without reserving anything again.
+        """
+        # The cart table must hold what the user sees before it is read
+        await cart_store.flush(self.agency, user_id)
+
+        orders = None
+        async with session_context(self.async_engine, self.agency) as session:
+            # Blocks on a concurrent attempt with the same key until it ends
+            result = await session.execute(
+                pg_insert(CheckoutRequest)
+                .values(user_id=user_id, idempotency_key=idempotency_key)
+                .on_conflict_do_nothing(
+                    index_elements=[
+                        CheckoutRequest.user_id,
+                        CheckoutRequest.idempotency_key,
+                    ]
+                )
+                .returning(CheckoutRequest.id)
+            )
+            checkout_id = result.scalar_one_or_none()
+            if checkout_id is None:
+                return await self.replay(session, user_id, idempotency_key)
+
+            result = await session.execute(
+                select(Cart.product_id, Cart.quantity)
+                .where(Cart.user_id == user_id)
+                .order_by(Cart.product_id)
+                .with_for_update()
+            )
+            lines = [(row.product_id, row.quantity) for row in result]
+            if not lines:
+                raise HTTPException(status_code=400, detail="Cart is empty")
+
+            outcomes = await reserve_stock(session, lines)
+            if any(
+                outcome["status"] != ReservationStatus.RESERVED for outcome in outcomes
+            ):
+                raise HTTPException(
+                    status_code=409,
+                    detail={"message": "Insufficient stock", "lines": outcomes},
+                )
+
+            result = await session.execute(
+                build_order_insert(user_id, checkout_id, current_user())
+            )
+            orders = result.all()
+            await session.execute(delete(Cart).where(Cart.user_id == user_id))
+            await session.commit()
+        if orders is None:
+            raise HTTPException(status_code=503, detail="Checkout failed")
+
+        await cart_store.forget(self.agency, user_id)
+        return self.to_response(checkout_id, orders, replayed=False)
+
+    async def replay(self, session, user_id: int, idempotency_key: str) -> dict:
+        result = await session.execute(
+            select(CheckoutRequest.id).where(
+                CheckoutRequest.user_id == user_id,
+                CheckoutRequest.idempotency_key == idempotency_key,
+            )
+        )
+        checkout_id = result.scalar_one()
+        result = await session.execute(
+            select(
+                OrderHistory.id,
+                OrderHistory.product_id,
+                OrderHistory.quantity,
+                OrderHistory.total_price,
+            )
+            .where(OrderHistory.checkout_id == checkout_id)
+            .order_by(OrderHistory.id)
+        )
+        return self.to_response(checkout_id, result.all(), replayed=True)
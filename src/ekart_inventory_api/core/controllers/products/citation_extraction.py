@@ -0,0 +1,432 @@
+import re
+import xml.etree.ElementTree as ET
+
+NAMESPACES = {
+    "xsi": "http://www.w3.org/2001/XMLSchema-instance",
+    "j": "http://niem.gov/niem/domains/jxdm/4.0",
+    "nc": "http://niem.gov/niem/niem-core/2.0",
+    "s": "http://niem.gov/niem/structures/2.0",
+    "jsi": "http://www.justicesystems.com/iepd",
+}
+
+# Bytes handed to the parser per call
+FEED_SIZE = 64 * 1024
+
+# Distinct element paths remembered per plan before the cache is reset
+MATCH_CACHE_SIZE = 4096
+
+# Joins the tags of the open elements; cannot occur inside a tag or namespace URI
+SEPARATOR = "\x1f"
+
+
+class Field:
+    """
+    Placeholder in an extraction template for the stripped text of the first
+    element, in document order, matching `path`, or "" when nothing matches.
+    With nested matches, e.g. an `nc:Person` inside another, that can be an
+    element of the inner match; it is the element `find` returns too. `path`
+    uses the ElementTree subset the controller used with `find`: `prefix:Tag`
+    steps joined by `/` (child) or `//` (descendant), optionally starting with
+    `.//`.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+
+class Repeat:
+    """
+    Placeholder for a list with one filled `template` per element matching
+    `path`, in document order. Unlike `findall`, which yields an element once
+    per chain of ancestors matching a `//` path, each element is listed once.
+    Fields inside `template` are relative to the repeated element.
+    """
+
+    def __init__(self, path: str, template: dict) -> None:
+        self.path = path
+        self.template = template
+
+
+def _qualify(step: str, namespaces: dict) -> str:
+    prefix, _, local_name = step.rpartition(":")
+    if not prefix:
+        return local_name
+    return f"{{{namespaces[prefix]}}}{local_name}"
+
+
+def compile_path(path: str, namespaces: dict) -> tuple[str, re.Pattern]:
+    """
+    Turns a path into the tag of the element it selects and a regex over the
+    SEPARATOR-joined tags of that element's ancestors below the context node.
+    """
+    axis = "/"
+    if path.startswith(".//"):
+        axis, path = "//", path[3:]
+    pattern = ""
+    tag = ""
+    for index, segment in enumerate(path.split("//")):
+        for position, step in enumerate(segment.split("/")):
+            tag = _qualify(step, namespaces)
+            if position == 0 and (index > 0 or axis == "//"):
+                # Any number of intermediate ancestors
+                pattern += f"(?:{SEPARATOR}[^{SEPARATOR}]+)*"
+            pattern += SEPARATOR + re.escape(tag)
+    return tag, re.compile(f"^{pattern}$")
+
+
+class _Matchers:
+    def __init__(self, paths, namespaces: dict) -> None:
+        self.by_tag: dict[str, list[tuple[str, re.Pattern]]] = {}
+        for path in paths:
+            tag, regex = compile_path(path, namespaces)
+            self.by_tag.setdefault(tag, []).append((path, regex))
+        # Documents of one schema repeat the same element paths, so regex
+        # results are remembered per tag path
+        self.cache: dict[str, tuple[str, ...]] = {}
+
+    def matching(self, tag: str, tag_path: str, claimed: dict) -> list[str]:
+        paths = self.cache.get(tag_path)
+        if paths is None:
+            paths = tuple(
+                path
+                for path, regex in self.by_tag.get(tag, ())
+                if regex.match(tag_path)
+            )
+            if len(self.cache) >= MATCH_CACHE_SIZE:
+                self.cache.clear()
+            self.cache[tag_path] = paths
+        return [path for path in paths if path not in claimed]
+
+
+def _collect(template, fields: set, repeats: list) -> None:
+    if isinstance(template, Field):
+        fields.add(template.path)
+    elif isinstance(template, Repeat):
+        repeats.append(template)
+    elif isinstance(template, dict):
+        for value in template.values():
+            _collect(value, fields, repeats)
+    elif isinstance(template, list):
+        for value in template:
+            _collect(value, fields, repeats)
+
+
+class _ScanTarget:
+    """
+    Parser target for one `ExtractionPlan.scan`. Receives the parser's
+    start/data/end callbacks directly, so no Element tree is ever built; only
+    the tags of the currently open elements are kept.
+    """
+
+    def __init__(self, plan: "ExtractionPlan") -> None:
+        self.plan = plan
+        self.values: dict[str, str] = {}
+        # Paths whose element has been closed, so their text is final
+        self.completed: set[str] = set()
+        self.repeated = {id(repeat): [] for repeat in plan.repeats}
+        # Tags of the open elements, root first
+        self.tags: list[str] = []
+        # Per open element, the (values, path) pairs waiting for its text
+        self.waiting: list[list | None] = []
+        # Per open element, its `.text` collected so far when it is wanted
+        self.texts: list[list[str] | None] = []
+        # Where character data goes: the innermost open element's text until
+        # its first child opens, after which the data is a child's tail
+        self.text_parts: list[str] | None = None
+        # Open repeated elements, outermost first, for nested repeats:
+        # repeat id -> [(depth, values)]
+        self.open_repeats: dict[int, list[tuple[int, dict]]] = {}
+
+    def start(self, tag: str, attrib: dict) -> None:
+        tags = self.tags
+        tags.append(tag)
+        if tag not in self.plan.tags or len(tags) == 1:
+            # Paths are relative to the root element, as with `root.find`
+            self.waiting.append(None)
+            self.texts.append(None)
+            self.text_parts = None
+            return
+
+        waiting = []
+        tag_path = SEPARATOR + SEPARATOR.join(tags[1:])
+        for path in self.plan.matchers.matching(tag, tag_path, self.values):
+            self.values[path] = ""
+            waiting.append((self.values, path))
+
+        for repeat, repeat_tag, regex, matchers in self.plan.repeat_matchers:
+            # Every enclosing instance sees this element as a descendant
+            for depth, repeat_values in self.open_repeats.get(id(repeat), ()):
+                relative_path = SEPARATOR + SEPARATOR.join(tags[depth:])
+                for path in matchers.matching(tag, relative_path, repeat_values):
+                    repeat_values[path] = ""
+                    waiting.append((repeat_values, path))
+            if tag == repeat_tag and regex.match(tag_path):
+                repeat_values = {}
+                # Listed when opened, so instances keep document order like
+                # `findall` even though nested ones close first
+                self.repeated[id(repeat)].append(repeat_values)
+                self.open_repeats.setdefault(id(repeat), []).append(
+                    (len(tags), repeat_values)
+                )
+
+        if waiting:
+            self.waiting.append(waiting)
+            self.text_parts = []
+        else:
+            self.waiting.append(None)
+            self.text_parts = None
+        self.texts.append(self.text_parts)
+
+    def data(self, text: str) -> None:
+        if self.text_parts is not None:
+            self.text_parts.append(text)
+
+    def end(self, tag: str) -> None:
+        waiting = self.waiting.pop()
+        text_parts = self.texts.pop()
+        if waiting:
+            text = "".join(text_parts).strip()
+            for target, path in waiting:
+                target[path] = text
+                if target is self.values:
+                    self.completed.add(path)
+        # What follows is this element's tail, not its parent's text
+        self.text_parts = None
+        if self.open_repeats:
+            depth = len(self.tags)
+            for instances in self.open_repeats.values():
+                if instances and instances[-1][0] == depth:
+                    instances.pop()
+        self.tags.pop()
+
+    def close(self) -> None:
+        return None
+
+
+class ExtractionPlan:
+    """
+    Compiles a template of `Field` and `Repeat` placeholders once, then fills it
+    from a document in a single streaming pass over the raw bytes. Nothing but
+    the open element path and the matched text is held, so memory stays bounded
+    by the depth of the document rather than its size.
+    """
+
+    def __init__(self, template: dict, namespaces: dict = NAMESPACES) -> None:
+        self.template = template
+        fields: set[str] = set()
+        self.repeats: list[Repeat] = []
+        _collect(template, fields, self.repeats)
+        self.matchers = _Matchers(fields, namespaces)
+
+        self.repeat_matchers = []
+        for repeat in self.repeats:
+            repeat_fields: set[str] = set()
+            _collect(repeat.template, repeat_fields, [])
+            tag, regex = compile_path(repeat.path, namespaces)
+            repeat_matchers = _Matchers(repeat_fields, namespaces)
+            self.repeat_matchers.append((repeat, tag, regex, repeat_matchers))
+
+        # Elements with any other tag only need their position tracked
+        self.tags = set(self.matchers.by_tag)
+        for _, tag, _, repeat_matchers in self.repeat_matchers:
+            self.tags.add(tag)
+            self.tags.update(repeat_matchers.by_tag)
+
+    def scan(self, source: bytes) -> tuple[dict, dict]:
+        target = _ScanTarget(self)
+        parser = ET.XMLParser(target=target)
+        for offset in range(0, len(source), FEED_SIZE):
+            parser.feed(source[offset : offset + FEED_SIZE])
+        parser.close()
+        return target.values, target.repeated
+
+    def extract(self, source: bytes) -> dict:
+        values, repeated = self.scan(source)
+        return self._fill(self.template, values, repeated)
+
+    def incremental(self) -> "IncrementalScan":
+        return IncrementalScan(self)
+
+    def _fill(self, template, values: dict, repeated: dict):
+        if isinstance(template, Field):
+            return values.get(template.path, "")
+        if isinstance(template, Repeat):
+            return [
+                self._fill(template.template, repeat_values, repeated)
+                for repeat_values in repeated[id(template)]
+            ]
+        if isinstance(template, dict):
+            return {
+                key: self._fill(value, values, repeated)
+                for key, value in template.items()
+            }
+        if isinstance(template, list):
+            return [self._fill(value, values, repeated) for value in template]
+        return template
+
+
+class IncrementalScan:
+    """
+    Scans a document for an `ExtractionPlan` as its bytes arrive, for callers
+    that stream the document elsewhere and must not hold it. `field` returns a
+    value as soon as its element closes; `close` raises `ET.ParseError` for
+    malformed or truncated documents.
+    """
+
+    def __init__(self, plan: ExtractionPlan) -> None:
+        self.plan = plan
+        self.target = _ScanTarget(plan)
+        self.parser = ET.XMLParser(target=self.target)
+
+    def feed(self, chunk: bytes) -> None:
+        self.parser.feed(chunk)
+
+    def field(self, path: str) -> str | None:
+        """
+        The final text for `path`, "" when the document ended without a match,
+        or None while that is still undecided.
+        """
+        if path in self.target.completed:
+            return self.target.values[path]
+        return None
+
+    def close(self) -> dict:
+        self.parser.close()
+        values = self.target.values
+        for matchers in self.plan.matchers.by_tag.values():
+            for path, _ in matchers:
+                values.setdefault(path, "")
+        self.target.completed.update(values)
+        return self.plan._fill(self.plan.template, values, self.target.repeated)
+
+
+# Field mapping for NIEM citation documents, as returned by
+# `CaseRecordsController.parse_citation_xml`
+CITATION_PLAN = ExtractionPlan(
+    {
+        "citation": {
+            "issuing_official_name": "",
+            "all_charge_end": "",
+            "room_number": "",
+            "driving_incident_legal_speed_rate": Field(
+                ".//jsi:DrivingIncident//j:DrivingIncidentLegalSpeedRate/nc:MeasureText",
+            ),
+            "additional_notes": Field(
+                ".//j:Citation//j:CitationViolation//nc:IncidentObservationText",
+            ),
+            "violation_date": Field("j:Citation//nc:Date"),
+            "driving_incident_recorded_speed_rate": Field(
+                ".//jsi:DrivingIncident//j:DrivingIncidentRecordedSpeedRate/nc:MeasureText",
+            ),
+            "violation_order": "",
+            "is_active": True,
+            "created_on": "",
+            "ticket_type": "Traffic",
+            "violation_location": Field(
+                ".//j:Citation//j:CitationIssuedLocation//nc:LocationDescriptionText",
+            ),
+            "vehicle_year": "",
+            "warrant_number": "",
+            "modified_by": "",
+            "ticket_number": Field(
+                ".//j:Citation//j:CitationViolation//nc:ActivityIdentification//nc:IdentificationID",
+            ),
+            "county_name": "",
+            "issue_datetime": Field(".//j:Citation//nc:Date"),
+            "vehicle_make": "",
+            "bench_warrant_number": None,
+            "modified_on": "",
+            "case_number": Field(".//j:Citation//nc:IdentificationID"),
+            "observation_text": "",
+            "vehicle_model": "",
+            "pd_reference_number": None,
+            "hearing_date": Field(".//j:CourtAppearanceDate//nc:DateTime"),
+            "location_description_text": Field(
+                ".//j:Citation//j:CitationIssuedLocation//nc:LocationDescriptionText",
+            ),
+            "vehicle_registration_plate_no": Field(
+                ".//nc:ConveyanceRegistrationPlateIdentification//nc:IdentificationID",
+            ),
+            "defendant_id": None,
+            "hearing_time": Field(".//j:CourtAppearanceDate//nc:DateTime"),
+            "issuing_official_badge_number": Field(
+                ".//j:EnforcementOfficialBadgeIdentification/nc:IdentificationID",
+            ),
+            "all_charge_start": "",
+        },
+        "defendant": {
+            "first_name": Field(".//nc:Person//nc:PersonName/nc:PersonGivenName"),
+            "sex": Field(".//nc:Person//nc:PersonSexCode"),
+            "is_active": True,
+            "ethnicity": Field(".//nc:Person//nc:PersonEthnicityText"),
+            "created_by": "",
+            "eye_color": Field(".//nc:Person//nc:PersonEyeColorCode"),
+            "created_on": "",
+            "middle_name": Field(".//nc:Person//nc:PersonName/nc:PersonMiddleName"),
+            "hair_color": Field(".//nc:Person//nc:PersonHairColorCode"),
+            "modified_by": "",
+            "last_name": Field(".//nc:Person//nc:PersonName/nc:PersonSurName"),
+            "height": Field(".//nc:Person//nc:PersonHeightDescriptionText"),
+            "modified_on": "",
+            "ssn_id": Field(
+                ".//nc:Person//nc:PersonSSNIdentification/nc:IdentificationID"
+            ),
+            "suffix": Field(".//nc:Person//nc:PersonName/nc:PersonNameSuffixText"),
+            "weight": Field(".//nc:Person//nc:PersonWeightDescriptionText"),
+            "dob": Field(".//nc:Person//nc:PersonBirthDate/nc:Date"),
+            "license_number": Field(
+                ".//nc:Person//nc:PersonLicenseIdentification/nc:IdentificationID",
+            ),
+            "race": Field(".//nc:Person//nc:PersonRaceCode"),
+            "license_state_code": Field(
+                ".//nc:Person//nc:PersonLicenseIdentification/j:IdentificationJurisdictionNCICLSTACode",
+            ),
+            "contacts": [
+                {
+                    "mailing_address": Field(
+                        ".//nc:StructuredAddress//nc:AddressDeliveryPointText"
+                    ),
+                    "location_city_name": Field(
+                        ".//nc:StructuredAddress//nc:LocationCityName"
+                    ),
+                    "location_postal_code": Field(
+                        ".//nc:StructuredAddress//nc:LocationStateUSPostalServiceCode",
+                    ),
+                    "created_by": "",
+                    "modified_by": "",
+                    "address_delivery_point": Field(
+                        ".//nc:StructuredAddress//nc:AddressDeliveryPointText"
+                    ),
+                    "location_state_code": Field(
+                        ".//nc:StructuredAddress//nc:LocationStateUSPostalServiceCode",
+                    ),
+                    "phone_number": Field(".//nc:TelephoneNumberFullID"),
+                    "is_active": True,
+                    "created_on": "",
+                    "modified_on": "",
+                }
+            ],
+        },
+        "charges": Repeat(
+            ".//j:ChargeStatute",
+            {
+                "charge_code": Field(
+                    ".//j:StatuteCodeIdentification/nc:IdentificationID"
+                ),
+                "charge_description": Field(".//j:StatuteDescriptionText"),
+            },
+        ),
+    }
+)
+
+
+# Only the case number is needed to name an uploaded citation
+CASE_NUMBER_PATH = ".//j:Citation//nc:IdentificationID"
+CASE_NUMBER_PLAN = ExtractionPlan({"case_number": Field(CASE_NUMBER_PATH)})
+
+
+def extract_citation(source: bytes) -> dict:
+    """
+    Module level entry point so worker processes can unpickle the call.
+    """
+    return CITATION_PLAN.extract(source)
@@ -0,0 +1,43 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Optional
+
+from ....settings.config import settings
+from .citation_extraction import extract_citation
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    """
+    Process pool for CPU-bound citation parsing, created on first use and sized
+    by `CITATION_PARSE_WORKERS`. Every server worker gets its own pool, so keep
+    the size times the number of server workers around the number of cores.
+
+    Children are spawned rather than forked: a fork would copy the worker's
+    event loop, open connections and background tasks into each child.
+    """
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor(
+            max_workers=settings.get("CITATION_PARSE_WORKERS", 2),
+            mp_context=get_context("spawn"),
+        )
+    return _parse_pool
+
+
+def shutdown_parse_pool() -> None:
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown(wait=True, cancel_futures=True)
+        _parse_pool = None
+
+
+async def parse_citation(source: bytes) -> dict:
+    """
+    Parses a citation in the process pool so the event loop keeps serving
+    other requests.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_parse_pool(), extract_citation, source)
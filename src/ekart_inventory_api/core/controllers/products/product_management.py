@@ -1,38 +1,103 @@
+import asyncio
+import json
 import os
+import time
 import xml.etree.ElementTree as ET
 from datetime import datetime, timezone
 from typing import Annotated, List
 
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException
+from pydantic import ValidationError
 from sqlalchemy import (
+    JSON,
     Date,
     DateTime,
     Float,
     Integer,
     Numeric,
-    String,
-    Text,
     delete,
     func,
+    insert,
+    literal,
+    literal_column,
     or_,
     select,
+    tuple_,
 )
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncEngine
 from sqlalchemy.orm import selectinload
 from starlette_context import context
 
-from dependencies import get_client_header
-from pems_api.core.models.agency.agency import (
+from ....settings.config import settings
+from ....utils.aws.aws_client import get_s3
+from ....utils.aws.s3 import S3, MultipartUpload
+from ....utils.common.logger import logger
+from ....utils.database.bulk_copy import copy_into, reserve_ids
+from ....utils.database.connections import get_async_engine
+from ....utils.database.explain import Explain
+from ....utils.database.session_context_manager import session_context
+from ....utils.helper import decode_cursor, encode_cursor
+from ...models.agency.agency import (
     CaseChargeAssociation,
     CaseRecord,
     Charge,
     DefendantContactDetails,
     DefendantDetails,
 )
-from pems_api.utils.aws.async_aws_client import get_s3
-from pems_api.utils.aws.s3_script import S3
-from pems_api.utils.database.connections import get_async_engine
-from pems_api.utils.database.session_context_manager import session_context
+from ...models.serializers import serialize_all
+from ...schemas.agency.case_records import CaseRecordCreate
+from ...schemas.products.case_search import CaseSearchQuery
+from ..dependencies import get_client_header
+from .case_search import get_search_backend
+from .citation_extraction import (
+    CASE_NUMBER_PATH,
+    CASE_NUMBER_PLAN,
+    NAMESPACES,
+)
+from .citation_pool import parse_citation
+
+# Search totals of every tenant, keyed by (agency, strategy, normalized
+# filters), in one cache so its size stays bounded however many tenants are
+# searched. Writes through this controller bump the tenant's generation, which
+# retires its totals, but only in the worker that made the write: other
+# workers keep serving their totals for up to CASE_SEARCH_COUNT_CACHE_TTL
+# seconds, so totals are eventually consistent across workers. Lower the TTL
+# if that window is too wide.
+count_cache = TTLCache(
+    maxsize=settings.get("CASE_SEARCH_COUNT_CACHE_SIZE", 4096),
+    ttl=settings.get("CASE_SEARCH_COUNT_CACHE_TTL", 300),
+)
+
+# agency -> number of invalidations. Part of every cache key, so totals
+# counted before a write are never looked up again, and a count that was
+# running during a write is not stored under the new generation.
+count_generations: dict[str, int] = {}
+
+# Query fields that only affect paging, never the total
+PAGING_FIELDS = {"page", "num_of_records", "cursor", "pagination", "include_total"}
+
+# Columns that identify a defendant contact as already on file
+CONTACT_MATCH_COLUMNS = (
+    DefendantContactDetails.address_delivery_point,
+    DefendantContactDetails.mailing_address,
+    DefendantContactDetails.location_city_name,
+    DefendantContactDetails.location_state_code,
+    DefendantContactDetails.location_postal_code,
+    DefendantContactDetails.phone_number,
+)
+
+
+class CountStrategy:
+    EXACT = "exact"
+    CAPPED = "capped"
+    ESTIMATED = "estimated"
+
+
+def invalidate_count_cache(agency: str) -> None:
+    count_generations[agency] = count_generations.get(agency, 0) + 1
 
 
 class CaseRecordsController:
@@ -42,10 +107,12 @@ class CaseRecordsController:
         async_engine: Annotated[AsyncEngine, Depends(get_async_engine)],
         agency: str = Depends(get_client_header),
         s3_client=Depends(get_s3),
+        search_backend=Depends(get_search_backend),
     ) -> None:
         self.async_engine = async_engine
         self.agency = agency
         self.s3_client = s3_client
+        self.search_backend = search_backend
 
     def build_filter_query(self, query) -> list:
         filters = []
@@ -69,7 +136,9 @@ class CaseRecordsController:
                 )
 
         if query.search_string:
-            search_filters = []
+            search_filters = [
+                self.search_backend.match(self.agency, query.search_string)
+            ]
             search_date = self.parse_search_string(
                 query.search_string, datetime.strptime, "%Y-%m-%d"
             )
@@ -77,9 +146,7 @@ class CaseRecordsController:
 
             for model in [CaseRecord, DefendantDetails, Charge]:
                 for column in model.__table__.columns:
-                    if isinstance(column.type, (String, Text)):
-                        search_filters.append(column.ilike(f"%{query.search_string}%"))
-                    elif isinstance(column.type, (Date, DateTime)) and search_date:
+                    if isinstance(column.type, (Date, DateTime)) and search_date:
                         search_filters.append(column == search_date)
                     elif (
                         isinstance(column.type, (Integer, Float, Numeric))
@@ -102,26 +169,142 @@ class CaseRecordsController:
         except ValueError:
             return None
 
-    async def search_case_records(self, query) -> List[dict]:
+    async def search_case_records(self, query: CaseSearchQuery) -> List[dict]:
         filters = self.build_filter_query(query)
-        async with session_context(self.async_engine, self.agency) as session:
-            total_records = await self.fetch_total_records(session, filters)
+        if query.pagination == "cursor":
+            return await self.search_case_records_by_cursor(query, filters)
+
+        async with session_context(
+            self.async_engine, self.agency, read_only=True
+        ) as session:
+            total_records, total_is_exact = await self.count_records(
+                session, query, filters
+            )
             total_pages = (
                 total_records + query.num_of_records - 1
             ) // query.num_of_records
             offset = (query.page - 1) * query.num_of_records
 
-            case_records = await self.fetch_case_records(
+            result_data = await self.fetch_case_result_page(
                 session, filters, offset, query.num_of_records
             )
-
-            result_data = self.format_case_records(case_records)
             return {
                 "total_pages": total_pages,
                 "total_records": total_records,
+                "total_is_exact": total_is_exact,
+                "result": result_data,
+            }
+
+    async def search_case_records_by_cursor(
+        self, query: CaseSearchQuery, filters
+    ) -> dict:
+        """
+        Keyset pagination over `(violation_date, created_on, id)`. Seeks past the
+        last row of the previous page instead of skipping `offset` rows, and only
+        runs the COUNT when `include_total` is requested.
+        """
+        cursor = query.cursor
+        if cursor:
+            sort_key = (CaseRecord.violation_date, CaseRecord.created_on, CaseRecord.id)
+            # Bound with each column's type, so created_on is compared as the
+            # timestamptz it is rather than a type guessed from the value
+            filters.append(
+                tuple_(*sort_key)
+                < tuple_(
+                    *(
+                        literal(value, column.type)
+                        for column, value in zip(sort_key, decode_cursor(cursor))
+                    )
+                )
+            )
+
+        async with session_context(
+            self.async_engine, self.agency, read_only=True
+        ) as session:
+            total_records, total_is_exact = None, None
+            if query.include_total:
+                # The seek predicate must not narrow the total
+                count_filters = filters[:-1] if cursor else filters
+                total_records, total_is_exact = await self.count_records(
+                    session, query, count_filters
+                )
+
+            # Fetch one extra row to learn whether another page exists
+            result_data = await self.fetch_case_result_page(
+                session, filters, None, query.num_of_records + 1, with_created_on=True
+            )
+            has_more = len(result_data) > query.num_of_records
+            result_data = result_data[: query.num_of_records]
+
+            next_cursor = None
+            if has_more:
+                last = result_data[-1]
+                next_cursor = encode_cursor(
+                    last["violation_date"], last["created_on"], last["id"]
+                )
+            for row in result_data:
+                del row["created_on"]
+
+            return {
+                "next_cursor": next_cursor,
+                "total_records": total_records,
+                "total_is_exact": total_is_exact,
                 "result": result_data,
             }
 
+    def count_cache_key(self, query, strategy: str) -> tuple:
+        normalized_filters = json.dumps(
+            query.dict(exclude_unset=True, exclude=PAGING_FIELDS | {"count_strategy"}),
+            sort_keys=True,
+            default=str,
+        )
+        generation = count_generations.get(self.agency, 0)
+        return self.agency, generation, strategy, normalized_filters
+
+    async def count_records(self, session, query, filters) -> tuple[int, bool]:
+        """
+        Counts matching case records using the query's `count_strategy`:
+
+        - `exact`: `count(distinct id)` over the full join.
+        - `capped`: stops counting after `CASE_SEARCH_COUNT_CAP` rows, so the
+          UI can render "1000+".
+        - `estimated`: the planner's row estimate from `EXPLAIN`.
+
+        Returns the count and whether it is exact.
+        """
+        strategy = query.count_strategy
+        cache_key = self.count_cache_key(query, strategy)
+        if cache_key in count_cache:
+            return count_cache[cache_key]
+
+        if strategy == CountStrategy.EXACT:
+            total = await self.fetch_total_records(session, filters), True
+        elif strategy == CountStrategy.CAPPED:
+            total = await self.fetch_capped_total_records(
+                session, filters, settings.get("CASE_SEARCH_COUNT_CAP", 1000)
+            )
+        elif strategy == CountStrategy.ESTIMATED:
+            total = await self.fetch_estimated_total_records(session, filters), False
+        else:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown count strategy {strategy}"
+            )
+
+        # A write during the count may or may not be in it
+        if count_generations.get(self.agency, 0) == cache_key[1]:
+            count_cache[cache_key] = total
+        return total
+
+    def matching_case_ids_query(self, filters):
+        return (
+            select(CaseRecord.id)
+            .distinct()
+            .join(DefendantDetails)
+            .join(CaseChargeAssociation)
+            .join(Charge)
+            .filter(*filters)
+        )
+
     async def fetch_total_records(self, session, filters):
         count_query = (
             select(func.count(func.distinct(CaseRecord.id)))
@@ -133,6 +316,19 @@ class CaseRecordsController:
         )
         return await session.scalar(count_query)
 
+    async def fetch_capped_total_records(self, session, filters, cap: int):
+        limited_ids = self.matching_case_ids_query(filters).limit(cap + 1).subquery()
+        total = await session.scalar(select(func.count()).select_from(limited_ids))
+        if total > cap:
+            return cap, False
+        return total, True
+
+    async def fetch_estimated_total_records(self, session, filters):
+        plan = await session.scalar(Explain(self.matching_case_ids_query(filters)))
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
     async def fetch_case_records(self, session, filters, offset, limit):
         query = (
             select(CaseRecord)
@@ -149,12 +345,115 @@ class CaseRecordsController:
             .filter(*filters)
             .offset(offset)
             .limit(limit)
-            .order_by(CaseRecord.violation_date.desc(), CaseRecord.created_on.desc())
+            .order_by(
+                CaseRecord.violation_date.desc(),
+                CaseRecord.created_on.desc(),
+                CaseRecord.id.desc(),
+            )
         )
 
         result = await session.execute(query)
         return result.scalars().all()
 
+    async def fetch_case_result_page(
+        self, session, filters, offset, limit, with_created_on=False
+    ) -> list[dict]:
+        """
+        One page of search results in the shape of `format_case_records`.
+        With `CASE_SEARCH_PROJECTION` (the default) a single query selects only
+        the result columns and builds each case's charges with `json_agg`;
+        otherwise full entities are loaded and formatted in Python.
+        """
+        if not settings.get("CASE_SEARCH_PROJECTION", True):
+            case_records = await self.fetch_case_records(
+                session, filters, offset, limit
+            )
+            rows = self.format_case_records(case_records)
+            if with_created_on:
+                for row, case in zip(rows, case_records):
+                    row["created_on"] = case.created_on
+            return rows
+
+        result = await session.execute(
+            self.case_result_projection_query(filters, offset, limit)
+        )
+        rows = [dict(row) for row in result.mappings()]
+        if not with_created_on:
+            for row in rows:
+                del row["created_on"]
+        return rows
+
+    def case_result_projection_query(self, filters, offset, limit):
+        # The page is chosen on the sort key alone, so DISTINCT only compares
+        # three columns instead of every CaseRecord column
+        page = (
+            select(CaseRecord.id, CaseRecord.violation_date, CaseRecord.created_on)
+            .distinct()
+            .join(DefendantDetails)
+            .join(CaseChargeAssociation)
+            .join(Charge)
+            .filter(*filters)
+            .order_by(
+                CaseRecord.violation_date.desc(),
+                CaseRecord.created_on.desc(),
+                CaseRecord.id.desc(),
+            )
+            .offset(offset)
+            .limit(limit)
+            .subquery()
+        )
+        charges = (
+            select(
+                func.coalesce(
+                    func.json_agg(
+                        aggregate_order_by(
+                            func.json_build_object(
+                                "charge_id",
+                                Charge.id,
+                                "charge_code",
+                                Charge.charge_code,
+                                "charge_description",
+                                Charge.charge_description,
+                                "charge_type",
+                                Charge.charge_type,
+                            ),
+                            Charge.id,
+                        )
+                    ),
+                    literal_column("'[]'::json"),
+                    type_=JSON,
+                )
+            )
+            .select_from(CaseChargeAssociation)
+            .join(Charge)
+            .where(CaseChargeAssociation.case_record_id == page.c.id)
+            .scalar_subquery()
+        )
+        return (
+            select(
+                page.c.id,
+                CaseRecord.hearing_date,
+                CaseRecord.hearing_time,
+                page.c.violation_date,
+                CaseRecord.case_number,
+                CaseRecord.ticket_number,
+                DefendantDetails.last_name,
+                DefendantDetails.middle_name,
+                DefendantDetails.first_name,
+                charges.label("charges"),
+                CaseRecord.ticket_type.label("case_type"),
+                page.c.created_on,
+            )
+            .select_from(page)
+            .join(CaseRecord, CaseRecord.id == page.c.id)
+            .outerjoin(DefendantDetails)
+            .order_by(
+                page.c.violation_date.desc(),
+                page.c.created_on.desc(),
+                page.c.id.desc(),
+            )
+        )
+
     def format_case_records(self, case_records):
         return [
             {
@@ -182,104 +481,358 @@ class CaseRecordsController:
             for case in case_records
         ]
 
+    async def validate_charge_ids(self, session, charge_ids) -> list:
+        """
+        Checks every charge id with a single `IN` query and returns them
+        de-duplicated in request order.
+        """
+        charge_ids = list(dict.fromkeys(charge_ids))
+        if not charge_ids:
+            return charge_ids
+        found = set(
+            await session.scalars(select(Charge.id).where(Charge.id.in_(charge_ids)))
+        )
+        for charge_id in charge_ids:
+            if charge_id not in found:
+                raise HTTPException(
+                    status_code=404, detail=f"Charge ID {charge_id} not found."
+                )
+        return charge_ids
+
+    async def insert_charge_associations(self, session, case_record_id, charge_ids):
+        if not charge_ids:
+            return
+        await session.execute(
+            pg_insert(CaseChargeAssociation)
+            .values(
+                [
+                    {"case_record_id": case_record_id, "charge_id": charge_id}
+                    for charge_id in charge_ids
+                ]
+            )
+            .on_conflict_do_nothing()
+        )
+
+    async def insert_missing_contacts(self, session, defendant_id, contacts, is_new):
+        """
+        Inserts the contacts the defendant does not already have in one
+        multi-row statement. Existing contacts are loaded with one query rather
+        than one lookup per contact; new defendants skip the lookup.
+        """
+        existing_keys = set()
+        if not is_new:
+            existing = await session.execute(
+                select(*CONTACT_MATCH_COLUMNS).where(
+                    DefendantContactDetails.defendant_id == defendant_id
+                )
+            )
+            existing_keys = {tuple(row) for row in existing}
+
+        new_contacts = {}
+        for contact_data in contacts:
+            key = tuple(
+                getattr(contact_data, column.key) for column in CONTACT_MATCH_COLUMNS
+            )
+            if key not in existing_keys:
+                new_contacts.setdefault(key, contact_data)
+
+        if new_contacts:
+            await session.execute(
+                insert(DefendantContactDetails).values(
+                    [
+                        dict(**contact_data.dict(), defendant_id=defendant_id)
+                        for contact_data in new_contacts.values()
+                    ]
+                )
+            )
+
     async def create_case_records(self, case_data):
+        """
+        Issues a fixed number of statements regardless of how many contacts or
+        charges the case carries.
+        """
         async with session_context(self.async_engine, self.agency) as session:
+            charge_ids = await self.validate_charge_ids(session, case_data.charge_ids)
 
             defendant_data = case_data.defendant
-            defendant = DefendantDetails(
-                **defendant_data.dict(exclude={"contacts"}),
+            defendant_id = await session.scalar(
+                select(DefendantDetails.id)
+                .filter_by(ssn_id=defendant_data.ssn_id)
+                .limit(1)
             )
-            existing_defendant = await session.execute(
-                select(DefendantDetails).filter_by(ssn_id=case_data.defendant.ssn_id)
-            )
-            existing_defendant = existing_defendant.scalars().first()
-
-            contact_ids = []
-            if existing_defendant:
-                defendant = existing_defendant
-
-                for contact_data in case_data.defendant.contacts:
-                    existing_contact = await session.execute(
-                        select(DefendantContactDetails).filter_by(
-                            defendant_id=defendant.id,
-                            address_delivery_point=contact_data.address_delivery_point,
-                            mailing_address=contact_data.mailing_address,
-                            location_city_name=contact_data.location_city_name,
-                            location_state_code=contact_data.location_state_code,
-                            location_postal_code=contact_data.location_postal_code,
-                            phone_number=contact_data.phone_number,
-                        )
-                    )
-                    existing_contact = existing_contact.scalars().first()
-
-                    if existing_contact:
-                        contact_ids.append(existing_contact.id)
-                    else:
-                        contact = DefendantContactDetails(
-                            **contact_data.dict(),
-                            defendant_id=defendant.id,
-                        )
-                        session.add(contact)
-                        await session.flush()
-                        contact_ids.append(contact.id)
-            else:
-                defendant_data = case_data.defendant
-                defendant = DefendantDetails(
-                    **defendant_data.dict(exclude={"contacts"}),
+            is_new_defendant = defendant_id is None
+            if is_new_defendant:
+                defendant_id = await session.scalar(
+                    insert(DefendantDetails)
+                    .values(**defendant_data.dict(exclude={"contacts"}))
+                    .returning(DefendantDetails.id)
                 )
-                session.add(defendant)
-                await session.flush()
 
-                for contact_data in case_data.defendant.contacts:
-                    contact = DefendantContactDetails(
-                        **contact_data.dict(),
-                        defendant_id=defendant.id,
-                    )
-                    session.add(contact)
-                    await session.flush()
-                    contact_ids.append(contact.id)
+            await self.insert_missing_contacts(
+                session, defendant_id, defendant_data.contacts, is_new_defendant
+            )
 
             def make_utc_aware(dt):
                 if dt and dt.tzinfo is None:
                     return dt.replace(tzinfo=timezone.utc)
                 return dt
 
-            case_record = CaseRecord(
-                **case_data.dict(
-                    exclude={
-                        "defendant",
-                        "charge_ids",
-                        "issue_datetime",
-                        "all_charge_start",
-                        "all_charge_end",
-                    }
-                ),
-                defendant_id=defendant.id,
-                issue_datetime=make_utc_aware(case_data.issue_datetime),
-                all_charge_start=make_utc_aware(case_data.all_charge_start),
-                all_charge_end=make_utc_aware(case_data.all_charge_end),
+            case_record_id = await session.scalar(
+                insert(CaseRecord)
+                .values(
+                    **case_data.dict(
+                        exclude={
+                            "defendant",
+                            "charge_ids",
+                            "issue_datetime",
+                            "all_charge_start",
+                            "all_charge_end",
+                        }
+                    ),
+                    defendant_id=defendant_id,
+                    issue_datetime=make_utc_aware(case_data.issue_datetime),
+                    all_charge_start=make_utc_aware(case_data.all_charge_start),
+                    all_charge_end=make_utc_aware(case_data.all_charge_end),
+                )
+                .returning(CaseRecord.id)
             )
-            session.add(case_record)
-            await session.flush()
 
-            for charge_id in case_data.charge_ids:
-                charge = await session.get(Charge, charge_id)
-                if not charge:
-                    raise HTTPException(
-                        status_code=404, detail=f"Charge ID {charge_id} not found."
-                    )
-                association = CaseChargeAssociation(
-                    case_record_id=case_record.id,
-                    charge_id=charge_id,
-                )
-                session.add(association)
+            await self.insert_charge_associations(session, case_record_id, charge_ids)
 
+            await self.search_backend.index_cases(
+                session, self.agency, [case_record_id]
+            )
             await session.commit()
+            invalidate_count_cache(self.agency)
 
             return {"message": "insertion successful"}
 
-    async def fetch_case_record(self, case_number):
+    async def bulk_create_case_records(self, lines) -> dict:
+        """
+        Ingests NDJSON `CaseRecordCreate` lines in chunks of
+        `CASE_BULK_CHUNK_SIZE`, one transaction per chunk, and reports an
+        outcome for every non-empty line.
+        """
+        chunk_size = settings.get("CASE_BULK_CHUNK_SIZE", 500)
+        results = []
+        chunk = []
+        line_number = 0
+        async for line in lines:
+            line_number += 1
+            if not line.strip():
+                continue
+            chunk.append((line_number, line))
+            if len(chunk) >= chunk_size:
+                results += await self.load_case_chunk(chunk)
+                chunk = []
+        if chunk:
+            results += await self.load_case_chunk(chunk)
+
+        invalidate_count_cache(self.agency)
+        return {
+            "created": sum(result["status"] == "created" for result in results),
+            "failed": sum(result["status"] != "created" for result in results),
+            "results": results,
+        }
+
+    async def load_case_chunk(self, chunk) -> list[dict]:
+        outcomes = {}
+        items = []
+        for line_number, line in chunk:
+            try:
+                items.append((line_number, CaseRecordCreate.model_validate_json(line)))
+            except ValidationError as e:
+                outcomes[line_number] = {
+                    "line": line_number,
+                    "status": "invalid",
+                    "detail": str(e),
+                }
+
+        # Anything not marked created below failed with its chunk's transaction
+        for line_number, case_data in items:
+            outcomes[line_number] = {
+                "line": line_number,
+                "case_number": case_data.case_number,
+                "status": "failed",
+            }
+
         async with session_context(self.async_engine, self.agency) as session:
+            items = await self.drop_items_with_unknown_charges(session, items, outcomes)
+            if items:
+                case_ids = await self.copy_case_chunk(session, items)
+                await self.search_backend.index_cases(
+                    session, self.agency, list(case_ids.values())
+                )
+                await session.commit()
+                for line_number, case_record_id in case_ids.items():
+                    outcomes[line_number].update(status="created", id=case_record_id)
+
+        return [outcomes[line_number] for line_number, _ in chunk]
+
+    async def drop_items_with_unknown_charges(self, session, items, outcomes):
+        charge_ids = {
+            charge_id for _, case_data in items for charge_id in case_data.charge_ids
+        }
+        found = set()
+        if charge_ids:
+            found = set(
+                await session.scalars(
+                    select(Charge.id).where(Charge.id.in_(charge_ids))
+                )
+            )
+
+        valid_items = []
+        for line_number, case_data in items:
+            missing = [
+                charge_id
+                for charge_id in case_data.charge_ids
+                if charge_id not in found
+            ]
+            if missing:
+                outcomes[line_number].update(
+                    status="invalid", detail=f"Charge ID {missing[0]} not found."
+                )
+            else:
+                valid_items.append((line_number, case_data))
+        return valid_items
+
+    async def copy_case_chunk(self, session, items) -> dict:
+        """
+        Loads a validated chunk with a fixed number of statements: defendants
+        are de-duplicated by `ssn_id` within the chunk and against the table,
+        ids are reserved from the sequences up front and every table is filled
+        through `copy_into`. Returns the new case id for each line.
+        """
+        ssn_ids = {
+            case_data.defendant.ssn_id
+            for _, case_data in items
+            if case_data.defendant.ssn_id
+        }
+        defendant_ids = {}
+        if ssn_ids:
+            existing = await session.execute(
+                select(DefendantDetails.ssn_id, DefendantDetails.id).where(
+                    DefendantDetails.ssn_id.in_(ssn_ids)
+                )
+            )
+            defendant_ids = {row.ssn_id: row.id for row in existing}
+        existing_defendant_ids = set(defendant_ids.values())
+
+        new_defendants = []
+        item_defendant_keys = []
+        for line_number, case_data in items:
+            # Defendants without an SSN cannot be matched, so each is new
+            key = case_data.defendant.ssn_id or ("line", line_number)
+            item_defendant_keys.append(key)
+            if key not in defendant_ids:
+                defendant_ids[key] = None
+                new_defendants.append((key, case_data.defendant))
+
+        reserved = await reserve_ids(
+            session, self.agency, DefendantDetails.__table__, len(new_defendants)
+        )
+        for (key, _), defendant_id in zip(new_defendants, reserved):
+            defendant_ids[key] = defendant_id
+        await copy_into(
+            session,
+            self.agency,
+            DefendantDetails.__table__,
+            [
+                dict(**defendant_data.dict(exclude={"contacts"}), id=defendant_ids[key])
+                for key, defendant_data in new_defendants
+            ],
+        )
+
+        existing_contacts = set()
+        if existing_defendant_ids:
+            result = await session.execute(
+                select(
+                    DefendantContactDetails.defendant_id, *CONTACT_MATCH_COLUMNS
+                ).where(
+                    DefendantContactDetails.defendant_id.in_(existing_defendant_ids)
+                )
+            )
+            existing_contacts = {tuple(row) for row in result}
+
+        contact_rows = {}
+        for (_, case_data), key in zip(items, item_defendant_keys):
+            defendant_id = defendant_ids[key]
+            for contact_data in case_data.defendant.contacts:
+                contact_key = (defendant_id,) + tuple(
+                    getattr(contact_data, match_column.key)
+                    for match_column in CONTACT_MATCH_COLUMNS
+                )
+                if contact_key not in existing_contacts:
+                    contact_rows.setdefault(
+                        contact_key,
+                        dict(**contact_data.dict(), defendant_id=defendant_id),
+                    )
+        contact_ids = await reserve_ids(
+            session, self.agency, DefendantContactDetails.__table__, len(contact_rows)
+        )
+        await copy_into(
+            session,
+            self.agency,
+            DefendantContactDetails.__table__,
+            [
+                dict(row, id=contact_id)
+                for row, contact_id in zip(contact_rows.values(), contact_ids)
+            ],
+        )
+
+        def make_utc_aware(dt):
+            if dt and dt.tzinfo is None:
+                return dt.replace(tzinfo=timezone.utc)
+            return dt
+
+        case_record_ids = await reserve_ids(
+            session, self.agency, CaseRecord.__table__, len(items)
+        )
+        case_rows = []
+        association_rows = []
+        case_ids = {}
+        for (line_number, case_data), key, case_record_id in zip(
+            items, item_defendant_keys, case_record_ids
+        ):
+            case_ids[line_number] = case_record_id
+            case_rows.append(
+                dict(
+                    **case_data.dict(
+                        exclude={
+                            "defendant",
+                            "charge_ids",
+                            "issue_datetime",
+                            "all_charge_start",
+                            "all_charge_end",
+                        }
+                    ),
+                    id=case_record_id,
+                    defendant_id=defendant_ids[key],
+                    issue_datetime=make_utc_aware(case_data.issue_datetime),
+                    all_charge_start=make_utc_aware(case_data.all_charge_start),
+                    all_charge_end=make_utc_aware(case_data.all_charge_end),
+                )
+            )
+            association_rows += [
+                {"case_record_id": case_record_id, "charge_id": charge_id}
+                for charge_id in dict.fromkeys(case_data.charge_ids)
+            ]
+
+        await copy_into(session, self.agency, CaseRecord.__table__, case_rows)
+
+        await copy_into(
+            session,
+            self.agency,
+            CaseChargeAssociation.__table__,
+            association_rows,
+            ignore_conflicts=True,
+        )
+        return case_ids
+
+    async def fetch_case_record(self, case_number):
+        async with session_context(
+            self.async_engine, self.agency, read_only=True
+        ) as session:
             query = (
                 select(CaseRecord)
                 .distinct()
@@ -317,7 +870,9 @@ class CaseRecordsController:
                 raise HTTPException(status_code=404, detail="Case not found")
 
     async def get_all_defendants(self):
-        async with session_context(self.async_engine, self.agency) as session:
+        async with session_context(
+            self.async_engine, self.agency, read_only=True
+        ) as session:
             query = (
                 select(DefendantDetails)
                 .join(DefendantContactDetails)
@@ -328,17 +883,19 @@ class CaseRecordsController:
 
             if result:
                 result = result.scalars().all()
-                return result
+                return serialize_all(result)
 
             else:
                 raise HTTPException(status_code=404, detail="No Defendants Available")
 
     async def get_all_charges(self):
-        async with session_context(self.async_engine, self.agency) as session:
+        async with session_context(
+            self.async_engine, self.agency, read_only=True
+        ) as session:
             result = await session.scalars(select(Charge))
             result = result.all()
             if result:
-                return result
+                return serialize_all(result)
 
             else:
                 raise HTTPException(status_code=404, detail="No Charges Available")
@@ -425,27 +982,25 @@ class CaseRecordsController:
             existing_case.all_charge_start = make_utc_aware(case_data.all_charge_start)
             existing_case.all_charge_end = make_utc_aware(case_data.all_charge_end)
 
+            charge_ids = await self.validate_charge_ids(session, case_data.charge_ids)
             await session.execute(
                 delete(CaseChargeAssociation).filter_by(case_record_id=existing_case.id)
             )
-            for charge_id in case_data.charge_ids:
-                charge = await session.get(Charge, charge_id)
-                if not charge:
-                    raise HTTPException(
-                        status_code=404, detail=f"Charge ID {charge_id} not found."
-                    )
-                association = CaseChargeAssociation(
-                    case_record_id=existing_case.id,
-                    charge_id=charge_id,
-                )
-                session.add(association)
+            await self.insert_charge_associations(session, existing_case.id, charge_ids)
 
+            await session.flush()
+            # The defendant's fields are part of every one of their cases'
+            # documents, this case's included
+            await self.search_backend.index_related_cases(
+                session, self.agency, defendant_ids=[existing_defendant.id]
+            )
             await session.commit()
+            invalidate_count_cache(self.agency)
 
             return {"message": "Update successful"}
 
-    def _get_file_details(self, file):
-        filename, file_extension = os.path.splitext(file.filename)
+    def _get_file_details(self, filename):
+        filename, file_extension = os.path.splitext(filename)
         data_name = file_extension.lower()
 
         if data_name[1:] != "xml":
@@ -461,20 +1016,12 @@ class CaseRecordsController:
         return details
 
     def resolve_path(self, root, path):
-        namespaces = {
-            "xsi": "http://www.w3.org/2001/XMLSchema-instance",
-            "j": "http://niem.gov/niem/domains/jxdm/4.0",
-            "nc": "http://niem.gov/niem/niem-core/2.0",
-            "s": "http://niem.gov/niem/structures/2.0",
-            "jsi": "http://www.justicesystems.com/iepd",
-        }
-        element = root.find(path, namespaces=namespaces)
+        element = root.find(path, namespaces=NAMESPACES)
         if element is None:
             return ""
         return element.text.strip() if element.text else ""
 
-    async def _get_case_number_from_xml(self, xml_file):
-        content = await xml_file.read()
+    def _get_case_number_from_xml(self, content: bytes):
         root = ET.fromstring(content)
 
         case_number = self.resolve_path(root, ".//j:Citation//nc:IdentificationID")
@@ -485,13 +1032,13 @@ class CaseRecordsController:
         uploaded_file = file_data.get("data")
         data_type = file_data.get("data_type")
 
-        file_size = os.fstat(uploaded_file.file.fileno()).st_size
+        # Read once; the same bytes are parsed and then uploaded
+        content = await uploaded_file.read()
         if data_type == "DOCUMENT":
-            if file_size > 5000000:
+            if len(content) > settings.get("XML_UPLOAD_MAX_BYTES", 5000000):
                 raise HTTPException(400, "File too large")
 
-        case_number = await self._get_case_number_from_xml(uploaded_file)
-        await uploaded_file.seek(0)
+        case_number = self._get_case_number_from_xml(content)
         filename = "{}{}".format(case_number, file_data.get("data_name"))
         key_parts = ["Case", "XML", created_on, filename]
         meta = {
@@ -502,241 +1049,223 @@ class CaseRecordsController:
             "case_number": case_number,
         }
 
-        uploaded = await S3(s3_client=self.s3_client).upload(
-            "/".join(key_parts), uploaded_file, metadata=meta
+        uploaded = await S3(s3_client=self.s3_client).upload_bytes(
+            "/".join(key_parts), content, metadata=meta
         )
         return uploaded
 
-    async def upload_xml(self, upload_files, created_on):
-        success = 1
-        failed_files = []
-        uploaded_files = upload_files
-        if upload_files in (None, ""):
-            success = 0
-            return {"success": success, "failed_files": failed_files}
-
-        file_details = []
-        for file in uploaded_files:
-            file_detail = self._get_file_details(file)
-            file_details.append((file, file_detail))
-
-        for file_detail in file_details:
-            single_file_details = dict(data=file_detail[0], **file_detail[1])
+    async def _upload_single_xml(self, file, created_on, semaphore) -> dict:
+        status = {"filename": file.filename, "success": False}
+        # The file is only read once a slot is free, so at most
+        # `XML_UPLOAD_CONCURRENCY` files are held in memory at a time
+        async with semaphore:
+            started = time.perf_counter()
             try:
-                single_file_success = await self._upload_file_data_to_s3(
-                    single_file_details, created_on
+                file_detail = self._get_file_details(file.filename)
+                status["filename"] = file_detail.get("filename")
+                status["success"] = bool(
+                    await self._upload_file_data_to_s3(
+                        dict(data=file, **file_detail), created_on
+                    )
                 )
-                if not single_file_success:
-                    failed_files.append(file_detail[1].get("filename"))
-                    success = 0
+            except HTTPException as e:
+                status["error"] = e.detail
             except Exception as e:
-                failed_files.append(file_detail[1].get("filename"))
-                success = 0
+                status["error"] = str(e)
+            status["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return status
 
-        return {"success": success, "failed_files": failed_files}
+    async def upload_xml(self, upload_files, created_on):
+        """
+        Uploads files concurrently, `XML_UPLOAD_CONCURRENCY` at a time, and
+        reports each one as `{filename, success, elapsed_ms, error?}` in the
+        order they were sent. `success` is 1 only when every file uploaded.
+        """
+        if upload_files in (None, ""):
+            return {"success": 0, "failed_files": [], "files": []}
 
-    async def get_all_xml(self, created_on=None):
-        case_document_links = []
-        all_documents = await S3(s3_client=self.s3_client).list_files(
-            "Case/XML" + (f"/{created_on}" if created_on else "")
+        semaphore = asyncio.Semaphore(settings.get("XML_UPLOAD_CONCURRENCY", 8))
+        files = await asyncio.gather(
+            *(
+                self._upload_single_xml(file, created_on, semaphore)
+                for file in upload_files
+            )
         )
+        failed_files = [status["filename"] for status in files if not status["success"]]
+        return {
+            "success": 0 if failed_files else 1,
+            "failed_files": failed_files,
+            "files": files,
+        }
 
-        for document in all_documents:
-            splitter = document.get("Key", "").split("/")[-1]
-            if splitter == "":
-                continue
+    async def stream_xml_to_s3(self, chunks, filename, created_on, content_length=None):
+        """
+        Pipes a raw XML request body to S3 without spooling it to disk. The
+        case number that names the object is read by an incremental parser as
+        the bytes pass through, and `XML_STREAM_MAX_BYTES` is enforced per
+        chunk. At most one multipart part is buffered, so a body that fits in
+        one part is sent with a single PutObject instead.
+
+        The limit is separate from the form upload's `XML_UPLOAD_MAX_BYTES`,
+        which bounds a body held in memory, and defaults well above S3's 5 MiB
+        minimum part size so large bodies do reach the multipart path.
+        """
+        file_detail = self._get_file_details(filename)
+        max_bytes = settings.get("XML_STREAM_MAX_BYTES", 100 * 1024 * 1024)
+        if content_length is not None:
+            if not content_length.isascii() or not content_length.isdigit():
+                raise HTTPException(400, "Invalid Content-Length header")
+            if int(content_length) > max_bytes:
+                raise HTTPException(400, "File too large")
+        part_size = max(
+            settings.get("S3_MULTIPART_PART_SIZE", MultipartUpload.MIN_PART_SIZE),
+            MultipartUpload.MIN_PART_SIZE,
+        )
 
-            obj = (
-                await S3(s3_client=self.s3_client).get_metadata(document.get("Key", ""))
-                or {}
-            )
+        started = time.perf_counter()
+        s3 = S3(s3_client=self.s3_client)
+        scan = CASE_NUMBER_PLAN.incremental()
+        buffer = bytearray()
+        size = 0
+        upload = None
+
+        def build_upload_target(case_number):
+            name = "{}{}".format(case_number, file_detail.get("data_name"))
+            meta = {
+                "created_by": context.get("user_details")["user_name"],
+                "filename": name,
+                "data_type": file_detail.get("data_type"),
+                "created_on": created_on,
+                "case_number": case_number,
+            }
+            return "/".join(["Case", "XML", created_on, name]), meta
 
-            signed_url = await S3(s3_client=self.s3_client).get_signed_url(
-                key=document.get("Key", ""), expiration=300
-            )
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(400, "File too large")
+                scan.feed(chunk)
+                buffer += chunk
+                if len(buffer) < part_size:
+                    continue
+                if upload is None:
+                    # The object key needs the case number, so keep buffering
+                    # until its element has been parsed
+                    case_number = scan.field(CASE_NUMBER_PATH)
+                    if case_number is None:
+                        continue
+                    key, meta = build_upload_target(case_number)
+                    upload = await s3.create_multipart_upload(key, metadata=meta)
+                await upload.upload_part(bytes(buffer))
+                buffer.clear()
+
+            case_number = scan.close()["case_number"]
+            if upload is None:
+                key, meta = build_upload_target(case_number)
+                uploaded = await s3.upload_bytes(key, bytes(buffer), metadata=meta)
+            else:
+                if buffer:
+                    await upload.upload_part(bytes(buffer))
+                uploaded = await upload.complete()
+        except BaseException as e:
+            if upload is not None:
+                try:
+                    await upload.abort()
+                except Exception as abort_error:
+                    # Keep the original error; a lifecycle rule has to clean
+                    # up the orphaned parts
+                    logger.error(
+                        f"Failed to abort multipart upload {upload.key}: {abort_error}"
+                    )
+            if isinstance(e, ET.ParseError):
+                raise HTTPException(400, f"Invalid XML: {e}")
+            raise
 
-            if not obj.get("filename"):
-                obj["filename"] = splitter
+        return {
+            "filename": file_detail.get("filename"),
+            "case_number": case_number,
+            "size": size,
+            "success": uploaded,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
 
-            document_entry = {
-                "data": signed_url,
-                "meta": obj,
-                "key": document.get("Key", ""),
-            }
+    async def get_all_xml(self, created_on=None):
+        return [document async for document in self.iter_all_xml(created_on)]
 
-            document_entry["data_type"] = "document"
+    async def get_xml_dates(self):
+        return [
+            folder
+            async for folder in S3(s3_client=self.s3_client).iter_folders("Case/XML")
+        ]
 
-            case_document_links.append(document_entry)
-            # except Exception as e:
-            #     raise HTTPException(400, str(e))
-        return case_document_links
+    async def iter_all_xml(self, created_on=None):
+        """
+        Yields document entries in listing order. Metadata lookups run
+        `S3_METADATA_CONCURRENCY` at a time, are cached by ETag and each window
+        is yielded as soon as it resolves, so callers can start rendering
+        before the whole folder is processed.
+        """
+        s3 = S3(s3_client=self.s3_client)
+        window_size = settings.get("S3_METADATA_CONCURRENCY", 16)
+
+        window = []
+        async for document in s3.iter_files(
+            "Case/XML" + (f"/{created_on}" if created_on else "")
+        ):
+            if document.get("Key", "").split("/")[-1] == "":
+                continue
+            window.append(document)
+            if len(window) == window_size:
+                for entry in await self.build_document_entries(s3, window):
+                    yield entry
+                window = []
+        for entry in await self.build_document_entries(s3, window):
+            yield entry
+
+    async def build_document_entries(self, s3, documents) -> list[dict]:
+        return await asyncio.gather(
+            *(self.build_document_entry(s3, document) for document in documents)
+        )
 
-    async def parse_citation_xml(self, key):
-        file = await S3(s3_client=self.s3_client).get_file_obj(key=key)
-        root = ET.fromstring(file)
-
-        mapper = {
-            "citation": {
-                "issuing_official_name": "",
-                "all_charge_end": "",
-                "room_number": "",
-                "driving_incident_legal_speed_rate": self.resolve_path(
-                    root,
-                    ".//jsi:DrivingIncident//j:DrivingIncidentLegalSpeedRate/nc:MeasureText",
-                ),
-                "additional_notes": self.resolve_path(
-                    root,
-                    ".//j:Citation//j:CitationViolation//nc:IncidentObservationText",
-                ),
-                "violation_date": self.resolve_path(root, "j:Citation//nc:Date"),
-                "driving_incident_recorded_speed_rate": self.resolve_path(
-                    root,
-                    ".//jsi:DrivingIncident//j:DrivingIncidentRecordedSpeedRate/nc:MeasureText",
-                ),
-                "violation_order": "",
-                "is_active": True,
-                "created_on": "",
-                "ticket_type": "Traffic",
-                "violation_location": self.resolve_path(
-                    root,
-                    ".//j:Citation//j:CitationIssuedLocation//nc:LocationDescriptionText",
-                ),
-                "vehicle_year": "",
-                "warrant_number": "",
-                "modified_by": "",
-                "ticket_number": self.resolve_path(
-                    root,
-                    ".//j:Citation//j:CitationViolation//nc:ActivityIdentification//nc:IdentificationID",
-                ),
-                "county_name": "",
-                "issue_datetime": self.resolve_path(root, ".//j:Citation//nc:Date"),
-                "vehicle_make": "",
-                "bench_warrant_number": None,
-                "modified_on": "",
-                "case_number": self.resolve_path(
-                    root, ".//j:Citation//nc:IdentificationID"
-                ),
-                "observation_text": "",
-                "vehicle_model": "",
-                "pd_reference_number": None,
-                "hearing_date": self.resolve_path(
-                    root, ".//j:CourtAppearanceDate//nc:DateTime"
-                ),
-                "location_description_text": self.resolve_path(
-                    root,
-                    ".//j:Citation//j:CitationIssuedLocation//nc:LocationDescriptionText",
-                ),
-                "vehicle_registration_plate_no": self.resolve_path(
-                    root,
-                    ".//nc:ConveyanceRegistrationPlateIdentification//nc:IdentificationID",
-                ),
-                "defendant_id": None,
-                "hearing_time": self.resolve_path(
-                    root, ".//j:CourtAppearanceDate//nc:DateTime"
-                ),
-                "issuing_official_badge_number": self.resolve_path(
-                    root,
-                    ".//j:EnforcementOfficialBadgeIdentification/nc:IdentificationID",
-                ),
-                "all_charge_start": "",
-            },
-            "defendant": {
-                "first_name": self.resolve_path(
-                    root, ".//nc:Person//nc:PersonName/nc:PersonGivenName"
-                ),
-                "sex": self.resolve_path(root, ".//nc:Person//nc:PersonSexCode"),
-                "is_active": True,
-                "ethnicity": self.resolve_path(
-                    root, ".//nc:Person//nc:PersonEthnicityText"
-                ),
-                "created_by": "",
-                "eye_color": self.resolve_path(
-                    root, ".//nc:Person//nc:PersonEyeColorCode"
-                ),
-                "created_on": "",
-                "middle_name": self.resolve_path(
-                    root, ".//nc:Person//nc:PersonName/nc:PersonMiddleName"
-                ),
-                "hair_color": self.resolve_path(
-                    root, ".//nc:Person//nc:PersonHairColorCode"
-                ),
-                "modified_by": "",
-                "last_name": self.resolve_path(
-                    root, ".//nc:Person//nc:PersonName/nc:PersonSurName"
-                ),
-                "height": self.resolve_path(
-                    root, ".//nc:Person//nc:PersonHeightDescriptionText"
-                ),
-                "modified_on": "",
-                "ssn_id": self.resolve_path(
-                    root, ".//nc:Person//nc:PersonSSNIdentification/nc:IdentificationID"
-                ),
-                "suffix": self.resolve_path(
-                    root, ".//nc:Person//nc:PersonName/nc:PersonNameSuffixText"
-                ),
-                "weight": self.resolve_path(
-                    root, ".//nc:Person//nc:PersonWeightDescriptionText"
-                ),
-                "dob": self.resolve_path(
-                    root, ".//nc:Person//nc:PersonBirthDate/nc:Date"
-                ),
-                "license_number": self.resolve_path(
-                    root,
-                    ".//nc:Person//nc:PersonLicenseIdentification/nc:IdentificationID",
-                ),
-                "race": self.resolve_path(root, ".//nc:Person//nc:PersonRaceCode"),
-                "license_state_code": self.resolve_path(
-                    root,
-                    ".//nc:Person//nc:PersonLicenseIdentification/j:IdentificationJurisdictionNCICLSTACode",
-                ),
-                "contacts": [
-                    {
-                        "mailing_address": self.resolve_path(
-                            root, ".//nc:StructuredAddress//nc:AddressDeliveryPointText"
-                        ),
-                        "location_city_name": self.resolve_path(
-                            root, ".//nc:StructuredAddress//nc:LocationCityName"
-                        ),
-                        "location_postal_code": self.resolve_path(
-                            root,
-                            ".//nc:StructuredAddress//nc:LocationStateUSPostalServiceCode",
-                        ),
-                        "created_by": "",
-                        "modified_by": "",
-                        "address_delivery_point": self.resolve_path(
-                            root, ".//nc:StructuredAddress//nc:AddressDeliveryPointText"
-                        ),
-                        "location_state_code": self.resolve_path(
-                            root,
-                            ".//nc:StructuredAddress//nc:LocationStateUSPostalServiceCode",
-                        ),
-                        "phone_number": self.resolve_path(
-                            root, ".//nc:TelephoneNumberFullID"
-                        ),
-                        "is_active": True,
-                        "created_on": "",
-                        "modified_on": "",
-                    }
-                ],
-            },
-            "charges": [
-                {
-                    "charge_code": self.resolve_path(
-                        charge,
-                        ".//j:StatuteCodeIdentification/nc:IdentificationID",
-                    ),
-                    "charge_description": self.resolve_path(
-                        charge,
-                        ".//j:StatuteDescriptionText",
-                    ),
-                }
-                for charge in root.findall(
-                    ".//j:ChargeStatute",
-                    namespaces={
-                        "j": "http://niem.gov/niem/domains/jxdm/4.0",
-                    },
-                )
-            ],
+    async def build_document_entry(self, s3, document) -> dict:
+        key = document.get("Key", "")
+        obj = dict(await s3.get_metadata(key, etag=document.get("ETag")) or {})
+        signed_url = await s3.get_signed_url(key=key, expiration=300)
+
+        if not obj.get("filename"):
+            obj["filename"] = key.split("/")[-1]
+
+        return {
+            "data": signed_url,
+            "meta": obj,
+            "key": key,
+            "data_type": "document",
         }
 
-        return mapper
\ No newline at end of file
+    async def parse_citation_xml(self, key):
+        file = await S3(s3_client=self.s3_client).get_file_bytes(key=key)
+        return await parse_citation(file)
+
+    async def parse_citation_xml_batch(self, keys):
+        """
+        Fetches and parses many citations, yielding `{"key", "result"}` (or
+        `{"key", "error"}`) in completion order. At most
+        `CITATION_BATCH_CONCURRENCY` documents are in flight at once, which
+        bounds both S3 requests and the bytes queued for the process pool.
+        """
+        semaphore = asyncio.Semaphore(settings.get("CITATION_BATCH_CONCURRENCY", 16))
+        s3 = S3(s3_client=self.s3_client)
+
+        async def fetch_and_parse(key):
+            async with semaphore:
+                try:
+                    file = await s3.get_file_bytes(key=key)
+                    return {"key": key, "result": await parse_citation(file)}
+                except Exception as e:
+                    return {"key": key, "error": str(e)}
+
+        for next_result in asyncio.as_completed(
+            [fetch_and_parse(key) for key in dict.fromkeys(keys)]
+        ):
+            yield await next_result
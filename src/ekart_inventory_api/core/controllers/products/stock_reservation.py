@@ -0,0 +1,303 @@
+import asyncio
+from typing import Annotated, Iterable, Optional
+
+from fastapi import Depends, HTTPException
+from sqlalchemy import Integer, column, select, update, values
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ....settings.config import settings
+from ....utils.common.logger import logger
+from ....utils.database.connections import get_async_engine
+from ....utils.database.session_context_manager import session_context
+from ...models.products.products import ProductInventory
+from ..dependencies import get_client_header
+from .stock_shards import (
+    get_folded_stock,
+    shard_product,
+    sharded_product_ids,
+    take_from_shards,
+    unshard_product,
+)
+
+
+class ReservationStatus:
+    RESERVED = "reserved"
+    INSUFFICIENT_STOCK = "insufficient_stock"
+    UNKNOWN_PRODUCT = "unknown_product"
+    INVALID_QUANTITY = "invalid_quantity"
+
+
+# Written as `modified_by` by batched reservations, which run in a task shared
+# by many requests
+RESERVATION_USER = "stock_reservation"
+
+
+def build_stock_lock_query(product_ids: Iterable[int]):
+    """
+    Locks the products' rows in id order, so transactions reserving
+    overlapping products always lock them in the same order.
+    """
+    return (
+        select(ProductInventory.id, ProductInventory.quantity)
+        .where(ProductInventory.id.in_(set(product_ids)))
+        .order_by(ProductInventory.id)
+        .with_for_update()
+    )
+
+
+def allocate_stock(
+    requests: list[tuple[int, int]], stock: dict[int, int]
+) -> list[Optional[bool]]:
+    """
+    Grants `(product_id, quantity)` requests first come first served against
+    `stock`, which is decremented in place. A denied request takes nothing,
+    so a smaller request after an oversized one can still be granted.
+
+    Returns per request whether it was granted, or None for a product missing
+    from `stock`.
+    """
+    granted: list[Optional[bool]] = []
+    for product_id, quantity in requests:
+        available = stock.get(product_id)
+        if available is None:
+            granted.append(None)
+        elif quantity <= available:
+            stock[product_id] = available - quantity
+            granted.append(True)
+        else:
+            granted.append(False)
+    return granted
+
+
+def build_stock_decrement(totals: dict[int, int], modified_by: Optional[str] = None):
+    """
+    Decrements every product by its granted total in one `UPDATE ... FROM
+    (VALUES ...)`. The rows must already be locked by `build_stock_lock_query`.
+    """
+    reserved = values(
+        column("product_id", Integer),
+        column("total", Integer),
+        name="reserved",
+    ).data(list(totals.items()))
+    audit = {"modified_by": modified_by} if modified_by else {}
+    return (
+        update(ProductInventory)
+        .where(ProductInventory.id == reserved.c.product_id)
+        .values(quantity=ProductInventory.quantity - reserved.c.total, **audit)
+    )
+
+
+async def reserve_stock(
+    session, requests: Iterable[tuple[int, int]], modified_by: Optional[str] = None
+) -> list[dict]:
+    """
+    Reserves stock inside the caller's transaction and returns one outcome per
+    `(product_id, quantity)` request, in request order. Nothing is committed.
+    Unsharded products cost one locking read and one update for the whole
+    list. `modified_by` overrides the request's user on the changed rows.
+    """
+    requests = list(requests)
+    outcomes = [
+        {"product_id": product_id, "quantity": quantity, "status": None}
+        for product_id, quantity in requests
+    ]
+    # Positions in `requests` of the valid requests
+    positions = []
+    for position, (_, quantity) in enumerate(requests):
+        if isinstance(quantity, int) and quantity > 0:
+            positions.append(position)
+        else:
+            outcomes[position]["status"] = ReservationStatus.INVALID_QUANTITY
+    if not positions:
+        return outcomes
+
+    sharded = set()
+    if settings.get("STOCK_SHARDING", False):
+        sharded = await sharded_product_ids(
+            session, [requests[position][0] for position in positions]
+        )
+        positions, sharded_positions = (
+            [p for p in positions if requests[p][0] not in sharded],
+            [p for p in positions if requests[p][0] in sharded],
+        )
+
+    if positions:
+        requested = [requests[position] for position in positions]
+        result = await session.execute(
+            build_stock_lock_query(product_id for product_id, _ in requested)
+        )
+        stock = {row.id: row.quantity for row in result}
+        granted = allocate_stock(requested, stock)
+        totals: dict[int, int] = {}
+        for (product_id, quantity), is_granted in zip(requested, granted):
+            if is_granted:
+                totals[product_id] = totals.get(product_id, 0) + quantity
+        if totals:
+            await session.execute(build_stock_decrement(totals, modified_by))
+
+        for position, (product_id, _), is_granted in zip(positions, requested, granted):
+            outcome = outcomes[position]
+            if is_granted is None:
+                outcome["status"] = ReservationStatus.UNKNOWN_PRODUCT
+                outcome["remaining"] = None
+                continue
+            outcome["status"] = (
+                ReservationStatus.RESERVED
+                if is_granted
+                else ReservationStatus.INSUFFICIENT_STOCK
+            )
+            outcome["remaining"] = stock[product_id]
+
+    if sharded:
+        # Product order keeps the fallback's locks on all of a product's
+        # shards in a consistent order across transactions
+        for position in sorted(sharded_positions, key=lambda p: requests[p][0]):
+            product_id, quantity = requests[position]
+            reserved = await take_from_shards(
+                session, product_id, quantity, modified_by
+            )
+            outcomes[position]["status"] = (
+                ReservationStatus.RESERVED
+                if reserved
+                else ReservationStatus.INSUFFICIENT_STOCK
+            )
+        remaining = await get_folded_stock(session, sharded)
+        for position in sharded_positions:
+            outcomes[position]["remaining"] = remaining.get(requests[position][0])
+    return outcomes
+
+
+class StockReservationBatcher:
+    """
+    Coalesces concurrent single reservations of one tenant. The first request
+    opens a window of `STOCK_RESERVATION_WINDOW_MS`; everything queued by
+    then, up to `STOCK_RESERVATION_BATCH_SIZE`, is reserved by one statement
+    in one transaction, so a hot product takes its row lock once per batch
+    instead of once per request.
+
+    The batch runs in a task shared by many requests, whose context is the
+    first caller's, so rows it changes record RESERVATION_USER instead.
+    """
+
+    def __init__(self, async_engine: AsyncEngine, agency: str) -> None:
+        self.async_engine = async_engine
+        self.agency = agency
+        self.window = settings.get("STOCK_RESERVATION_WINDOW_MS", 2) / 1000
+        self.batch_size = settings.get("STOCK_RESERVATION_BATCH_SIZE", 500)
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task: Optional[asyncio.Task] = None
+
+    async def reserve(self, product_id: int, quantity: int) -> dict:
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.run())
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put(((product_id, quantity), future))
+        return await future
+
+    async def run(self) -> None:
+        while True:
+            batch = [await self.queue.get()]
+            await asyncio.sleep(self.window)
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            await self.flush(batch)
+
+    async def flush(self, batch: list) -> None:
+        outcomes, committed = None, False
+        try:
+            async with session_context(self.async_engine, self.agency) as session:
+                outcomes = await reserve_stock(
+                    session, [item for item, _ in batch], RESERVATION_USER
+                )
+                await session.commit()
+                committed = True
+        except Exception as ex:
+            logger.error(f"Stock reservation batch failed: {ex}")
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if committed:
+                future.set_result(outcomes[index])
+            else:
+                future.set_exception(
+                    HTTPException(status_code=503, detail="Reservation failed")
+                )
+
+    def close(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+
+
+# agency -> batcher, one per worker
+stock_reservation_batchers: dict[str, StockReservationBatcher] = {}
+
+
+def shutdown_stock_reservations() -> None:
+    for batcher in stock_reservation_batchers.values():
+        batcher.close()
+    stock_reservation_batchers.clear()
+
+
+class StockReservationController:
+    def __init__(
+        self,
+        async_engine: Annotated[AsyncEngine, Depends(get_async_engine)],
+        agency: str = Depends(get_client_header),
+    ) -> None:
+        self.async_engine = async_engine
+        self.agency = agency
+
+    async def reserve(self, product_id: int, quantity: int) -> dict:
+        batcher = stock_reservation_batchers.get(self.agency)
+        if batcher is None:
+            batcher = StockReservationBatcher(self.async_engine, self.agency)
+            stock_reservation_batchers[self.agency] = batcher
+        return await batcher.reserve(product_id, quantity)
+
+    async def reserve_many(self, requests: list[tuple[int, int]]) -> list[dict]:
+        """
+        Reserves a whole list at once in its own transaction, bypassing the
+        batching window.
+        """
+        outcomes = None
+        async with session_context(self.async_engine, self.agency) as session:
+            reserved = await reserve_stock(session, requests)
+            await session.commit()
+            outcomes = reserved
+        if outcomes is None:
+            raise HTTPException(status_code=503, detail="Reservation failed")
+        return outcomes
+
+    async def get_stock(self, product_id: int) -> dict:
+        async with session_context(
+            self.async_engine, self.agency, read_only=True
+        ) as session:
+            stock = await get_folded_stock(session, [product_id])
+        if product_id not in stock:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return {"product_id": product_id, "quantity": stock[product_id]}
+
+    async def shard(self, product_id: int, shards: Optional[int] = None) -> dict:
+        """
+        Spreads a hot product's stock over `shards` rows (default
+        `STOCK_SHARD_COUNT`). Refused unless `STOCK_SHARDING` is enabled:
+        reservations would not see the shards otherwise, and nothing would
+        rebalance them. Unshard every product before disabling it.
+        """
+        if not settings.get("STOCK_SHARDING", False):
+            raise HTTPException(status_code=409, detail="Stock sharding is disabled")
+        shards = shards or settings.get("STOCK_SHARD_COUNT", 8)
+        async with session_context(self.async_engine, self.agency) as session:
+            quantity = await shard_product(session, product_id, shards)
+            if quantity is None:
+                raise HTTPException(status_code=404, detail="Product not found")
+            await session.commit()
+        return {"product_id": product_id, "quantity": quantity, "shards": shards}
+
+    async def unshard(self, product_id: int) -> dict:
+        async with session_context(self.async_engine, self.agency) as session:
+            quantity = await unshard_product(session, product_id)
+            if quantity is None:
+                raise HTTPException(status_code=404, detail="Product not found")
+            await session.commit()
+        return {"product_id": product_id, "quantity": quantity, "shards": 0}
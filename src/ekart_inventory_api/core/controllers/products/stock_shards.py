@@ -0,0 +1,266 @@
+import asyncio
+from typing import Iterable, Optional
+
+from sqlalchemy import case, delete, func, insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ....settings.config import settings
+from ....utils.common.logger import logger
+from ....utils.database.session_context_manager import session_context
+from ...models.products.products import ProductInventory, ProductStockShard
+
+# Written as `modified_by` by background rebalancing, outside any request
+REBALANCER_USER = "stock_rebalancer"
+
+
+def folded_stock_query(product_ids: Optional[Iterable[int]] = None):
+    """
+    Selects `(id, quantity)` with the shards folded back in, i.e. what
+    `ProductInventory.quantity` means for a product whether or not it is
+    sharded. Mirrors the `product_stock` view.
+    """
+    shard_totals = select(
+        ProductStockShard.product_id,
+        func.sum(ProductStockShard.quantity).label("quantity"),
+    ).group_by(ProductStockShard.product_id)
+    query = select(ProductInventory.id)
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        shard_totals = shard_totals.where(ProductStockShard.product_id.in_(product_ids))
+        query = query.where(ProductInventory.id.in_(product_ids))
+    shard_totals = shard_totals.subquery("shard_totals")
+    return query.add_columns(
+        (ProductInventory.quantity + func.coalesce(shard_totals.c.quantity, 0)).label(
+            "quantity"
+        )
+    ).outerjoin(shard_totals, shard_totals.c.product_id == ProductInventory.id)
+
+
+async def get_folded_stock(session, product_ids: Iterable[int]) -> dict[int, int]:
+    result = await session.execute(folded_stock_query(product_ids))
+    return {row.id: row.quantity for row in result}
+
+
+async def sharded_product_ids(session, product_ids: Iterable[int]) -> set[int]:
+    """
+    Plain read without locks, so asking never queues behind a hot row. A
+    product switching mode meanwhile is safe: the stale path finds no stock
+    and the reservation is refused, never oversold.
+    """
+    result = await session.execute(
+        select(ProductInventory.id).where(
+            ProductInventory.id.in_(set(product_ids)),
+            ProductInventory.stock_shards > 0,
+        )
+    )
+    return set(result.scalars())
+
+
+async def take_from_shards(
+    session, product_id: int, quantity: int, modified_by: Optional[str] = None
+) -> bool:
+    """
+    Decrements `quantity` from one random shard that holds enough, skipping
+    shards locked by other transactions, so concurrent buyers of the product
+    spread over its shards. Falls back to locking every shard of the product
+    when no single free shard can cover the request.
+    """
+    audit = {"modified_by": modified_by} if modified_by else {}
+    candidate = (
+        select(ProductStockShard.shard)
+        .where(
+            ProductStockShard.product_id == product_id,
+            ProductStockShard.quantity >= quantity,
+        )
+        .order_by(func.random())
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    result = await session.execute(
+        update(ProductStockShard)
+        .where(
+            ProductStockShard.product_id == product_id,
+            ProductStockShard.shard == candidate,
+            ProductStockShard.quantity >= quantity,
+        )
+        .values(quantity=ProductStockShard.quantity - quantity, **audit)
+        .returning(ProductStockShard.shard)
+    )
+    if result.first() is not None:
+        return True
+    return await _take_across_shards(session, product_id, quantity, audit)
+
+
+async def _take_across_shards(
+    session, product_id: int, quantity: int, audit: dict
+) -> bool:
+    result = await session.execute(
+        select(ProductStockShard.shard, ProductStockShard.quantity)
+        .where(ProductStockShard.product_id == product_id)
+        .order_by(ProductStockShard.shard)
+        .with_for_update()
+    )
+    shards = result.all()
+    if sum(shard.quantity for shard in shards) < quantity:
+        return False
+
+    needed = quantity
+    for shard in shards:
+        taken = min(shard.quantity, needed)
+        if taken:
+            await session.execute(
+                update(ProductStockShard)
+                .where(
+                    ProductStockShard.product_id == product_id,
+                    ProductStockShard.shard == shard.shard,
+                )
+                .values(quantity=ProductStockShard.quantity - taken, **audit)
+            )
+            needed -= taken
+        if not needed:
+            break
+    return True
+
+
+async def shard_product(session, product_id: int, shards: int) -> Optional[int]:
+    """
+    Moves a product's whole stock into `shards` evenly filled shard rows,
+    re-sharding it if it already is. Returns the stock moved, or None for an
+    unknown product.
+    """
+    if await unshard_product(session, product_id) is None:
+        return None
+    result = await session.execute(
+        select(ProductInventory.quantity)
+        .where(ProductInventory.id == product_id)
+        .with_for_update()
+    )
+    total = result.scalar_one()
+    await session.execute(
+        insert(ProductStockShard),
+        [
+            {
+                "product_id": product_id,
+                "shard": shard,
+                "quantity": total // shards + (1 if shard < total % shards else 0),
+            }
+            for shard in range(shards)
+        ],
+    )
+    await session.execute(
+        update(ProductInventory)
+        .where(ProductInventory.id == product_id)
+        .values(quantity=0, stock_shards=shards)
+    )
+    return total
+
+
+async def unshard_product(session, product_id: int) -> Optional[int]:
+    """
+    Folds a product's shards back into its `quantity` and drops them. Returns
+    the product's stock, or None for an unknown product.
+    """
+    result = await session.execute(
+        select(ProductInventory.quantity)
+        .where(ProductInventory.id == product_id)
+        .with_for_update()
+    )
+    quantity = result.scalar_one_or_none()
+    if quantity is None:
+        return None
+    # Deleting waits for in-flight shard decrements to commit
+    result = await session.execute(
+        delete(ProductStockShard)
+        .where(ProductStockShard.product_id == product_id)
+        .returning(ProductStockShard.quantity)
+    )
+    quantity += sum(result.scalars())
+    await session.execute(
+        update(ProductInventory)
+        .where(ProductInventory.id == product_id)
+        .values(quantity=quantity, stock_shards=0)
+    )
+    return quantity
+
+
+def build_rebalance_query():
+    """
+    Refills the shards of every product whose emptiest shard holds less than
+    half its fair share, spreading the product's total evenly again. Shards
+    are read under lock, so decrements committed meanwhile are not lost.
+    """
+    skewed = (
+        select(ProductStockShard.product_id)
+        .group_by(ProductStockShard.product_id)
+        .having(
+            func.min(ProductStockShard.quantity) * func.count() * 2
+            < func.sum(ProductStockShard.quantity)
+        )
+    )
+    locked = (
+        select(ProductStockShard.product_id, ProductStockShard.quantity)
+        .where(ProductStockShard.product_id.in_(skewed))
+        .order_by(ProductStockShard.product_id, ProductStockShard.shard)
+        .with_for_update()
+        .cte("locked")
+    )
+    totals = (
+        select(
+            locked.c.product_id,
+            func.sum(locked.c.quantity).label("total"),
+            func.count().label("shards"),
+        )
+        .group_by(locked.c.product_id)
+        .cte("totals")
+    )
+    return (
+        update(ProductStockShard)
+        .where(ProductStockShard.product_id == totals.c.product_id)
+        .values(
+            quantity=totals.c.total // totals.c.shards
+            + case(
+                (ProductStockShard.shard < totals.c.total % totals.c.shards, 1), else_=0
+            ),
+            modified_by=REBALANCER_USER,
+        )
+    )
+
+
+class StockShardRebalancer:
+    """
+    Periodically rebalances the shards of every tenant, every
+    `STOCK_SHARD_REBALANCE_INTERVAL` seconds, so random decrements do not
+    leave a product with empty shards while others still hold stock.
+    """
+
+    def __init__(self, async_engine: AsyncEngine) -> None:
+        self.async_engine = async_engine
+        self.interval = settings.get("STOCK_SHARD_REBALANCE_INTERVAL", 30)
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self.task = asyncio.ensure_future(self.run())
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.rebalance()
+            except Exception as ex:
+                logger.error(f"Stock shard rebalancing failed: {ex}")
+
+    async def rebalance(self) -> None:
+        async with self.async_engine.connect() as connection:
+            result = await connection.execute(text("SELECT name FROM config.agencies"))
+            agencies = [row[0] for row in result]
+
+        for agency in agencies:
+            async with session_context(self.async_engine, agency) as session:
+                await session.execute(build_rebalance_query())
+                await session.commit()
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
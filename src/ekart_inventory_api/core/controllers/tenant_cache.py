@@ -0,0 +1,242 @@
+import asyncio
+import json
+from typing import Iterable, Optional
+
+from cachetools import LRUCache
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from ...settings.config import settings
+from ...utils.common.logger import logger
+from ...utils.database.session_context_manager import session_context
+from ..models.products.products import Permission
+
+# Channel the `notify_tenant_cache` trigger publishes row changes on
+CACHE_INVALIDATION_CHANNEL = "tenant_cache_invalidation"
+
+
+class CacheKinds:
+    PERMISSIONS = "permissions"
+
+
+class TenantCache:
+    """
+    Per worker LRU of role permissions, keyed by `(agency, role)`. Permissions
+    live until a change notification from Postgres drops them (see
+    `CacheInvalidationListener`), so every worker sees a permission change as
+    soon as it is committed.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.entries = {
+            CacheKinds.PERMISSIONS: LRUCache(maxsize=maxsize),
+        }
+        # (agency, frozenset(roles)) -> union of those roles' permissions
+        self.combinations = LRUCache(maxsize=maxsize)
+        self.hits = {kind: 0 for kind in self.entries}
+        self.misses = {kind: 0 for kind in self.entries}
+        # Bumped by every invalidation, so a load that raced with one is
+        # returned to its caller but not stored
+        self.generation = 0
+
+    def lookup(self, kind: str, key):
+        value = self.entries[kind].get(key)
+        if value is None:
+            self.misses[kind] += 1
+        else:
+            self.hits[kind] += 1
+        return value
+
+    async def get_permissions(
+        self, agency: str, roles: Iterable[str], async_engine: AsyncEngine
+    ) -> frozenset[tuple[str, str]]:
+        """
+        The effective permissions of a role combination, compiled once into a
+        frozenset and memoized until any permission of the tenant changes.
+        """
+        roles = frozenset(roles)
+        combination = self.combinations.get((agency, roles))
+        if combination is not None:
+            self.hits[CacheKinds.PERMISSIONS] += 1
+            return combination
+
+        permissions = self.entries[CacheKinds.PERMISSIONS]
+        # Cached sets are taken before the load awaits, so an invalidation or
+        # eviction meanwhile cannot drop a role from this request's result
+        role_permissions = {
+            role: self.lookup(CacheKinds.PERMISSIONS, (agency, role)) for role in roles
+        }
+        missing = [role for role, pairs in role_permissions.items() if pairs is None]
+        generation = self.generation
+        if missing:
+            loaded = await self.load_permissions(agency, async_engine, missing)
+            for role in missing:
+                role_permissions[role] = loaded.get(role, frozenset())
+            if generation == self.generation:
+                for role in missing:
+                    permissions[(agency, role)] = role_permissions[role]
+
+        user_permissions = frozenset().union(*role_permissions.values())
+        if generation == self.generation:
+            self.combinations[(agency, roles)] = user_permissions
+        return user_permissions
+
+    @staticmethod
+    async def load_permissions(
+        agency: str, async_engine: AsyncEngine, roles: Optional[list[str]] = None
+    ) -> dict[str, frozenset[tuple[str, str]]]:
+        """
+        Reads `(action, module)` pairs per role in one query, for the given
+        roles or for every role of the tenant.
+        """
+        query = select(
+            Permission.user_role, Permission.permission_action, Permission.module
+        )
+        if roles is not None:
+            query = query.where(Permission.user_role.in_(roles))
+
+        grouped: dict[str, set] = {}
+        async with session_context(async_engine, client_name=agency) as session:
+            result = await session.execute(query)
+            for row in result:
+                grouped.setdefault(row.user_role, set()).add(
+                    (row.permission_action.strip(), row.module.strip())
+                )
+        return {role: frozenset(pairs) for role, pairs in grouped.items()}
+
+    def invalidate(
+        self, kind: str, agency: Optional[str] = None, role: Optional[str] = None
+    ) -> None:
+        """
+        Drops one role's permissions, every entry of a tenant, or, without an
+        agency, every entry of `kind`.
+        """
+        self.generation += 1
+        if kind == CacheKinds.PERMISSIONS:
+            self.combinations.clear()
+        entries = self.entries[kind]
+        if agency is None:
+            entries.clear()
+        elif role is not None:
+            entries.pop((agency, role), None)
+        else:
+            for key in [key for key in entries if key[0] == agency]:
+                entries.pop(key, None)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self.combinations.clear()
+        for entries in self.entries.values():
+            entries.clear()
+
+    async def warm_up(self, async_engine: AsyncEngine) -> None:
+        """
+        Loads every tenant's permissions, one query per tenant, so the first
+        requests after a deploy are hits.
+        """
+        async with async_engine.connect() as connection:
+            result = await connection.execute(text("SELECT name FROM config.agencies"))
+            agencies = [row[0] for row in result]
+
+        for agency in agencies:
+            generation = self.generation
+            loaded = await self.load_permissions(agency, async_engine)
+            if generation != self.generation:
+                # Changed while loading; leave this tenant to load on demand
+                continue
+            for role, pairs in loaded.items():
+                self.entries[CacheKinds.PERMISSIONS][(agency, role)] = pairs
+
+    def metrics(self) -> dict:
+        return {
+            kind: {
+                "hits": self.hits[kind],
+                "misses": self.misses[kind],
+                "size": len(entries),
+                "maxsize": entries.maxsize,
+            }
+            for kind, entries in self.entries.items()
+        }
+
+
+class CacheInvalidationListener:
+    """
+    Holds one connection per worker in `LISTEN` on CACHE_INVALIDATION_CHANNEL
+    and applies each notification to `cache`. If the connection drops, changes
+    made meanwhile are unknown, so the whole cache is cleared and the listener
+    reconnects.
+    """
+
+    def __init__(self, cache: TenantCache, async_engine: AsyncEngine) -> None:
+        self.cache = cache
+        self.async_engine = async_engine
+        self.connection: Optional[AsyncConnection] = None
+        self.reconnect_task: Optional[asyncio.Task] = None
+        self.stopped = False
+
+    async def start(self) -> None:
+        self.stopped = False
+        self.connection = await self.async_engine.connect()
+        try:
+            raw_connection = await self.connection.get_raw_connection()
+            driver_connection = raw_connection.driver_connection
+            await driver_connection.add_listener(
+                CACHE_INVALIDATION_CHANNEL, self.on_notification
+            )
+            driver_connection.add_termination_listener(self.on_termination)
+        except BaseException:
+            await self.discard_connection()
+            raise
+
+    def on_notification(self, connection, pid, channel, payload: str) -> None:
+        try:
+            change = json.loads(payload)
+            self.cache.invalidate(
+                change["kind"], agency=change.get("agency"), role=change.get("role")
+            )
+        except (ValueError, KeyError) as ex:
+            logger.error(f"Ignoring malformed cache notification {payload}: {ex}")
+            self.cache.clear()
+
+    def on_termination(self, connection) -> None:
+        self.cache.clear()
+        if not self.stopped:
+            logger.error("Cache invalidation listener lost its connection")
+            self.reconnect_task = asyncio.ensure_future(self.reconnect())
+
+    async def discard_connection(self) -> None:
+        """
+        Invalidates the dropped connection, so the pool replaces it instead of
+        handing the dead socket to another checkout, and releases it.
+        """
+        connection, self.connection = self.connection, None
+        if connection is None:
+            return
+        try:
+            await connection.invalidate()
+            await connection.close()
+        except Exception as ex:
+            logger.error(f"Cache invalidation listener discard failed: {ex}")
+
+    async def reconnect(self) -> None:
+        await self.discard_connection()
+        delay = 1
+        while not self.stopped:
+            try:
+                await self.start()
+                return
+            except Exception as ex:
+                logger.error(f"Cache invalidation listener reconnect failed: {ex}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60)
+
+    async def stop(self) -> None:
+        self.stopped = True
+        if self.reconnect_task is not None:
+            self.reconnect_task.cancel()
+        if self.connection is not None:
+            await self.connection.close()
+            self.connection = None
+
+
+tenant_cache = TenantCache(maxsize=settings.get("TENANT_CACHE_SIZE", 1000))
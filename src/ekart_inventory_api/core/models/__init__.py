@@ -1,9 +1,11 @@
-from datetime import UTC, date, datetime, time
+from datetime import UTC, datetime
 
 from sqlalchemy import Boolean, DateTime, MetaData, String
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from starlette_context import context
 
+from .serializers import serializer_for
+
 
 def current_user():
     return context.get("user_details")["user_name"]
@@ -34,25 +36,4 @@ class Base(DeclarativeBase):
     )
 
     def to_dict(self):
-        def convert_value(value):
-            if isinstance(value, Base):
-                return value.to_dict()
-            elif isinstance(value, dict):
-                return {key: convert_value(val) for key, val in value.items()}
-            elif isinstance(value, list):
-                return [convert_value(item) for item in value]
-            elif isinstance(value, (datetime, date, time)):
-                return value.isoformat()
-            elif hasattr(value, "to_dict"):
-                return convert_value(value.to_dict())
-            elif hasattr(value, "__dict__"):
-                return convert_value(vars(value))
-            return value
-
-        return {
-            key: convert_value(value)
-            for key, value in self.__dict__.items()
-            if not key.startswith(
-                "_"
-            )  # Exclude private or SQLAlchemy internal attributes
-        }
\ No newline at end of file
+        return serializer_for(type(self))(self)
@@ -0,0 +1,153 @@
+from datetime import date, datetime
+
+from sqlalchemy import (
+    Date,
+    DateTime,
+    ForeignKey,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+)
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from ...models import Base
+
+
+class DefendantDetails(Base):
+    __tablename__ = "defendant_details"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    first_name: Mapped[str] = mapped_column(String(100), nullable=True)
+    middle_name: Mapped[str] = mapped_column(String(100), nullable=True)
+    last_name: Mapped[str] = mapped_column(String(100), nullable=True)
+    suffix: Mapped[str] = mapped_column(String(20), nullable=True)
+    sex: Mapped[str] = mapped_column(String(20), nullable=True)
+    ethnicity: Mapped[str] = mapped_column(String(50), nullable=True)
+    eye_color: Mapped[str] = mapped_column(String(20), nullable=True)
+    hair_color: Mapped[str] = mapped_column(String(20), nullable=True)
+    height: Mapped[str] = mapped_column(String(20), nullable=True)
+    weight: Mapped[str] = mapped_column(String(20), nullable=True)
+    dob: Mapped[date] = mapped_column(Date, nullable=True)
+    license_number: Mapped[str] = mapped_column(String(50), nullable=True)
+    license_state_code: Mapped[str] = mapped_column(String(10), nullable=True)
+    race: Mapped[str] = mapped_column(String(20), nullable=True)
+    ssn_id: Mapped[str] = mapped_column(String(20), nullable=True, index=True)
+
+    # Relationships
+    contacts: Mapped[list["DefendantContactDetails"]] = relationship(
+        "DefendantContactDetails",
+        back_populates="defendant",
+        cascade="all, delete-orphan",
+    )
+    cases: Mapped[list["CaseRecord"]] = relationship(
+        "CaseRecord", back_populates="defendant"
+    )
+
+
+class DefendantContactDetails(Base):
+    __tablename__ = "defendant_contact_details"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    defendant_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("defendant_details.id"), nullable=False, index=True
+    )
+    address_delivery_point: Mapped[str] = mapped_column(String(255), nullable=True)
+    mailing_address: Mapped[str] = mapped_column(String(255), nullable=True)
+    location_city_name: Mapped[str] = mapped_column(String(100), nullable=True)
+    location_state_code: Mapped[str] = mapped_column(String(10), nullable=True)
+    location_postal_code: Mapped[str] = mapped_column(String(20), nullable=True)
+    phone_number: Mapped[str] = mapped_column(String(30), nullable=True)
+
+    # Relationship
+    defendant: Mapped["DefendantDetails"] = relationship(
+        "DefendantDetails", back_populates="contacts"
+    )
+
+
+class Charge(Base):
+    __tablename__ = "charges"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    charge_code: Mapped[str] = mapped_column(String(50), nullable=True)
+    charge_description: Mapped[str] = mapped_column(Text, nullable=True)
+    charge_type: Mapped[str] = mapped_column(String(50), nullable=True)
+
+
+class CaseRecord(Base):
+    __tablename__ = "case_records"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    case_number: Mapped[str] = mapped_column(String(100), nullable=False, unique=True)
+    defendant_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("defendant_details.id"), nullable=True, index=True
+    )
+    violation_date: Mapped[date] = mapped_column(Date, nullable=True)
+    violation_location: Mapped[str] = mapped_column(String(255), nullable=True)
+    violation_order: Mapped[str] = mapped_column(String(50), nullable=True)
+    ticket_number: Mapped[str] = mapped_column(String(100), nullable=True)
+    ticket_type: Mapped[str] = mapped_column(String(50), nullable=True)
+    hearing_date: Mapped[str] = mapped_column(String(50), nullable=True)
+    hearing_time: Mapped[str] = mapped_column(String(50), nullable=True)
+    issue_datetime: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    all_charge_start: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    all_charge_end: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    issuing_official_name: Mapped[str] = mapped_column(String(255), nullable=True)
+    issuing_official_badge_number: Mapped[str] = mapped_column(
+        String(50), nullable=True
+    )
+    room_number: Mapped[str] = mapped_column(String(50), nullable=True)
+    driving_incident_legal_speed_rate: Mapped[str] = mapped_column(
+        String(50), nullable=True
+    )
+    driving_incident_recorded_speed_rate: Mapped[str] = mapped_column(
+        String(50), nullable=True
+    )
+    additional_notes: Mapped[str] = mapped_column(Text, nullable=True)
+    observation_text: Mapped[str] = mapped_column(Text, nullable=True)
+    location_description_text: Mapped[str] = mapped_column(Text, nullable=True)
+    county_name: Mapped[str] = mapped_column(String(100), nullable=True)
+    warrant_number: Mapped[str] = mapped_column(String(100), nullable=True)
+    bench_warrant_number: Mapped[str] = mapped_column(String(100), nullable=True)
+    pd_reference_number: Mapped[str] = mapped_column(String(100), nullable=True)
+    vehicle_year: Mapped[str] = mapped_column(String(10), nullable=True)
+    vehicle_make: Mapped[str] = mapped_column(String(50), nullable=True)
+    vehicle_model: Mapped[str] = mapped_column(String(50), nullable=True)
+    vehicle_registration_plate_no: Mapped[str] = mapped_column(
+        String(50), nullable=True
+    )
+
+    # Relationships
+    defendant: Mapped["DefendantDetails"] = relationship(
+        "DefendantDetails", back_populates="cases"
+    )
+    case_charge_associations: Mapped[list["CaseChargeAssociation"]] = relationship(
+        "CaseChargeAssociation",
+        back_populates="case_record",
+        cascade="all, delete-orphan",
+    )
+
+
+class CaseChargeAssociation(Base):
+    __tablename__ = "case_charge_associations"
+    __table_args__ = (UniqueConstraint("case_record_id", "charge_id"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    case_record_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("case_records.id"), nullable=False, index=True
+    )
+    charge_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("charges.id"), nullable=False, index=True
+    )
+
+    # Relationships
+    case_record: Mapped["CaseRecord"] = relationship(
+        "CaseRecord", back_populates="case_charge_associations"
+    )
+    charge: Mapped["Charge"] = relationship("Charge")
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, Table, Text
+
+from ...models import Base
+
+# One lowercased text document per case record, built from every String/Text
+# column of the case, its defendant and its charges. Indexed with a pg_trgm GIN
+# index so `ILIKE '%term%'` searches do not scan the case join.
+case_search_documents = Table(
+    "case_search_documents",
+    Base.metadata,
+    Column("case_record_id", Integer, primary_key=True),
+    Column("document", Text, nullable=False),
+)
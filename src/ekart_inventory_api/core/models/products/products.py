@@ -1,7 +1,15 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -64,6 +72,8 @@ class ProductInventory(Base):
     category_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("category.id"), nullable=False
     )
+    # Number of `ProductStockShard` rows holding the stock, 0 when unsharded
+    stock_shards: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
 
     # Relationships
     category: Mapped["Category"] = relationship("Category", back_populates="products")
@@ -73,6 +83,21 @@ class ProductInventory(Base):
     )
 
 
+class ProductStockShard(Base):
+    """
+    A slice of a hot product's stock. A sharded product's available quantity
+    is its own `quantity` plus the sum of its shards.
+    """
+
+    __tablename__ = "product_stock_shard"
+
+    product_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("product_inventory.id"), primary_key=True
+    )
+    shard: Mapped[int] = mapped_column(Integer, primary_key=True)
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
 class Cart(Base):
     __tablename__ = "cart"
 
@@ -102,14 +127,17 @@ class OrderHistory(Base):
     user_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("users.id"), nullable=False
     )
-    product_id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), ForeignKey("product_inventory.id"), nullable=False
+    product_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("product_inventory.id"), nullable=False
     )
     quantity: Mapped[int] = mapped_column(Integer, nullable=False)
     total_price: Mapped[float] = mapped_column(Float, nullable=False)
     order_date: Mapped[datetime] = mapped_column(
         DateTime, nullable=False, default=datetime.utcnow
     )
+    checkout_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("checkout_request.id"), nullable=True, index=True
+    )
 
     # Relationships
     user: Mapped["User"] = relationship("User", back_populates="orders")
@@ -118,6 +146,22 @@ class OrderHistory(Base):
     )
 
 
+class CheckoutRequest(Base):
+    """
+    One checkout per client supplied idempotency key, so a retried checkout
+    returns the orders of the first attempt instead of placing them again.
+    """
+
+    __tablename__ = "checkout_request"
+    __table_args__ = (UniqueConstraint("user_id", "idempotency_key"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), nullable=False
+    )
+    idempotency_key: Mapped[str] = mapped_column(String(255), nullable=False)
+
+
 # @event.listens_for(Permission, "after_insert")
 # @event.listens_for(Permission, "after_update")
 # @event.listens_for(Permission, "after_delete")
@@ -0,0 +1,90 @@
+from datetime import date, datetime, time
+from typing import Callable
+
+from sqlalchemy import inspect
+
+# Mapped class -> compiled serializer
+serializers: dict[type, Callable] = {}
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def _column_converter(column):
+    """
+    Picks the conversion for a column once, from its type, instead of probing
+    every value. Only temporal values need converting to be JSON ready.
+    """
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return None
+    if issubclass(python_type, (datetime, date, time)):
+        return _isoformat
+    return None
+
+
+def serializer_for(model: type) -> Callable:
+    """
+    Returns a function that turns an instance of `model` into a dict, built
+    from the mapper's columns and relationships. Like the reflection based
+    `Base.to_dict` it replaces, only attributes already loaded on the instance
+    are included, so serializing never triggers a lazy load.
+    """
+    serializer = serializers.get(model)
+    if serializer is None:
+        serializer = _compile(model)
+        serializers[model] = serializer
+    return serializer
+
+
+def _compile(model: type) -> Callable:
+    mapper = inspect(model)
+    columns = []
+    for attribute in mapper.column_attrs:
+        converter = None
+        if len(attribute.columns) == 1:
+            converter = _column_converter(attribute.columns[0])
+        columns.append((attribute.key, converter))
+    relationships = [
+        (relationship.key, relationship.uselist)
+        for relationship in mapper.relationships
+    ]
+
+    def serialize(instance, _path: set = None) -> dict:
+        state = instance.__dict__
+        data = {}
+        for key, converter in columns:
+            if key in state:
+                value = state[key]
+                data[key] = converter(value) if converter else value
+        if not relationships:
+            return data
+
+        # Ids of the instances being serialized above this one, so back
+        # references loaded in both directions are not followed
+        path = set() if _path is None else _path
+        path.add(id(instance))
+        for key, uselist in relationships:
+            if key not in state:
+                continue
+            value = state[key]
+            if value is None:
+                data[key] = None
+            elif uselist:
+                data[key] = [
+                    serializer_for(type(item))(item, path)
+                    for item in value
+                    if id(item) not in path
+                ]
+            elif id(value) not in path:
+                data[key] = serializer_for(type(value))(value, path)
+        path.discard(id(instance))
+        return data
+
+    return serialize
+
+
+def serialize_all(instances) -> list[dict]:
+    return [serializer_for(type(instance))(instance) for instance in instances]
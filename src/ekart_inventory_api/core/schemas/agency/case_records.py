@@ -0,0 +1,64 @@
+from datetime import date, datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class ContactCreate(BaseModel):
+    address_delivery_point: Optional[str] = None
+    mailing_address: Optional[str] = None
+    location_city_name: Optional[str] = None
+    location_state_code: Optional[str] = None
+    location_postal_code: Optional[str] = None
+    phone_number: Optional[str] = None
+
+
+class DefendantCreate(BaseModel):
+    ssn_id: Optional[str] = None
+    first_name: Optional[str] = None
+    middle_name: Optional[str] = None
+    last_name: Optional[str] = None
+    suffix: Optional[str] = None
+    sex: Optional[str] = None
+    ethnicity: Optional[str] = None
+    eye_color: Optional[str] = None
+    hair_color: Optional[str] = None
+    height: Optional[str] = None
+    weight: Optional[str] = None
+    dob: Optional[date] = None
+    license_number: Optional[str] = None
+    license_state_code: Optional[str] = None
+    race: Optional[str] = None
+    contacts: List[ContactCreate] = []
+
+
+class CaseRecordCreate(BaseModel):
+    case_number: str
+    violation_date: Optional[date] = None
+    violation_location: Optional[str] = None
+    violation_order: Optional[str] = None
+    ticket_number: Optional[str] = None
+    ticket_type: Optional[str] = None
+    hearing_date: Optional[str] = None
+    hearing_time: Optional[str] = None
+    issue_datetime: Optional[datetime] = None
+    all_charge_start: Optional[datetime] = None
+    all_charge_end: Optional[datetime] = None
+    issuing_official_name: Optional[str] = None
+    issuing_official_badge_number: Optional[str] = None
+    room_number: Optional[str] = None
+    driving_incident_legal_speed_rate: Optional[str] = None
+    driving_incident_recorded_speed_rate: Optional[str] = None
+    additional_notes: Optional[str] = None
+    observation_text: Optional[str] = None
+    location_description_text: Optional[str] = None
+    county_name: Optional[str] = None
+    warrant_number: Optional[str] = None
+    bench_warrant_number: Optional[str] = None
+    pd_reference_number: Optional[str] = None
+    vehicle_year: Optional[str] = None
+    vehicle_make: Optional[str] = None
+    vehicle_model: Optional[str] = None
+    vehicle_registration_plate_no: Optional[str] = None
+    charge_ids: List[int] = []
+    defendant: DefendantCreate
@@ -0,0 +1,6 @@
+from pydantic import BaseModel, Field
+
+
+class CartItemRequest(BaseModel):
+    product_id: int
+    quantity: int = Field(ge=0)
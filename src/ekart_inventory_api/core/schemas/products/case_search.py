@@ -0,0 +1,29 @@
+from datetime import date
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class CaseSearchQuery(BaseModel):
+    """
+    Query string of the case search. Besides `search_string`, any field named
+    after a case, defendant or charge column filters on that column.
+    """
+
+    search_string: Optional[str] = None
+    case_number: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    violation_location: Optional[str] = None
+    charge_description: Optional[str] = None
+    violation_start_date: date
+    violation_end_date: date
+
+    num_of_records: int = Field(10, gt=0, le=500)
+    # `page` mode uses `page`; `cursor` mode seeks past `cursor`, the
+    # `next_cursor` of the previous page, and counts only with `include_total`
+    pagination: Literal["page", "cursor"] = "page"
+    page: int = Field(1, gt=0)
+    cursor: Optional[str] = None
+    include_total: bool = False
+    count_strategy: Literal["exact", "capped", "estimated"] = "exact"
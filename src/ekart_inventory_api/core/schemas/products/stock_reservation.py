@@ -0,0 +1,10 @@
+from pydantic import BaseModel, Field
+
+
+class StockReservationRequest(BaseModel):
+    product_id: int
+    quantity: int = Field(gt=0)
+
+
+# Entries accepted by one bulk reservation, which runs in a single transaction
+MAX_BULK_RESERVATIONS = 500
@@ -1,9 +1,22 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
 from starlette_context.middleware import RawContextMiddleware
 from starlette_context.plugins import CorrelationIdPlugin, RequestIdPlugin
 
+from .core.controllers.products.cart_store import cart_store
+from .core.controllers.products.case_search import backfill_search_documents
+from .core.controllers.products.citation_pool import shutdown_parse_pool
+from .core.controllers.products.stock_reservation import shutdown_stock_reservations
+from .core.controllers.products.stock_shards import StockShardRebalancer
+from .core.controllers.tenant_cache import CacheInvalidationListener, tenant_cache
+from .routers.metrics import metrics_router
+from .utils.aws.aws_client import aws_clients
+from .utils.common.logger import logger
+from .utils.database.connections import get_async_engine
+
 # from .routers import 
 from .settings.config import settings
 
@@ -11,11 +24,43 @@ description = """
 Ekart Inventory and Payment Management System
 """
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await aws_clients.start()
+    async_engine = await get_async_engine.start()
+    cache_listener = CacheInvalidationListener(tenant_cache, async_engine)
+    # Listen first, so changes committed during warm-up are not missed
+    await cache_listener.start()
+    try:
+        await tenant_cache.warm_up(async_engine)
+    except Exception as ex:
+        logger.error(f"Tenant cache warm-up failed, loading on demand: {ex}")
+    try:
+        await backfill_search_documents(async_engine)
+    except Exception as ex:
+        logger.error(f"Case search backfill failed: {ex}")
+    cart_store.start(async_engine)
+    shard_rebalancer = StockShardRebalancer(async_engine)
+    if settings.get("STOCK_SHARDING", False):
+        shard_rebalancer.start()
+    yield
+    await shard_rebalancer.stop()
+    shutdown_stock_reservations()
+    # Before the engine is disposed, so pending cart changes are written
+    await cart_store.stop()
+    await cache_listener.stop()
+    await get_async_engine.dispose()
+    await aws_clients.close()
+    shutdown_parse_pool()
+
+
 app = FastAPI(
     title="EKart",
     description=description,
     version="0.0.1",
     responses={404: {"description": "Not found"}},
+    lifespan=lifespan,
 )
 
 
@@ -24,6 +69,8 @@ def root():
     return RedirectResponse(url="/docs")
 
 
+app.include_router(metrics_router)
+
 origins = settings.get("ALLOWED_ORIGINS") or []
 
 app.add_middleware(
@@ -37,6 +84,7 @@ app.add_middleware(
         "Authorization",
         "Access-Control-Allow-Origin",
         "Client",
+        "Idempotency-Key",
     ],
 )
 
@@ -0,0 +1,53 @@
+"""case search documents
+
+Revision ID: 3f1c2a9d7b41
+Revises:
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1c2a9d7b41"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def is_tenant_schema() -> bool:
+    # env.py also runs every revision in the shared `config` schema, which has
+    # no case tables
+    return op.get_context().version_table_schema != "config"
+
+
+def upgrade() -> None:
+    if not is_tenant_schema():
+        return
+    # pg_trgm is installed once per database; env.py narrows search_path to the
+    # tenant schema, so the operator class is referenced by its schema.
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public")
+    op.create_table(
+        "case_search_documents",
+        sa.Column("case_record_id", sa.Integer(), nullable=False),
+        sa.Column("document", sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint("case_record_id"),
+    )
+    op.execute(
+        "CREATE INDEX ix_case_search_documents_document_trgm "
+        "ON case_search_documents USING gin (document public.gin_trgm_ops)"
+    )
+    # Documents are derived from the case models' text columns, so they are
+    # filled by the application's startup backfill, not here
+
+
+def downgrade() -> None:
+    if not is_tenant_schema():
+        return
+    op.drop_index(
+        "ix_case_search_documents_document_trgm", table_name="case_search_documents"
+    )
+    op.drop_table("case_search_documents")
@@ -0,0 +1,82 @@
+"""tenant cache invalidation notifications
+
+Revision ID: 8b2e4c6d1a53
+Revises: 3f1c2a9d7b41
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8b2e4c6d1a53"
+down_revision: Union[str, None] = "3f1c2a9d7b41"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def is_tenant_schema() -> bool:
+    # env.py also runs every revision in the shared `config` schema, which has
+    # no permissions table
+    return op.get_context().version_table_schema != "config"
+
+
+def upgrade() -> None:
+    # Shared by every tenant schema; the payload names the schema the row
+    # changed in. TG_ARGV[0] is the cache kind the table feeds.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION public.notify_tenant_cache() RETURNS trigger AS $$
+        DECLARE
+            changed jsonb := CASE
+                WHEN TG_OP = 'DELETE' THEN to_jsonb(OLD) ELSE to_jsonb(NEW)
+            END;
+            previous jsonb := CASE WHEN TG_OP = 'UPDATE' THEN to_jsonb(OLD) END;
+        BEGIN
+            PERFORM pg_notify(
+                'tenant_cache_invalidation',
+                json_build_object(
+                    'kind', TG_ARGV[0],
+                    'agency', TG_TABLE_SCHEMA,
+                    'role', changed ->> 'user_role'
+                )::text
+            );
+            -- A row moved to another role also invalidates the old role
+            IF TG_OP = 'UPDATE'
+                AND previous ->> 'user_role' IS DISTINCT FROM changed ->> 'user_role'
+            THEN
+                PERFORM pg_notify(
+                    'tenant_cache_invalidation',
+                    json_build_object(
+                        'kind', TG_ARGV[0],
+                        'agency', TG_TABLE_SCHEMA,
+                        'role', previous ->> 'user_role'
+                    )::text
+                );
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    if not is_tenant_schema():
+        return
+    op.execute(
+        "CREATE TRIGGER permissions_notify_tenant_cache "
+        "AFTER INSERT OR UPDATE OR DELETE ON permissions "
+        "FOR EACH ROW EXECUTE FUNCTION public.notify_tenant_cache('permissions')"
+    )
+
+
+def downgrade() -> None:
+    if is_tenant_schema():
+        op.execute(
+            "DROP TRIGGER IF EXISTS permissions_notify_tenant_cache ON permissions"
+        )
+        return
+    # env.py runs the `config` schema after every tenant, so the triggers are
+    # gone by now; without CASCADE a tenant left behind fails here instead of
+    # silently losing its trigger
+    op.execute("DROP FUNCTION IF EXISTS public.notify_tenant_cache()")
@@ -0,0 +1,81 @@
+"""sharded stock counters
+
+Revision ID: c4d9e2a7f610
+Revises: 8b2e4c6d1a53
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4d9e2a7f610"
+down_revision: Union[str, None] = "8b2e4c6d1a53"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def is_tenant_schema() -> bool:
+    # env.py also runs every revision in the shared `config` schema, which has
+    # no product tables
+    return op.get_context().version_table_schema != "config"
+
+
+def upgrade() -> None:
+    if not is_tenant_schema():
+        return
+    op.add_column(
+        "product_inventory",
+        sa.Column("stock_shards", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_table(
+        "product_stock_shard",
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("shard", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_by", sa.String(length=64), nullable=True),
+        sa.Column("created_on", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("modified_by", sa.String(length=64), nullable=True),
+        sa.Column("modified_on", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["product_id"], ["product_inventory.id"]),
+        sa.PrimaryKeyConstraint("product_id", "shard"),
+    )
+    # ProductInventory.quantity semantics for reporting and ad hoc SQL, with
+    # a sharded product's shards folded back in
+    op.execute(
+        """
+        CREATE VIEW product_stock AS
+        SELECT p.id, p.quantity + coalesce(s.quantity, 0) AS quantity
+        FROM product_inventory p
+        LEFT JOIN (
+            SELECT product_id, sum(quantity) AS quantity
+            FROM product_stock_shard
+            GROUP BY product_id
+        ) s ON s.product_id = p.id
+        """
+    )
+
+
+def downgrade() -> None:
+    if not is_tenant_schema():
+        return
+    # Fold shard stock back into the products before dropping the shards
+    op.execute(
+        """
+        UPDATE product_inventory p
+        SET quantity = p.quantity + s.quantity
+        FROM (
+            SELECT product_id, sum(quantity) AS quantity
+            FROM product_stock_shard
+            GROUP BY product_id
+        ) s
+        WHERE s.product_id = p.id
+        """
+    )
+    op.execute("DROP VIEW IF EXISTS product_stock")
+    op.drop_table("product_stock_shard")
+    op.drop_column("product_inventory", "stock_shards")
@@ -0,0 +1,65 @@
+"""checkout idempotency keys
+
+Revision ID: e7a3b5c1d294
+Revises: c4d9e2a7f610
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e7a3b5c1d294"
+down_revision: Union[str, None] = "c4d9e2a7f610"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def is_tenant_schema() -> bool:
+    # env.py also runs every revision in the shared `config` schema, which has
+    # no order tables
+    return op.get_context().version_table_schema != "config"
+
+
+def upgrade() -> None:
+    if not is_tenant_schema():
+        return
+    op.create_table(
+        "checkout_request",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("idempotency_key", sa.String(length=255), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_by", sa.String(length=64), nullable=True),
+        sa.Column("created_on", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("modified_by", sa.String(length=64), nullable=True),
+        sa.Column("modified_on", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id", "idempotency_key"),
+    )
+    op.add_column(
+        "order_history", sa.Column("checkout_id", sa.Integer(), nullable=True)
+    )
+    op.create_foreign_key(
+        "order_history_checkout_id_fkey",
+        "order_history",
+        "checkout_request",
+        ["checkout_id"],
+        ["id"],
+    )
+    op.create_index("ix_order_history_checkout_id", "order_history", ["checkout_id"])
+
+
+def downgrade() -> None:
+    if not is_tenant_schema():
+        return
+    op.drop_index("ix_order_history_checkout_id", table_name="order_history")
+    op.drop_constraint(
+        "order_history_checkout_id_fkey", "order_history", type_="foreignkey"
+    )
+    op.drop_column("order_history", "checkout_id")
+    op.drop_table("checkout_request")
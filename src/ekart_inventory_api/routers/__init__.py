@@ -1,6 +1,8 @@
 from fastapi import APIRouter
 
-from .products import _product_management
+from .products import _cart_router, _case_router, _inventory_router
 
 product_router = APIRouter()
-product_router.include_router(router=_product_management)
\ No newline at end of file
+product_router.include_router(router=_case_router)
+product_router.include_router(router=_inventory_router)
+product_router.include_router(router=_cart_router)
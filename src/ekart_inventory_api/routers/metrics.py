@@ -0,0 +1,55 @@
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from starlette.status import HTTP_401_UNAUTHORIZED, HTTP_404_NOT_FOUND
+
+from ..core.controllers.products.cart_store import cart_store
+from ..core.controllers.tenant_cache import tenant_cache
+from ..settings.config import settings
+from ..utils.aws.aws_client import aws_clients
+from ..utils.database.connections import get_async_engine
+
+
+def require_metrics_token(authorization: Optional[str] = Header(None)) -> None:
+    """
+    Metrics are for operators, not tenants, and name internal hosts, so they
+    are served only to `Authorization: Bearer <METRICS_TOKEN>`. Without a
+    configured token the endpoints do not exist.
+    """
+    token = settings.get("METRICS_TOKEN")
+    if not token:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Not Found")
+    if authorization is None or not secrets.compare_digest(
+        authorization.encode(), f"Bearer {token}".encode()
+    ):
+        raise HTTPException(
+            status_code=HTTP_401_UNAUTHORIZED, detail="Not Authenticated"
+        )
+
+
+metrics_router = APIRouter(
+    prefix="/metrics",
+    include_in_schema=False,
+    dependencies=[Depends(require_metrics_token)],
+)
+
+
+@metrics_router.get("/aws-clients")
+def aws_client_metrics():
+    return aws_clients.pool_metrics()
+
+
+@metrics_router.get("/db-pool")
+def db_pool_metrics():
+    return get_async_engine.pool_metrics()
+
+
+@metrics_router.get("/tenant-cache")
+def tenant_cache_metrics():
+    return tenant_cache.metrics()
+
+
+@metrics_router.get("/cart-store")
+async def cart_store_metrics():
+    return await cart_store.metrics()
@@ -1,15 +1,28 @@
-from datetime import date
-from typing import List
+import json
+from typing import Annotated, List
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Body, Depends, Header, Query, Request
+from fastapi.responses import StreamingResponse
 
-from .core.controllers.agency.product_management_controller import (
+from ..core.controllers.manage_cache_dependency import manage_request_state
+from ..core.controllers.products.cart_store import CartController, require_cart_owner
+from ..core.controllers.products.checkout import CheckoutController
+from ..core.controllers.products.product_management import (
     CaseRecordsController,
 )
-from .core.controllers.manage_cache_dependency import manage_request_state
-from .core.schemas.agency.case_records import (
+from ..core.controllers.products.stock_reservation import StockReservationController
+from ..core.schemas.agency.case_records import (
     CaseRecordCreate,
 )
+from ..core.schemas.products.cart import CartItemRequest
+from ..core.schemas.products.case_search import CaseSearchQuery
+from ..core.schemas.products.stock_reservation import (
+    MAX_BULK_RESERVATIONS,
+    StockReservationRequest,
+)
+from ..utils.auth.decorator import require_permissions
+from ..utils.helper import iter_lines
+from ..utils.responses import FastJSONResponse
 
 _case_router = APIRouter(
     prefix="/v1/product_management",
@@ -17,6 +30,21 @@ _case_router = APIRouter(
     dependencies=[Depends(manage_request_state)],
 )
 
+_inventory_router = APIRouter(
+    prefix="/v1/inventory",
+    tags=["inventory"],
+    dependencies=[Depends(manage_request_state)],
+)
+
+_cart_router = APIRouter(
+    prefix="/v1/cart",
+    tags=["cart"],
+    dependencies=[Depends(manage_request_state)],
+)
+
+# Re-laying out a product's stock rows is an operator action, not a shopper one
+INVENTORY_ADMIN = [("admin", "inventory")]
+
 
 @_case_router.post("/case")
 async def create_case_record(
@@ -24,3 +52,208 @@ async def create_case_record(
     controller: CaseRecordsController = Depends(),
 ):
     return await controller.create_case_records(request)
+
+
+@_case_router.get("/cases")
+async def search_case_records(
+    query: Annotated[CaseSearchQuery, Query()],
+    controller: CaseRecordsController = Depends(),
+):
+    """
+    Searches case records a page at a time, by page number or, with
+    `pagination=cursor`, by the `next_cursor` of the previous page.
+    """
+    return await controller.search_case_records(query)
+
+
+@_case_router.get("/case/{case_number}", response_class=FastJSONResponse)
+async def fetch_case_record(
+    case_number: str,
+    controller: CaseRecordsController = Depends(),
+):
+    return FastJSONResponse(await controller.fetch_case_record(case_number))
+
+
+@_case_router.get("/defendants", response_class=FastJSONResponse)
+async def get_all_defendants(controller: CaseRecordsController = Depends()):
+    return FastJSONResponse(await controller.get_all_defendants())
+
+
+@_case_router.get("/charges", response_class=FastJSONResponse)
+async def get_all_charges(controller: CaseRecordsController = Depends()):
+    return FastJSONResponse(await controller.get_all_charges())
+
+
+@_case_router.post("/case/bulk")
+async def bulk_create_case_records(
+    request: Request,
+    controller: CaseRecordsController = Depends(),
+):
+    """
+    Accepts newline-delimited `CaseRecordCreate` JSON and returns an outcome
+    for every line.
+    """
+    return await controller.bulk_create_case_records(iter_lines(request.stream()))
+
+
+@_case_router.post("/xml/parse")
+async def parse_citation_xml_batch(
+    keys: List[str] = Body(...),
+    controller: CaseRecordsController = Depends(),
+):
+    """
+    Streams one NDJSON line per S3 key as soon as that citation is parsed.
+    """
+
+    async def stream():
+        async for result in controller.parse_citation_xml_batch(keys):
+            yield json.dumps(result, default=str) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@_case_router.get("/xml")
+async def get_all_xml(
+    created_on: str | None = None,
+    stream: bool = False,
+    controller: CaseRecordsController = Depends(),
+):
+    """
+    Lists uploaded citation XML. With `stream=true` entries are sent as NDJSON
+    while the folder is still being processed.
+    """
+    if not stream:
+        return await controller.get_all_xml(created_on)
+
+    async def entries():
+        async for entry in controller.iter_all_xml(created_on):
+            yield json.dumps(entry, default=str) + "\n"
+
+    return StreamingResponse(entries(), media_type="application/x-ndjson")
+
+
+@_case_router.post("/xml/stream")
+async def stream_xml_upload(
+    request: Request,
+    filename: str,
+    created_on: str,
+    controller: CaseRecordsController = Depends(),
+):
+    """
+    Uploads one citation XML sent as the raw request body. The body is piped
+    to S3 as it arrives instead of being spooled like a multipart form file.
+    """
+    return await controller.stream_xml_to_s3(
+        request.stream(),
+        filename,
+        created_on,
+        content_length=request.headers.get("content-length"),
+    )
+
+
+@_case_router.get("/xml/dates")
+async def get_xml_dates(controller: CaseRecordsController = Depends()):
+    return await controller.get_xml_dates()
+
+
+@_inventory_router.post("/stock/reserve")
+async def reserve_stock(
+    request: StockReservationRequest,
+    controller: StockReservationController = Depends(),
+):
+    """
+    Reserves stock for one product. Concurrent calls are coalesced into one
+    statement per batching window.
+    """
+    return await controller.reserve(request.product_id, request.quantity)
+
+
+@_inventory_router.post("/stock/reserve/bulk")
+async def reserve_stock_bulk(
+    requests: Annotated[
+        List[StockReservationRequest], Body(max_length=MAX_BULK_RESERVATIONS)
+    ],
+    controller: StockReservationController = Depends(),
+):
+    """
+    Reserves stock for a list of up to MAX_BULK_RESERVATIONS products in one
+    transaction and returns an outcome per entry, in request order.
+    """
+    return await controller.reserve_many(
+        [(request.product_id, request.quantity) for request in requests]
+    )
+
+
+@_inventory_router.get("/stock/{product_id}")
+async def get_stock(
+    product_id: int,
+    controller: StockReservationController = Depends(),
+):
+    """
+    Available quantity of a product, with its shards folded in if it has any.
+    """
+    return await controller.get_stock(product_id)
+
+
+@_inventory_router.post("/stock/{product_id}/shards")
+@require_permissions(INVENTORY_ADMIN)
+async def shard_stock(
+    request: Request,
+    product_id: int,
+    shards: int | None = Query(None, gt=0),
+    controller: StockReservationController = Depends(),
+):
+    return await controller.shard(product_id, shards)
+
+
+@_inventory_router.delete("/stock/{product_id}/shards")
+@require_permissions(INVENTORY_ADMIN)
+async def unshard_stock(
+    request: Request,
+    product_id: int,
+    controller: StockReservationController = Depends(),
+):
+    return await controller.unshard(product_id)
+
+
+@_cart_router.get("/{user_id}", dependencies=[Depends(require_cart_owner)])
+async def get_cart(user_id: int, controller: CartController = Depends()):
+    return await controller.get_cart(user_id)
+
+
+@_cart_router.post("/{user_id}/items", dependencies=[Depends(require_cart_owner)])
+async def add_cart_item(
+    user_id: int,
+    request: CartItemRequest,
+    controller: CartController = Depends(),
+):
+    """
+    Adds `quantity` of a product to the cart.
+    """
+    return await controller.add_item(user_id, request.product_id, request.quantity)
+
+
+@_cart_router.put("/{user_id}/items", dependencies=[Depends(require_cart_owner)])
+async def set_cart_item(
+    user_id: int,
+    request: CartItemRequest,
+    controller: CartController = Depends(),
+):
+    """
+    Sets a cart line's quantity; 0 removes the line.
+    """
+    return await controller.set_item(user_id, request.product_id, request.quantity)
+
+
+@_cart_router.post("/{user_id}/checkout", dependencies=[Depends(require_cart_owner)])
+async def checkout(
+    user_id: int,
+    idempotency_key: str = Header(..., alias="Idempotency-Key", max_length=255),
+    controller: CheckoutController = Depends(),
+):
+    """
+    Places the whole cart as orders in one transaction. Retrying with the same
+    `Idempotency-Key` returns the first attempt's orders instead of ordering
+    and reserving stock again.
+    """
+    return await controller.checkout(user_id, idempotency_key)
@@ -1,20 +1,22 @@
-from functools import lru_cache
+import asyncio
+import hashlib
+import time
 from typing import Any, Optional
 
 import httpx
+from cachetools import TLRUCache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer
-from jose import jwt
+from jose import jwk, jwt
 from pydantic import BaseModel
 from starlette.requests import Request
 from starlette.status import HTTP_401_UNAUTHORIZED
 
-from .core.controllers.dependencies import get_client_header
-from .settings.config import settings
-from .utils.aws.async_aws_client import get_cognito
-from .utils.aws.aws_client import AWSServices, get_client
-from .utils.common.logger import logger
-from .utils.user.user import decode_user_access
+from ...core.controllers.dependencies import get_client_header
+from ...settings.config import settings
+from ..aws.aws_client import get_cognito
+from ..common.logger import logger
+from ..user.user import decode_user_access
 
 
 class ArrayUserAttribute:
@@ -78,6 +80,49 @@ class ArrayUserAttribute:
         return iter(self.values)
 
 
+class AuthModes:
+    # Verify the token, then read the profile with cognito get_user
+    COGNITO = "cognito"
+    # Build the profile from verified ID token claims only
+    CLAIMS = "claims"
+
+
+def _until_token_expiry(key, value, now) -> float:
+    # Nothing tells this worker when an admin changes a user's attributes in
+    # Cognito, so a profile is read again after AUTH_USER_CACHE_TTL seconds
+    # even if its token is still valid
+    return min(value["exp"], now + settings.get("AUTH_USER_CACHE_TTL", 300))
+
+
+# sha256(token) -> Cognito user profile, dropped when the token expires or
+# after AUTH_USER_CACHE_TTL seconds, whichever comes first
+user_profile_cache = TLRUCache(
+    maxsize=settings.get("AUTH_USER_CACHE_SIZE", 10000),
+    ttu=_until_token_expiry,
+    timer=time.time,
+)
+
+
+def token_cache_key(jwt_token: str) -> str:
+    return hashlib.sha256(jwt_token.encode()).hexdigest()
+
+
+def invalidate_user_profile(
+    user_name: Optional[str] = None, jwt_token: Optional[str] = None
+) -> None:
+    """
+    Drops this worker's cached profiles for one token, or for every token of
+    `user_name`, so its next request reads them from Cognito again. Other
+    workers keep theirs until AUTH_USER_CACHE_TTL runs out.
+    """
+    if jwt_token:
+        user_profile_cache.pop(token_cache_key(jwt_token), None)
+    if user_name:
+        for key, profile in list(user_profile_cache.items()):
+            if profile["user_name"] == user_name:
+                user_profile_cache.pop(key, None)
+
+
 class JWKS(BaseModel):
     keys: list[dict[str, str]]
 
@@ -100,26 +145,151 @@ class JWTAuthorizationCredentials(BaseModel):
         arbitrary_types_allowed = True
 
 
-@lru_cache(maxsize=5)
-def get_jwks(user_pool_id: str) -> JWKS:
-    endpoint = (
-        f"https://cognito-idp.{user_pool_id.split('_')[0]}"
-        f".amazonaws.com/{user_pool_id}/.well-known/jwks.json"
-    )
-    response = httpx.get(endpoint)
-    if response.status_code != 200:
-        raise HTTPException(
-            status.HTTP_500_INTERNAL_SERVER_ERROR,
-            "Unable to fetch JWKS of default Cognito user pool",
+class JWKSProvider:
+    """
+    Signing keys of a Cognito user pool, fetched lazily with an async client
+    and indexed by `kid` as constructed key objects, so each token is
+    verified against exactly one key.
+
+    Keys are considered fresh for `JWKS_REFRESH_INTERVAL` seconds. After that
+    the first request triggers a refresh in the background and keeps using
+    the current keys, unless they are older than `JWKS_MAX_AGE`. An unknown
+    `kid`, as after a key rotation, forces a refetch, at most once every
+    `JWKS_MIN_REFETCH_INTERVAL` seconds. Concurrent callers share one fetch.
+    """
+
+    def __init__(self, user_pool_id: str) -> None:
+        self.endpoint = (
+            f"https://cognito-idp.{user_pool_id.split('_')[0]}"
+            f".amazonaws.com/{user_pool_id}/.well-known/jwks.json"
         )
-    jwks = JWKS.model_validate(response.json())
-    return jwks
+        self.refresh_interval = settings.get("JWKS_REFRESH_INTERVAL", 3600)
+        self.max_age = settings.get("JWKS_MAX_AGE", 86400)
+        self.min_refetch_interval = settings.get("JWKS_MIN_REFETCH_INTERVAL", 30)
+        # kid -> (key, algorithm)
+        self.keys: dict[str, tuple[Any, str]] = {}
+        self.fetched_at: float = 0.0
+        self.fetch_task: Optional[asyncio.Task] = None
+
+    async def fetch(self) -> None:
+        async with httpx.AsyncClient() as client:
+            response = await client.get(self.endpoint)
+        if response.status_code != 200:
+            raise HTTPException(
+                status.HTTP_500_INTERNAL_SERVER_ERROR,
+                "Unable to fetch JWKS of default Cognito user pool",
+            )
+        jwks = JWKS.model_validate(response.json())
+        keys = {}
+        for key_data in jwks.keys:
+            algorithm = key_data.get("alg", "RS256")
+            keys[key_data["kid"]] = (jwk.construct(key_data, algorithm), algorithm)
+        self.keys = keys
+        self.fetched_at = time.monotonic()
+
+    def refresh(self) -> asyncio.Task:
+        # Single flight: callers arriving during a fetch wait on the same task
+        if self.fetch_task is None or self.fetch_task.done():
+            self.fetch_task = asyncio.ensure_future(self.fetch())
+            self.fetch_task.add_done_callback(self._log_refresh_failure)
+        return self.fetch_task
+
+    @staticmethod
+    def _log_refresh_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"JWKS refresh failed: {task.exception()}")
+
+    async def get_key(self, kid: str) -> tuple[Any, str]:
+        age = time.monotonic() - self.fetched_at
+        if not self.keys or age > self.max_age:
+            await asyncio.shield(self.refresh())
+        elif age > self.refresh_interval:
+            self.refresh()
+
+        if kid not in self.keys and (
+            time.monotonic() - self.fetched_at > self.min_refetch_interval
+        ):
+            await asyncio.shield(self.refresh())
+
+        if kid not in self.keys:
+            raise ValueError(f"Unknown signing key: {kid}")
+        return self.keys[kid]
 
 
 class JWTBearer(HTTPBearer):
-    def __init__(self, jwks: JWKS, auto_error: bool = True):
+    def __init__(
+        self, jwks: JWKSProvider, auto_error: bool = True, mode: Optional[str] = None
+    ):
         super().__init__(auto_error=auto_error)
         self.jwks = jwks
+        self.mode = mode or settings.get("AUTH_MODE", AuthModes.COGNITO)
+        if self.mode not in (AuthModes.COGNITO, AuthModes.CLAIMS):
+            raise ValueError(f"Unknown auth mode: {self.mode}")
+
+    async def decode_claims(self, jwt_token: str, header: dict) -> dict:
+        key, algorithm = await self.jwks.get_key(header.get("kid"))
+        if self.mode == AuthModes.COGNITO:
+            return jwt.decode(jwt_token, key, algorithms=[algorithm])
+        # ID tokens carry the app client id as `aud`, which must be checked
+        claims = jwt.decode(
+            jwt_token,
+            key,
+            algorithms=[algorithm],
+            audience=settings.get("COGNITO_APP_CLIENT_ID"),
+        )
+        if claims.get("token_use") != "id":
+            raise ValueError("Claims auth mode requires an ID token")
+        return claims
+
+    @staticmethod
+    def get_claims_profile(claims: dict) -> dict:
+        """
+        Builds the same profile as `get_user_profile` from verified ID token
+        claims, without any request to Cognito.
+        """
+        return {
+            "user_name": claims["cognito:username"],
+            "first_name": claims.get("given_name", ""),
+            "last_name": claims.get("family_name", ""),
+            "email": claims.get("email", ""),
+            "user_companies": ArrayUserAttribute(
+                claims.get("custom:custom_user")
+            ).values,
+            "super_admin": claims.get("custom:custom_superadmin") or None,
+            "roles": {},
+            "exp": claims["exp"],
+        }
+
+    async def get_user_profile(self, jwt_token: str, claims: dict, cognito_client):
+        """
+        Returns the user's Cognito attributes, calling `get_user` only the first
+        time a token is seen. Decoded roles are memoized per agency inside the
+        profile.
+        """
+        cache_key = token_cache_key(jwt_token)
+        profile = user_profile_cache.get(cache_key)
+        if profile is not None:
+            return profile
+
+        user_attributes = await cognito_client.get_user(AccessToken=jwt_token)
+        user_attributes_dict = {
+            attribute["Name"]: attribute["Value"]
+            for attribute in user_attributes["UserAttributes"]
+        }
+        profile = {
+            "user_name": user_attributes["Username"],
+            "first_name": user_attributes_dict.get("given_name", ""),
+            "last_name": user_attributes_dict.get("family_name", ""),
+            "email": user_attributes_dict.get("email", ""),
+            "user_companies": ArrayUserAttribute(
+                user_attributes_dict.get("custom:custom_user")
+            ).values,
+            "super_admin": user_attributes_dict.get("custom:custom_superadmin") or None,
+            "roles": {},
+            "exp": claims["exp"],
+        }
+        user_profile_cache[cache_key] = profile
+        return profile
 
     async def __call__(
         self,
@@ -132,40 +302,33 @@ class JWTBearer(HTTPBearer):
             try:
                 jwt_token = jwt_token.split(" ")[1]
                 message, signature = jwt_token.rsplit(".", 1)
-                claims = jwt.decode(jwt_token, self.jwks.model_dump())
-
-                user_attributes = await cognito_client.get_user(AccessToken=jwt_token)
-                user_name = user_attributes["Username"]
-                user_attributes_dict = {
-                    attribute["Name"]: attribute["Value"]
-                    for attribute in user_attributes["UserAttributes"]
-                }
-                first_name = user_attributes_dict.get("given_name", "")
-                last_name = user_attributes_dict.get("family_name", "")
-                email = user_attributes_dict.get("email", "")
-                user_companies = ArrayUserAttribute(
-                    user_attributes_dict.get("custom:custom_user")
-                ).values
-                roles = decode_user_access(user_companies.get(agency))
-
-                super_admin = None
-
-                if user_attributes_dict.get("custom:custom_superadmin"):
-                    super_admin = user_attributes_dict.get("custom:custom_superadmin")
+                header = jwt.get_unverified_header(jwt_token)
+                claims = await self.decode_claims(jwt_token, header)
+
+                if self.mode == AuthModes.CLAIMS:
+                    profile = self.get_claims_profile(claims)
+                else:
+                    profile = await self.get_user_profile(
+                        jwt_token, claims, cognito_client
+                    )
+                roles = profile["roles"].get(agency)
+                if roles is None:
+                    roles = decode_user_access(profile["user_companies"].get(agency))
+                    profile["roles"][agency] = roles
 
                 jwt_credentials = JWTAuthorizationCredentials(
                     jwt_token=jwt_token,
-                    header=jwt.get_unverified_header(jwt_token),
+                    header=header,
                     claims=claims,
                     signature=signature,
                     message=message,
-                    user_companies=user_companies,
-                    super_admin=super_admin,
+                    user_companies=profile["user_companies"],
+                    super_admin=profile["super_admin"],
                     roles=roles,
-                    first_name=first_name,
-                    last_name=last_name,
-                    email=email,
-                    user_name=user_name,
+                    first_name=profile["first_name"],
+                    last_name=profile["last_name"],
+                    email=profile["email"],
+                    user_name=profile["user_name"],
                 )
 
             except Exception as ex:
@@ -180,7 +343,8 @@ class JWTBearer(HTTPBearer):
             )
 
 
-auth = JWTBearer(get_jwks(settings.COGNITO_USER_POOL_ID))
+# Keys are fetched on the first authenticated request, not at import
+auth = JWTBearer(JWKSProvider(settings.COGNITO_USER_POOL_ID))
 
 
 def super_admin_validator(credentials: JWTAuthorizationCredentials = Depends(auth)):
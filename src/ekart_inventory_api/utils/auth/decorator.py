@@ -5,6 +5,14 @@ from fastapi import Depends, HTTPException, Request
 
 
 def require_permissions(required_permissions: List[tuple]):
+    """
+    The required `(action, module)` pairs are frozen once at decoration time.
+    `request.state.permissions` is the frozenset compiled per role combination
+    by the tenant cache, so each check is a set containment test rather than a
+    scan of a concatenated list.
+    """
+    required = frozenset(required_permissions)
+
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, request: Request = Depends(), **kwargs):
@@ -12,10 +20,11 @@ def require_permissions(required_permissions: List[tuple]):
                 raise HTTPException(status_code=403, detail="No permissions found")
 
             user_permissions = request.state.permissions
+            if not isinstance(user_permissions, frozenset):
+                user_permissions = frozenset(user_permissions)
 
-            for action, module in required_permissions:
-                if (action, module) not in user_permissions:
-                    raise HTTPException(status_code=403, detail="Permission denied")
+            if not required <= user_permissions:
+                raise HTTPException(status_code=403, detail="Permission denied")
 
             return await func(*args, request=request, **kwargs)
 
@@ -1,9 +1,11 @@
-from typing import AsyncGenerator
+import asyncio
+from contextlib import AsyncExitStack
+from typing import AsyncGenerator, Optional
 
 import aioboto3
 from botocore.config import Config
 
-from .settings.config import settings
+from ...settings.config import settings
 
 
 class AWSServices:
@@ -13,25 +15,104 @@ class AWSServices:
     LAMBDA = "lambda"
 
 
+def build_client_config() -> Config:
+    return Config(
+        signature_version="s3v4",
+        max_pool_connections=settings.get("AWS_MAX_POOL_CONNECTIONS", 50),
+        tcp_keepalive=settings.get("AWS_TCP_KEEPALIVE", True),
+        retries={
+            "mode": settings.get("AWS_RETRY_MODE", "standard"),
+            "max_attempts": settings.get("AWS_MAX_ATTEMPTS", 3),
+        },
+    )
+
+
+def build_client_kwargs() -> dict:
+    # AWS_ENDPOINT_URL points every client at moto's server mode or MinIO
+    return {
+        k: v
+        for k, v in {
+            "aws_access_key_id": settings.get("AWS_ACCESS_KEY_ID"),
+            "aws_secret_access_key": settings.get("AWS_SECRET_ACCESS_KEY"),
+            "region_name": settings.get("AWS_REGION"),
+            "endpoint_url": settings.get("AWS_ENDPOINT_URL"),
+        }.items()
+        if v
+    }
+
+
+class AWSClientManager:
+    """
+    Process-wide registry of long-lived aioboto3 clients, one per service.
+
+    Clients are created on first use and share one session, so credential
+    resolution, endpoint setup and TLS connections are paid once per worker
+    rather than once per request. `close` is called from the app lifespan.
+    """
+
+    def __init__(self) -> None:
+        self.session: Optional[aioboto3.Session] = None
+        self.exit_stack: Optional[AsyncExitStack] = None
+        self.clients: dict[str, object] = {}
+        self.lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        if self.session is None:
+            self.session = aioboto3.Session()
+            self.exit_stack = AsyncExitStack()
+
+    async def get(self, service: str):
+        client = self.clients.get(service)
+        if client is not None:
+            return client
+        async with self.lock:
+            if service not in self.clients:
+                await self.start()
+                self.clients[service] = await self.exit_stack.enter_async_context(
+                    self.session.client(
+                        service, config=build_client_config(), **build_client_kwargs()
+                    )
+                )
+        return self.clients[service]
+
+    async def close(self) -> None:
+        if self.exit_stack is not None:
+            await self.exit_stack.aclose()
+        self.session = None
+        self.exit_stack = None
+        self.clients = {}
+
+    def pool_metrics(self) -> dict:
+        """
+        Connection pool usage per service, read from each client's aiohttp
+        connector: the configured limit, connections checked out by in-flight
+        requests and idle keep-alive connections ready for reuse.
+        """
+        metrics = {}
+        for service, client in self.clients.items():
+            http_session = getattr(client._endpoint, "http_session", None)
+            connector = getattr(
+                getattr(http_session, "_session", None), "connector", None
+            )
+            metrics[service] = {
+                "max_pool_connections": client.meta.config.max_pool_connections,
+                "in_use": len(getattr(connector, "_acquired", ())),
+                "idle": sum(
+                    len(connections)
+                    for connections in getattr(connector, "_conns", {}).values()
+                ),
+            }
+        return metrics
+
+
+aws_clients = AWSClientManager()
+
+
 async def get_client(service: AWSServices):
     """
-    Creates and returns an async client for the specified AWS service.
+    Returns the shared async client for the specified AWS service.
     """
-    session = aioboto3.Session()
-    async with session.client(
-        service,
-        config=Config(signature_version="s3v4"),
-        **{
-            k: v
-            for k, v in {
-                "aws_access_key_id": settings.get("AWS_ACCESS_KEY_ID"),
-                "aws_secret_access_key": settings.get("AWS_SECRET_ACCESS_KEY"),
-                "region_name": settings.get("AWS_REGION"),
-            }.items()
-            if v
-        },
-    ) as client:
-        yield client
+    yield await aws_clients.get(service)
 
 
 async def get_s3() -> AsyncGenerator:
@@ -1,12 +1,22 @@
 from typing import Dict, Optional
 
+from cachetools import LRUCache
 from fastapi import HTTPException, UploadFile
 from starlette_context import context
 
-from .settings.config import settings
+from ...settings.config import settings
+
+# (bucket, key, etag) -> user metadata
+metadata_cache = LRUCache(maxsize=settings.get("S3_METADATA_CACHE_SIZE", 10000))
 
 
 class S3:
+    """
+    Thin wrapper over a long-lived S3 client owned by `aws_clients`. Methods
+    call the client directly and never enter or exit its context, which
+    would close the shared connection pool.
+    """
+
     def __init__(
         self,
         s3_client,
@@ -52,42 +62,67 @@ class S3:
     ) -> bool:
         key = self.add_prefix(self.prefix, key)
         try:
-            async with self.s3_client as s3:
-                await s3.upload_fileobj(
-                    file.file,
-                    self.bucket,
-                    key,
-                    ExtraArgs={"Metadata": metadata} if metadata else None,
-                )
+            await self.s3_client.upload_fileobj(
+                file.file,
+                self.bucket,
+                key,
+                ExtraArgs={"Metadata": metadata} if metadata else None,
+            )
             return True
         except Exception as e:
             raise HTTPException(
                 status_code=500, detail=f"Failed to upload file: {str(e)}"
             )
 
-    async def delete(self, filename: str) -> Dict[str, str]:
+    async def upload_bytes(
+        self, key: str, body: bytes, metadata: Optional[dict] = None
+    ) -> bool:
+        """
+        Uploads content already held in memory with a single PutObject, so the
+        caller's buffer is not read a second time.
+        """
+        key = self.add_prefix(self.prefix, key)
+        params = {"Bucket": self.bucket, "Key": key, "Body": body}
+        if metadata:
+            params["Metadata"] = metadata
         try:
-            async with self.s3_client as s3:
-                await s3.delete_object(Bucket=self.bucket, Key=filename)
-            return {"message": "File deleted successfully"}
+            await self.s3_client.put_object(**params)
+            return True
         except Exception as e:
             raise HTTPException(
-                status_code=500, detail=f"Failed to delete file: {str(e)}"
+                status_code=500, detail=f"Failed to upload file: {str(e)}"
             )
 
-    async def key_exists(self, key: str) -> bool:
+    async def create_multipart_upload(
+        self, key: str, metadata: Optional[dict] = None
+    ) -> "MultipartUpload":
         key = self.add_prefix(self.prefix, key)
+        params = {"Bucket": self.bucket, "Key": key}
+        if metadata:
+            params["Metadata"] = metadata
+        try:
+            response = await self.s3_client.create_multipart_upload(**params)
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, detail=f"Failed to start upload: {str(e)}"
+            )
+        return MultipartUpload(self, key, response["UploadId"])
+
+    async def delete(self, filename: str) -> Dict[str, str]:
         try:
-            async with self.s3_client as s3:
-                results = await s3.list_objects_v2(Bucket=self.bucket, Prefix=key)
-            if "Contents" in results:
-                for obj in results["Contents"]:
-                    if obj["Key"] == key:
-                        return True
+            await self.s3_client.delete_object(Bucket=self.bucket, Key=filename)
+            return {"message": "File deleted successfully"}
         except Exception as e:
             raise HTTPException(
-                status_code=500, detail=f"Failed to check file existence: {str(e)}"
+                status_code=500, detail=f"Failed to delete file: {str(e)}"
             )
+
+    async def key_exists(self, key: str) -> bool:
+        key = self.add_prefix(self.prefix, key)
+        # An exact match sorts before every other key sharing it as a prefix,
+        # so only the first listed object needs checking
+        async for obj in self.iter_files(key, page_size=1):
+            return obj["Key"] == key
         return False
 
     async def generate_presigned_post(
@@ -95,11 +130,9 @@ class S3:
     ) -> Dict[str, str]:
         key = self.add_prefix(self.prefix, key)
         try:
-            async with self.s3_client as s3:
-                response = await s3.generate_presigned_post(
-                    Bucket=self.bucket, Key=key, ExpiresIn=expiration
-                )
-            return response
+            return await self.s3_client.generate_presigned_post(
+                Bucket=self.bucket, Key=key, ExpiresIn=expiration
+            )
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -109,42 +142,132 @@ class S3:
     async def get_signed_url(self, key: str, expiration: int = 3600) -> str:
         key = self.add_prefix(self.prefix, key)
         try:
-            async with self.s3_client as s3:
-                url = await s3.generate_presigned_url(
-                    ClientMethod="get_object",
-                    Params={"Bucket": self.bucket, "Key": key},
-                    ExpiresIn=expiration,
-                )
-            return url
+            # Presigning is a local signature, no request is sent
+            return await self.s3_client.generate_presigned_url(
+                ClientMethod="get_object",
+                Params={"Bucket": self.bucket, "Key": key},
+                ExpiresIn=expiration,
+            )
         except Exception as e:
             raise HTTPException(
                 status_code=500, detail=f"Failed to generate presigned URL: {str(e)}"
             )
 
     async def list_files(self, key: str) -> list:
+        return [obj async for obj in self.iter_files(key)]
 
+    async def _iter_pages(
+        self, key: str, page_size: int, delimiter: Optional[str] = None
+    ):
+        params = {"Bucket": self.bucket, "Prefix": key, "MaxKeys": page_size}
+        if delimiter:
+            params["Delimiter"] = delimiter
+        while True:
+            try:
+                page = await self.s3_client.list_objects_v2(**params)
+            except Exception as e:
+                raise HTTPException(
+                    status_code=500, detail=f"Failed to list files: {str(e)}"
+                )
+            yield page
+            if not page.get("IsTruncated"):
+                return
+            params["ContinuationToken"] = page["NextContinuationToken"]
+
+    async def iter_files(self, key: str, page_size: int = 1000):
+        """
+        Yields every object under `key`, following continuation tokens, one
+        page of `page_size` keys in memory at a time.
+        """
         key = self.add_prefix(self.prefix, key)
-        try:
-            async with self.s3_client as s3:
-                results = await s3.list_objects_v2(Bucket=self.bucket, Prefix=key)
-            if "Contents" in results:
-                return results["Contents"]
+        async for page in self._iter_pages(key, page_size):
+            for obj in page.get("Contents", []):
+                yield obj
+
+    async def iter_folders(self, key: str, page_size: int = 1000):
+        """
+        Yields the names of the immediate sub-folders of `key`, e.g. the date
+        folders under `Case/XML`, without listing the objects inside them.
+        """
+        key = self.add_prefix(self.prefix, key.rstrip("/") + "/")
+        async for page in self._iter_pages(key, page_size, delimiter="/"):
+            for common_prefix in page.get("CommonPrefixes", []):
+                yield common_prefix["Prefix"][len(key) :].rstrip("/")
+
+    async def get_metadata(self, key: str, etag: Optional[str] = None) -> dict:
+        """
+        Returns the object's user metadata. When the listing's `etag` is passed
+        the result is cached, since an object's metadata cannot change without
+        its ETag changing.
+        """
+        key = self.update_key(key)
+        cache_key = (self.bucket, key, etag)
+        if etag and cache_key in metadata_cache:
+            return metadata_cache[cache_key]
+
+        response = await self.s3_client.head_object(Bucket=self.bucket, Key=key)
+        metadata = response.get("Metadata", {})
+        if etag:
+            metadata_cache[cache_key] = metadata
+        return metadata
+
+    async def get_file_bytes(self, key) -> bytes:
+        key = self.update_key(key)
+        response = await self.s3_client.get_object(Bucket=self.bucket, Key=key)
+        async with response["Body"] as body:
+            return await body.read()
+
+    async def get_file_obj(self, key):
+        content = await self.get_file_bytes(key)
+        return content.decode("utf-8")
+
+
+class MultipartUpload:
+    """
+    One in-progress multipart upload. Every part except the last must be at
+    least `MIN_PART_SIZE` bytes; callers `abort` on failure so S3 does not
+    keep billing for the orphaned parts.
+    """
+
+    MIN_PART_SIZE = 5 * 1024 * 1024
 
+    def __init__(self, s3: S3, key: str, upload_id: str):
+        self.s3 = s3
+        self.key = key
+        self.upload_id = upload_id
+        self.parts: list[dict] = []
+
+    async def upload_part(self, body: bytes) -> None:
+        part_number = len(self.parts) + 1
+        try:
+            response = await self.s3.s3_client.upload_part(
+                Bucket=self.s3.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                PartNumber=part_number,
+                Body=body,
+            )
         except Exception as e:
             raise HTTPException(
-                status_code=500, detail=f"Failed to check files existence: {str(e)}"
+                status_code=500, detail=f"Failed to upload part: {str(e)}"
             )
-        return []
+        self.parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
 
-    async def get_metadata(self, key: str) -> list:
-        key = self.update_key(key)
-        async with self.s3_client as s3:
-            response = await s3.head_object(Bucket=self.bucket, Key=key)
-            return response.get("Metadata", {})
+    async def complete(self) -> bool:
+        try:
+            await self.s3.s3_client.complete_multipart_upload(
+                Bucket=self.s3.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={"Parts": self.parts},
+            )
+            return True
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, detail=f"Failed to complete upload: {str(e)}"
+            )
 
-    async def get_file_obj(self, key):
-        key = self.update_key(key)
-        async with self.s3_client as s3:
-            response = await s3.get_object(Bucket=self.bucket, Key=key)
-            content = await response["Body"].read()
-            return content.decode("utf-8")
+    async def abort(self) -> None:
+        await self.s3.s3_client.abort_multipart_upload(
+            Bucket=self.s3.bucket, Key=self.key, UploadId=self.upload_id
+        )
@@ -0,0 +1,83 @@
+from sqlalchemy import Table, column, func, select, table, text
+from sqlalchemy.dialects.postgresql import insert
+
+
+def with_column_defaults(model_table: Table, row: dict) -> dict:
+    """
+    COPY bypasses SQLAlchemy, so Python-side column defaults (audit columns,
+    `is_active`, ...) are applied here for any column missing from the row.
+    """
+    row = dict(row)
+    for model_column in model_table.columns:
+        if model_column.key in row or model_column.default is None:
+            continue
+        default = model_column.default
+        if default.is_callable:
+            row[model_column.key] = default.arg(None)
+        elif default.is_scalar:
+            row[model_column.key] = default.arg
+    return row
+
+
+async def reserve_ids(session, schema: str, model_table: Table, count: int) -> list:
+    """
+    Draws `count` ids from the table's serial sequence in one round-trip so
+    rows can reference each other before they are loaded.
+    """
+    if not count:
+        return []
+    sequence = func.pg_get_serial_sequence(f"{schema}.{model_table.name}", "id")
+    result = await session.scalars(
+        select(func.nextval(sequence)).select_from(func.generate_series(1, count))
+    )
+    return list(result)
+
+
+async def copy_into(
+    session,
+    schema: str,
+    model_table: Table,
+    rows: list[dict],
+    ignore_conflicts: bool = False,
+) -> None:
+    """
+    Loads rows with asyncpg `COPY` into a transaction scoped staging table and
+    moves them into `model_table` with a single `INSERT ... SELECT`.
+    """
+    if not rows:
+        return
+
+    rows = [with_column_defaults(model_table, row) for row in rows]
+    # Columns left out of the rows (e.g. serial ids) fall back to the
+    # table's server defaults
+    model_columns = [
+        model_column
+        for model_column in model_table.columns
+        if model_column.key in rows[0]
+    ]
+    columns = [model_column.name for model_column in model_columns]
+    records = [
+        tuple(row[model_column.key] for model_column in model_columns) for row in rows
+    ]
+
+    staging_name = f"staging_{model_table.name}"
+    preparer = session.bind.dialect.identifier_preparer
+    await session.execute(
+        text(
+            f"CREATE TEMP TABLE {preparer.quote(staging_name)} "
+            f"(LIKE {preparer.quote_schema(schema)}.{preparer.quote(model_table.name)} "
+            "INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+    )
+
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        staging_name, columns=columns, records=records
+    )
+
+    staging_table = table(staging_name, *[column(name) for name in columns])
+    statement = insert(model_table).from_select(columns, select(*staging_table.columns))
+    if ignore_conflicts:
+        statement = statement.on_conflict_do_nothing()
+    await session.execute(statement)
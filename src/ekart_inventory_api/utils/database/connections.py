@@ -1,10 +1,15 @@
-from typing import Any, Callable
+import asyncio
+import itertools
+import time
+from typing import Any, Callable, Optional
 
 import boto3
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from .config.database_config import DatabaseConfig
+from ...config.database_config import DatabaseConfig
+from ..common.logger import logger
 
 
 def get_aws_client_provider() -> Callable[..., Any]:
@@ -13,16 +18,229 @@ def get_aws_client_provider() -> Callable[..., Any]:
 
 db_cfg = DatabaseConfig()
 
+# Seconds the replica is behind the primary; 0 once it has replayed
+# everything it received, so an idle primary does not read as lag
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+    "THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long each checkout took, including time
+    spent waiting for a connection to be returned when the pool is full.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def recreate(self):
+        pool = super().recreate()
+        # Keep counting across `engine.dispose()`
+        pool.checkouts = self.checkouts
+        pool.wait_seconds_total = self.wait_seconds_total
+        pool.wait_seconds_max = self.wait_seconds_max
+        pool.timeouts = self.timeouts
+        return pool
+
+
+class ReplicaRouter:
+    """
+    Picks a replica engine for read-only sessions, or None for the primary.
+
+    A tenant reads from the primary for `replica_sticky_seconds` after it
+    writes, so it sees its own writes. Replicas whose last measured lag
+    exceeds `replica_max_lag_seconds`, or that could not be reached, are
+    skipped, and with none left reads use the primary. Lag is re-measured in
+    the background every `replica_lag_check_interval`.
+
+    Writes are only known to the worker that made them. A read served by
+    another worker may go to a replica right away and miss a write committed
+    less than `replica_max_lag_seconds` ago, so endpoints that must read
+    their own writes across requests should open a session that is not
+    read-only.
+    """
+
+    def __init__(self, config: DatabaseConfig, replicas: list[AsyncEngine]) -> None:
+        self.config = config
+        self.replicas = replicas
+        self.last_write: dict[Optional[str], float] = {}
+        # replica index -> lag in seconds, None when unreachable
+        self.lag: dict[int, Optional[float]] = {}
+        self.checked_at = 0.0
+        self.check_task: Optional[asyncio.Task] = None
+        self.turn = itertools.count()
+
+    def record_write(self, tenant: Optional[str]) -> None:
+        self.last_write[tenant] = time.monotonic()
+
+    def choose(self, tenant: Optional[str]) -> Optional[AsyncEngine]:
+        if not self.replicas:
+            return None
+        now = time.monotonic()
+        last_write = self.last_write.get(tenant)
+        if (
+            last_write is not None
+            and now - last_write < self.config.replica_sticky_seconds
+        ):
+            return None
+        if now - self.checked_at > self.config.replica_lag_check_interval:
+            self.schedule_lag_check()
+
+        healthy = [
+            replica
+            for index, replica in enumerate(self.replicas)
+            if self.lag.get(index) is not None
+            and self.lag[index] <= self.config.replica_max_lag_seconds
+        ]
+        if not healthy:
+            return None
+        return healthy[next(self.turn) % len(healthy)]
+
+    def schedule_lag_check(self) -> None:
+        if self.check_task is None or self.check_task.done():
+            self.check_task = asyncio.ensure_future(self.check_lag())
+
+    async def check_lag(self) -> None:
+        async def measure(replica: AsyncEngine) -> Optional[float]:
+            try:
+                async with replica.connect() as connection:
+                    lag = (await connection.execute(REPLICA_LAG_QUERY)).scalar()
+                    return float(lag or 0)
+            except Exception as ex:
+                logger.error(f"Replica lag check failed for {replica.url}: {ex}")
+                return None
+
+        lags = await asyncio.gather(*(measure(replica) for replica in self.replicas))
+        self.lag = dict(enumerate(lags))
+        self.checked_at = time.monotonic()
+
+    def metrics(self) -> list[dict]:
+        return [
+            {
+                "host": replica.url.host,
+                "lag_seconds": self.lag.get(index),
+                "checked_out": replica.pool.checkedout(),
+            }
+            for index, replica in enumerate(self.replicas)
+        ]
+
 
 class AsyncDatabaseSession:
+    """
+    Owns the process's async engine. The app lifespan calls `start`, which
+    creates the engine from `DatabaseConfig` and opens
+    `pool_warm_connections` connections, and `dispose` on shutdown. Calling
+    the instance returns the engine, so it works as a FastAPI dependency, and
+    creates it on first use outside the app (scripts, migrations).
+    """
 
-    engine = create_async_engine(
-        DatabaseConfig().build_db_url(async_driver=True),
-    )
-    SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    def __init__(self, config: Optional[DatabaseConfig] = None) -> None:
+        self.config = config or db_cfg
+        self.engine: Optional[AsyncEngine] = None
+        self.SessionLocal: Optional[async_sessionmaker] = None
+        self.router: Optional[ReplicaRouter] = None
 
-    def __call__(self):
+    def create_engine(self) -> AsyncEngine:
+        if self.engine is None:
+            self.engine = create_async_engine(
+                self.config.build_db_url(async_driver=True),
+                poolclass=TimedQueuePool,
+                **self.config.engine_options(),
+            )
+            self.SessionLocal = async_sessionmaker(
+                autocommit=False, autoflush=False, bind=self.engine
+            )
+            replicas = [
+                create_async_engine(
+                    url, poolclass=TimedQueuePool, **self.config.engine_options()
+                )
+                for url in self.config.build_replica_urls(async_driver=True)
+            ]
+            self.router = ReplicaRouter(self.config, replicas)
         return self.engine
 
+    def route(
+        self, engine: AsyncEngine, tenant: Optional[str], read_only: bool
+    ) -> AsyncEngine:
+        """
+        The engine a session for `tenant` should use: a replica for read-only
+        sessions on this manager's primary when one is usable, else `engine`.
+        """
+        if not read_only or engine is not self.engine or self.router is None:
+            return engine
+        return self.router.choose(tenant) or engine
+
+    def record_write(self, engine: AsyncEngine, tenant: Optional[str]) -> None:
+        if engine is self.engine and self.router is not None:
+            self.router.record_write(tenant)
+
+    async def start(self) -> AsyncEngine:
+        engine = self.create_engine()
+        warm = min(
+            self.config.pool_warm_connections,
+            self.config.pool_size + self.config.max_overflow,
+        )
+        if warm > 0:
+            # Hold the connections together so each one is a new connect
+            connections = await asyncio.gather(*(engine.connect() for _ in range(warm)))
+            await asyncio.gather(*(connection.close() for connection in connections))
+        if self.router.replicas:
+            # Replicas take reads only once their lag is known
+            await self.router.check_lag()
+        return engine
+
+    async def dispose(self) -> None:
+        if self.engine is not None:
+            if self.router.check_task is not None:
+                self.router.check_task.cancel()
+            for replica in self.router.replicas:
+                await replica.dispose()
+            await self.engine.dispose()
+            self.engine = None
+            self.SessionLocal = None
+            self.router = None
+
+    def pool_metrics(self) -> dict:
+        if self.engine is None:
+            return {}
+        pool = self.engine.pool
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": self.config.max_overflow,
+            "checkouts": pool.checkouts,
+            "timeouts": pool.timeouts,
+            "wait_seconds_avg": (
+                pool.wait_seconds_total / pool.checkouts if pool.checkouts else 0.0
+            ),
+            "wait_seconds_max": pool.wait_seconds_max,
+            "replicas": self.router.metrics(),
+        }
+
+    def __call__(self) -> AsyncEngine:
+        return self.create_engine()
+
 
 get_async_engine = AsyncDatabaseSession()
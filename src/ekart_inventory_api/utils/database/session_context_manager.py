@@ -1,13 +1,31 @@
 from contextlib import asynccontextmanager
 
 from fastapi import HTTPException, Request
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
 
-from .utils.common.logger import logger
+from ..common.logger import logger
+from .connections import get_async_engine
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_committed(session):
+    session.info["committed"] = True
 
 
 @asynccontextmanager
-async def session_context(engine: AsyncEngine, client_name: str = None):
+async def session_context(
+    engine: AsyncEngine, client_name: str = None, read_only: bool = False
+):
+    """
+    Opens a session whose tables resolve to the `client_name` schema.
+    `read_only` sessions may be served by a replica (see `ReplicaRouter`);
+    a session that commits keeps the tenant's reads on the primary for a
+    while afterwards.
+    """
+    primary = engine
+    engine = get_async_engine.route(engine, client_name, read_only)
     session = AsyncSession(engine)
     schema_translate_map = {
         None: client_name,
@@ -26,4 +44,6 @@ async def session_context(engine: AsyncEngine, client_name: str = None):
         logger.error(f"An error occured during a transaction: {ex}")
 
     finally:
+        if session.sync_session.info.get("committed"):
+            get_async_engine.record_write(primary, client_name)
         await session.close()
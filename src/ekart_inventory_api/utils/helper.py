@@ -0,0 +1,63 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from fastapi import HTTPException
+
+
+def _parse_iso(value: str) -> date | datetime:
+    # Date columns serialise as YYYY-MM-DD, DateTime columns carry a time part
+    if len(value) == 10:
+        return date.fromisoformat(value)
+    return datetime.fromisoformat(value)
+
+
+def encode_cursor(violation_date: date, created_on: datetime, record_id: int) -> str:
+    """
+    Builds an opaque keyset cursor from the sort key of the last row of a page.
+    The key must be complete: a row comparison with a NULL member matches no
+    rows, so a cursor built from one would end the listing early. Case search
+    only returns rows inside a violation date range and `created_on` is NOT
+    NULL, so a NULL here is a bug and raises ValueError.
+    """
+    if violation_date is None or created_on is None or record_id is None:
+        raise ValueError("Cursor sort key contains NULL")
+    payload = json.dumps(
+        [violation_date.isoformat(), created_on.isoformat(), record_id]
+    )
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Reverses `encode_cursor`, returning `(violation_date, created_on, id)`.
+    Cursors with a NULL member are rejected with 400 like any other malformed
+    cursor.
+    """
+    try:
+        violation_date, created_on, record_id = json.loads(
+            base64.urlsafe_b64decode(cursor.encode("ascii"))
+        )
+        return (
+            _parse_iso(violation_date),
+            _parse_iso(created_on),
+            int(record_id),
+        )
+    except (binascii.Error, ValueError, TypeError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def iter_lines(chunks):
+    """
+    Re-splits an async stream of byte chunks (e.g. `Request.stream()`) into
+    lines without buffering the whole body.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
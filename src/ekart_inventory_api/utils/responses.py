@@ -0,0 +1,28 @@
+from typing import Any
+
+import orjson
+from fastapi.encoders import ENCODERS_BY_TYPE
+from fastapi.responses import JSONResponse
+
+
+def _default(value: Any):
+    # Decimals, sets, timedeltas and other values orjson cannot serialize are
+    # converted the way `jsonable_encoder` converts them, e.g. Decimal to int
+    # or float and Enum to its value
+    for base in type(value).__mro__[:-1]:
+        encoder = ENCODERS_BY_TYPE.get(base)
+        if encoder is not None:
+            return encoder(value)
+    return str(value)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response that renders already serialized content straight to bytes
+    with orjson. Endpoints return it directly with dicts built by
+    `core.models.serializers`, which skips FastAPI's `jsonable_encoder` pass
+    over the payload; the output matches what that pass would produce.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
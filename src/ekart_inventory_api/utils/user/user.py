@@ -1,4 +1,11 @@
-from .core.constants.user_enums import UserAccess
+from functools import lru_cache
+
+from ...core.constants.user_enums import UserAccess
+
+# (role name, bit) per access level, parsed from the enum's hex values once
+USER_ACCESS_BITS = tuple(
+    (access.name.lower(), int(access.value, 16)) for access in UserAccess
+)
 
 
 def get_overall_user_access_score(access_roles: list[str] = None) -> str:
@@ -10,14 +17,16 @@ def get_overall_user_access_score(access_roles: list[str] = None) -> str:
     return total_access_value
 
 
-def decode_user_access(user_access_score: str | None) -> list[str]:
+@lru_cache(maxsize=1024)
+def decode_user_access(user_access_score: str | None) -> tuple[str, ...]:
+    """
+    Roles encoded in a hex access score. Memoized, since users share a small
+    number of distinct scores; the result is a tuple so it cannot be mutated
+    through the cache.
+    """
     if not user_access_score:
-        return []
+        return ()
 
     access_score = int(user_access_score, 16)
 
-    return [
-        access.name.lower()
-        for access in UserAccess
-        if access_score & int(access.value, 16) == int(access.value, 16)
-    ]
+    return tuple(name for name, bit in USER_ACCESS_BITS if access_score & bit == bit)
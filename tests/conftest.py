@@ -0,0 +1,64 @@
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette_context import request_cycle_context
+
+from ekart_inventory_api.core.controllers.dependencies import get_client_header
+from ekart_inventory_api.core.controllers.manage_cache_dependency import (
+    manage_request_state,
+)
+
+TEST_AGENCY = os.environ.get("EKART_TEST_AGENCY", "test_agency")
+TEST_USER = "test_user"
+
+
+@pytest.fixture
+def make_client():
+    """
+    Builds a client for `router` with authentication stubbed out and the
+    given dependency overrides, e.g. `{CaseRecordsController: FakeController}`.
+    """
+
+    def build(router, overrides=None) -> TestClient:
+        app = FastAPI()
+        app.include_router(router)
+        app.dependency_overrides[manage_request_state] = lambda: None
+        app.dependency_overrides[get_client_header] = lambda: TEST_AGENCY
+        app.dependency_overrides.update(overrides or {})
+        return TestClient(app)
+
+    return build
+
+
+@pytest.fixture
+def database_url():
+    """
+    Postgres with the tenant schema migrated, for tests that need a real
+    database. Set EKART_TEST_DATABASE_URL (an asyncpg URL) to run them.
+    """
+    url = os.environ.get("EKART_TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("EKART_TEST_DATABASE_URL is not set")
+    return url
+
+
+@pytest.fixture
+async def async_engine(database_url):
+    engine = create_async_engine(database_url)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def request_context():
+    """
+    The starlette context a request would carry, read by the audit column
+    defaults of every model.
+    """
+    with request_cycle_context(
+        {"user_details": {"user_name": TEST_USER}, "config": {}}
+    ) as context:
+        yield context
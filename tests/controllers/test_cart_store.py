@@ -0,0 +1,127 @@
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from ekart_inventory_api.core.controllers.products import cart_store
+from ekart_inventory_api.core.controllers.products.cart_store import (
+    CartStore,
+    InMemoryCartBackend,
+)
+
+from ..conftest import TEST_AGENCY
+
+GOOD, REJECTED, FAILING = (1, 10), (1, 11), (2, 10)
+
+
+@pytest.fixture
+async def store():
+    store = CartStore(InMemoryCartBackend(maxsize=10))
+    for user_id, product_id in (GOOD, REJECTED, FAILING):
+        await store.backend.stage(TEST_AGENCY, user_id, product_id, (1, None))
+    return store
+
+
+def fake_write(outcomes: dict):
+    """
+    Stands in for `CartStore.write`: a batch of several lines is rejected,
+    single lines get the outcome listed for them.
+    """
+    written = []
+
+    async def write(agency, lines):
+        if len(lines) > 1:
+            return False
+        (key,) = lines
+        if outcomes[key]:
+            written.append(key)
+        return outcomes[key]
+
+    return write, written
+
+
+async def test_rejected_lines_do_not_hold_back_the_batch(store):
+    store.write, written = fake_write({GOOD: True, REJECTED: False, FAILING: None})
+
+    with pytest.raises(HTTPException) as raised:
+        await store.flush(TEST_AGENCY)
+
+    assert raised.value.status_code == 503
+    assert written == [GOOD]
+    # The rejected line is dropped, the failing one is retried next flush
+    assert await store.backend.staged(TEST_AGENCY) == {FAILING: (1, None)}
+    assert store.rows_rejected == 1
+
+
+async def test_user_flush_only_writes_that_users_lines(store):
+    store.write, written = fake_write({GOOD: True, REJECTED: True, FAILING: True})
+
+    await store.flush(TEST_AGENCY, user_id=2)
+
+    assert written == [FAILING]
+    assert set(await store.backend.staged(TEST_AGENCY)) == {GOOD, REJECTED}
+
+
+async def test_lines_changed_during_a_flush_stay_pending(store):
+    async def write(agency, lines):
+        await store.backend.stage(TEST_AGENCY, *GOOD, (5, None))
+        return True
+
+    store.write = write
+
+    await store.flush(TEST_AGENCY)
+
+    assert await store.backend.staged(TEST_AGENCY) == {GOOD: (5, None)}
+
+
+async def test_a_flush_between_the_two_reads_loses_nothing(monkeypatch):
+    """
+    A flush commits right after whichever of the staged read and the `cart`
+    read comes first; the loaded cart must include the flushed line either way.
+    """
+    store = CartStore(InMemoryCartBackend(maxsize=10))
+    await store.backend.stage(TEST_AGENCY, *GOOD, (3, None))
+    table = {}
+
+    def flush_once():
+        if not table:
+            table[GOOD] = (3, None)
+            store.backend.pending.clear()
+
+    staged = store.backend.staged
+
+    async def staged_then_flush(agency, user_id=None):
+        lines = await staged(agency, user_id)
+        flush_once()
+        return lines
+
+    class Session:
+        async def execute(self, statement):
+            rows = [
+                SimpleNamespace(product_id=product_id, quantity=quantity, added_at=at)
+                for (_, product_id), (quantity, at) in table.items()
+            ]
+            flush_once()
+            return rows
+
+    @asynccontextmanager
+    async def fake_session_context(async_engine, agency):
+        yield Session()
+
+    monkeypatch.setattr(store.backend, "staged", staged_then_flush)
+    monkeypatch.setattr(cart_store, "session_context", fake_session_context)
+
+    cart = await store.load_cart(TEST_AGENCY, GOOD[0], async_engine=None)
+
+    assert cart == {GOOD[1]: (3, None)}
+
+
+async def test_a_failed_cart_read_is_a_503(async_engine):
+    store = CartStore(InMemoryCartBackend(maxsize=10))
+
+    # No such schema, so the SELECT fails and `session_context` swallows it
+    with pytest.raises(HTTPException) as raised:
+        await store.load_cart("no_such_agency", GOOD[0], async_engine)
+
+    assert raised.value.status_code == 503
@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+
+from sqlalchemy import func, select
+
+from ekart_inventory_api.core.controllers.products import case_search
+from ekart_inventory_api.core.controllers.products.case_search import (
+    InProcessSearchBackend,
+    SearchBackend,
+    TrigramIndex,
+    backfill_search_documents,
+)
+
+from ..conftest import TEST_AGENCY
+
+
+class FakeSession:
+    """Returns the same document rows for every statement."""
+
+    def __init__(self, documents: dict[int, str]) -> None:
+        self.rows = [
+            SimpleNamespace(case_record_id=case_record_id, document=document)
+            for case_record_id, document in documents.items()
+        ]
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return self.rows
+
+
+def test_trigram_index_matches_substrings():
+    index = TrigramIndex()
+    index.add_document(1, "Speeding on Main Street")
+    index.add_document(2, "Parking at Elm street")
+
+    assert index.search("street") == {1, 2}
+    assert index.search("MAIN") == {1}
+    assert index.search("oak") == set()
+
+
+def test_trigram_index_short_terms_scan_every_document():
+    index = TrigramIndex()
+    index.add_document(1, "ab")
+    index.add_document(2, "cd")
+
+    assert index.search("b") == {1}
+
+
+def test_trigram_index_replaces_and_removes_documents():
+    index = TrigramIndex()
+    index.add_document(1, "red car")
+    index.add_document(1, "blue truck")
+
+    assert index.search("red") == set()
+    assert index.search("truck") == {1}
+
+    index.remove_document(1)
+    assert index.search("truck") == set()
+
+
+async def test_in_process_backfill_indexes_every_case():
+    backend = InProcessSearchBackend()
+    session = FakeSession({1: "john doe speeding", 2: "jane roe parking"})
+
+    await backend.backfill(session, "agency_a")
+
+    assert backend.indexes["agency_a"].search("roe") == {2}
+    assert "agency_b" not in backend.indexes
+
+
+async def test_in_process_index_cases_refreshes_documents():
+    backend = InProcessSearchBackend()
+    await backend.backfill(FakeSession({1: "old name"}), "agency_a")
+
+    await backend.index_cases(FakeSession({1: "new name"}), "agency_a", [1])
+
+    assert backend.indexes["agency_a"].search("old") == set()
+    assert backend.indexes["agency_a"].search("new") == {1}
+
+
+class RecordingBackend(SearchBackend):
+    def __init__(self) -> None:
+        self.backfilled: list[str] = []
+
+    async def backfill(self, session, agency: str) -> None:
+        self.backfilled.append(agency)
+
+
+async def test_shared_backfill_skips_tenants_another_worker_holds(
+    async_engine, monkeypatch
+):
+    backend = RecordingBackend()
+    monkeypatch.setattr(case_search, "get_search_backend", lambda: backend)
+
+    async with async_engine.connect() as other_worker:
+        await other_worker.execute(
+            select(
+                func.pg_advisory_xact_lock(
+                    func.hashtext(f"case_search_backfill:{TEST_AGENCY}")
+                )
+            )
+        )
+        await backfill_search_documents(async_engine)
+        assert TEST_AGENCY not in backend.backfilled
+
+    await backfill_search_documents(async_engine)
+    assert TEST_AGENCY in backend.backfilled
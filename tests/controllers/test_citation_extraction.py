@@ -0,0 +1,180 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from ekart_inventory_api.core.controllers.products.citation_extraction import (
+    CITATION_PLAN,
+    NAMESPACES,
+    ExtractionPlan,
+    Field,
+    Repeat,
+)
+
+
+def find_text(element, path: str) -> str:
+    """The extraction `parse_citation_xml` did before the compiled plan."""
+    found = element.find(path, namespaces=NAMESPACES)
+    if found is None:
+        return ""
+    return found.text.strip() if found.text else ""
+
+
+def reference_fill(template, element):
+    if isinstance(template, Field):
+        return find_text(element, template.path)
+    if isinstance(template, Repeat):
+        return [
+            reference_fill(template.template, match)
+            for match in element.findall(template.path, namespaces=NAMESPACES)
+        ]
+    if isinstance(template, dict):
+        return {key: reference_fill(value, element) for key, value in template.items()}
+    if isinstance(template, list):
+        return [reference_fill(value, element) for value in template]
+    return template
+
+
+def assert_parity(plan: ExtractionPlan, document: str) -> dict:
+    source = document.encode("utf-8")
+    expected = reference_fill(plan.template, ET.fromstring(source))
+    assert plan.extract(source) == expected
+
+    scan = plan.incremental()
+    for offset in range(0, len(source), 7):
+        scan.feed(source[offset : offset + 7])
+    assert scan.close() == expected
+    return expected
+
+
+def citation(body: str) -> str:
+    return (
+        '<jsi:Citation xmlns:jsi="http://www.justicesystems.com/iepd" '
+        'xmlns:j="http://niem.gov/niem/domains/jxdm/4.0" '
+        'xmlns:nc="http://niem.gov/niem/niem-core/2.0">'
+        f"{body}</jsi:Citation>"
+    )
+
+
+MIXED_CONTENT = citation(
+    "<j:Citation>"
+    "<nc:ActivityIdentification><nc:IdentificationID> CN-1 </nc:IdentificationID>"
+    "</nc:ActivityIdentification>"
+    "<j:CitationViolation>"
+    "<nc:IncidentObservationText>obs <nc:b/> tail</nc:IncidentObservationText>"
+    "</j:CitationViolation>"
+    "<j:CitationIssuedLocation><nc:LocationDescriptionText>"
+    "<nc:i>only child text</nc:i> after"
+    "</nc:LocationDescriptionText></j:CitationIssuedLocation>"
+    "</j:Citation>"
+)
+
+REPEATED = citation(
+    "<j:Citation><nc:IdentificationID>first</nc:IdentificationID>"
+    "<nc:IdentificationID>second</nc:IdentificationID></j:Citation>"
+    "<nc:Person><nc:PersonName><nc:PersonGivenName>Ann</nc:PersonGivenName>"
+    "</nc:PersonName><nc:PersonName><nc:PersonGivenName>Bea</nc:PersonGivenName>"
+    "</nc:PersonName></nc:Person>"
+    "<j:ChargeStatute><j:StatuteDescriptionText>one</j:StatuteDescriptionText>"
+    "</j:ChargeStatute>"
+    "<j:ChargeStatute><j:StatuteCodeIdentification>"
+    "<nc:IdentificationID>C2</nc:IdentificationID></j:StatuteCodeIdentification>"
+    "</j:ChargeStatute>"
+    "<j:ChargeStatute/>"
+)
+
+NESTED_REPEATS = citation(
+    "<j:ChargeStatute>"
+    "<j:ChargeStatute><j:StatuteDescriptionText>inner</j:StatuteDescriptionText>"
+    "</j:ChargeStatute>"
+    "<j:StatuteDescriptionText>outer</j:StatuteDescriptionText>"
+    "<j:StatuteCodeIdentification><nc:IdentificationID>O1</nc:IdentificationID>"
+    "</j:StatuteCodeIdentification>"
+    "</j:ChargeStatute>"
+)
+
+
+def test_mixed_content_keeps_the_elements_own_text():
+    result = assert_parity(CITATION_PLAN, MIXED_CONTENT)
+
+    assert result["citation"]["additional_notes"] == "obs"
+    assert result["citation"]["violation_location"] == ""
+
+
+def test_repeated_elements_take_the_first_match():
+    result = assert_parity(CITATION_PLAN, REPEATED)
+
+    assert result["citation"]["case_number"] == "first"
+    assert result["defendant"]["first_name"] == "Ann"
+    assert [charge["charge_description"] for charge in result["charges"]] == [
+        "one",
+        "",
+        "",
+    ]
+
+
+def test_nested_repeats_are_listed_in_document_order():
+    result = assert_parity(CITATION_PLAN, NESTED_REPEATS)
+
+    assert result["charges"] == [
+        {"charge_code": "O1", "charge_description": "inner"},
+        {"charge_code": "", "charge_description": "inner"},
+    ]
+
+
+NESTED_PERSONS = citation(
+    "<nc:Person>"
+    "<nc:Person><nc:PersonName><nc:PersonGivenName>Inner</nc:PersonGivenName>"
+    "<nc:PersonSurName>Roe</nc:PersonSurName></nc:PersonName></nc:Person>"
+    "<nc:PersonName><nc:PersonGivenName>Outer</nc:PersonGivenName>"
+    "</nc:PersonName>"
+    "<nc:PersonSSNIdentification><nc:IdentificationID>123</nc:IdentificationID>"
+    "</nc:PersonSSNIdentification>"
+    "</nc:Person>"
+)
+
+
+def test_nested_persons_take_the_first_match_in_document_order():
+    result = assert_parity(CITATION_PLAN, NESTED_PERSONS)
+
+    # The inner person's name comes first in the document, though the path's
+    # `nc:Person` step first matches the outer person
+    assert result["defendant"]["first_name"] == "Inner"
+    assert result["defendant"]["last_name"] == "Roe"
+    assert result["defendant"]["ssn_id"] == "123"
+
+
+def test_repeat_lists_each_element_once():
+    path = ".//nc:Person//nc:PersonGivenName"
+    plan = ExtractionPlan({"names": Repeat(path, {})})
+    source = NESTED_PERSONS.encode("utf-8")
+
+    # `findall` yields the inner name once per enclosing `nc:Person`
+    assert len(ET.fromstring(source).findall(path, NAMESPACES)) == 3
+    assert plan.extract(source) == {"names": [{}, {}]}
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        citation(""),
+        citation("<j:Citation><nc:Date>2024-01-02</nc:Date></j:Citation>"),
+        citation(
+            "<j:Citation><nc:Date><nc:Date>inner</nc:Date>outer</nc:Date></j:Citation>"
+        ),
+    ],
+)
+def test_plan_matches_find_on_edge_cases(document):
+    assert_parity(CITATION_PLAN, document)
+
+
+def test_child_paths_only_match_direct_children():
+    plan = ExtractionPlan(
+        {"name": Field("nc:PersonName/nc:PersonGivenName")},
+    )
+    document = (
+        '<nc:Root xmlns:nc="http://niem.gov/niem/niem-core/2.0">'
+        "<nc:PersonName><nc:X><nc:PersonGivenName>deep</nc:PersonGivenName></nc:X>"
+        "<nc:PersonGivenName>direct</nc:PersonGivenName></nc:PersonName></nc:Root>"
+    )
+
+    assert assert_parity(plan, document) == {"name": "direct"}
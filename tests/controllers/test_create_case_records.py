@@ -0,0 +1,154 @@
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import event, insert, select
+
+from ekart_inventory_api.core.controllers.products.case_search import (
+    InProcessSearchBackend,
+)
+from ekart_inventory_api.core.controllers.products.product_management import (
+    CaseRecordsController,
+)
+from ekart_inventory_api.core.models.agency.agency import (
+    CaseChargeAssociation,
+    CaseRecord,
+    Charge,
+    DefendantContactDetails,
+    DefendantDetails,
+)
+from ekart_inventory_api.core.schemas.agency.case_records import CaseRecordCreate
+from ekart_inventory_api.utils.database.session_context_manager import (
+    session_context,
+)
+
+from ..conftest import TEST_AGENCY
+
+pytestmark = pytest.mark.usefixtures("request_context")
+
+
+@pytest.fixture
+def controller(async_engine):
+    return CaseRecordsController(
+        async_engine=async_engine,
+        agency=TEST_AGENCY,
+        s3_client=None,
+        search_backend=InProcessSearchBackend(),
+    )
+
+
+@pytest.fixture
+def statement_counter(async_engine):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+    yield statements
+    event.remove(async_engine.sync_engine, "before_cursor_execute", count)
+
+
+async def seed_charges(async_engine, count: int) -> list[int]:
+    async with session_context(async_engine, TEST_AGENCY) as session:
+        charge_ids = list(
+            await session.scalars(
+                insert(Charge)
+                .values(
+                    [
+                        {"charge_description": f"Round trip charge {number}"}
+                        for number in range(count)
+                    ]
+                )
+                .returning(Charge.id)
+            )
+        )
+        await session.commit()
+    return charge_ids
+
+
+def build_case(case_number: str, ssn_id: str, contacts: int, charge_ids) -> dict:
+    now = datetime.now(timezone.utc)
+    return {
+        "case_number": case_number,
+        "violation_date": date.today().isoformat(),
+        "violation_location": "Main Street",
+        "issue_datetime": now.isoformat(),
+        "all_charge_start": now.isoformat(),
+        "all_charge_end": now.isoformat(),
+        "charge_ids": charge_ids,
+        "defendant": {
+            "ssn_id": ssn_id,
+            "first_name": "Round",
+            "last_name": "Trip",
+            "contacts": [
+                {
+                    "address_delivery_point": f"{number} Elm Street",
+                    "mailing_address": f"{number} Elm Street",
+                    "location_city_name": "Springfield",
+                    "location_state_code": "IL",
+                    "location_postal_code": "62701",
+                    "phone_number": f"555-010{number}",
+                }
+                for number in range(contacts)
+            ],
+        },
+    }
+
+
+async def test_round_trips_do_not_grow_with_contacts_or_charges(
+    controller, async_engine, statement_counter
+):
+    charge_ids = await seed_charges(async_engine, 10)
+    suffix = datetime.now().strftime("%H%M%S%f")
+
+    statement_counter.clear()
+    await controller.create_case_records(
+        CaseRecordCreate(
+            **build_case(f"RT-S-{suffix}", f"S{suffix}", 1, charge_ids[:1])
+        )
+    )
+    small = len(statement_counter)
+
+    statement_counter.clear()
+    await controller.create_case_records(
+        CaseRecordCreate(**build_case(f"RT-L-{suffix}", f"L{suffix}", 5, charge_ids))
+    )
+    large = len(statement_counter)
+
+    # Charge check, defendant lookup and insert, contacts, case, charge links
+    # and the search document, one statement each however many rows they carry
+    assert (small, large) == (7, 7)
+
+
+async def test_created_case_reads_back_the_same_rows(controller, async_engine):
+    charge_ids = await seed_charges(async_engine, 3)
+    suffix = datetime.now().strftime("%H%M%S%f")
+    case = build_case(f"RT-R-{suffix}", f"R{suffix}", 2, charge_ids)
+
+    await controller.create_case_records(CaseRecordCreate(**case))
+
+    async with session_context(async_engine, TEST_AGENCY) as session:
+        record = await session.scalar(
+            select(CaseRecord).where(CaseRecord.case_number == case["case_number"])
+        )
+        assert record is not None
+        assert record.violation_location == case["violation_location"]
+
+        defendant = await session.get(DefendantDetails, record.defendant_id)
+        assert defendant.ssn_id == case["defendant"]["ssn_id"]
+
+        phone_numbers = await session.scalars(
+            select(DefendantContactDetails.phone_number).where(
+                DefendantContactDetails.defendant_id == defendant.id
+            )
+        )
+        assert sorted(phone_numbers) == sorted(
+            contact["phone_number"] for contact in case["defendant"]["contacts"]
+        )
+
+        associated = await session.scalars(
+            select(CaseChargeAssociation.charge_id).where(
+                CaseChargeAssociation.case_record_id == record.id
+            )
+        )
+        assert sorted(associated) == sorted(charge_ids)
@@ -0,0 +1,126 @@
+import base64
+import json
+from datetime import date, datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from ekart_inventory_api.core.controllers.products.case_search import (
+    InProcessSearchBackend,
+)
+from ekart_inventory_api.core.controllers.products.product_management import (
+    CaseRecordsController,
+    invalidate_count_cache,
+)
+from ekart_inventory_api.core.schemas.agency.case_records import CaseRecordCreate
+from ekart_inventory_api.core.schemas.products.case_search import CaseSearchQuery
+from ekart_inventory_api.utils.helper import decode_cursor, encode_cursor
+
+from ..conftest import TEST_AGENCY
+from .test_create_case_records import build_case, seed_charges
+
+pytestmark = pytest.mark.usefixtures("request_context")
+
+
+def test_cursor_round_trips_its_sort_key():
+    key = (date(2026, 1, 2), datetime(2026, 1, 2, 3, 4, tzinfo=timezone.utc), 7)
+
+    assert decode_cursor(encode_cursor(*key)) == key
+
+
+def test_cursor_refuses_null_sort_keys():
+    with pytest.raises(ValueError):
+        encode_cursor(None, datetime.now(timezone.utc), 7)
+
+    cursor = base64.urlsafe_b64encode(json.dumps([None, None, 7]).encode()).decode()
+    with pytest.raises(HTTPException) as raised:
+        decode_cursor(cursor)
+    assert raised.value.status_code == 400
+
+
+@pytest.fixture
+def controller(async_engine):
+    return CaseRecordsController(
+        async_engine=async_engine,
+        agency=TEST_AGENCY,
+        s3_client=None,
+        search_backend=InProcessSearchBackend(),
+    )
+
+
+async def test_cursor_pages_cover_every_case_once(controller, async_engine):
+    charge_ids = await seed_charges(async_engine, 1)
+    suffix = datetime.now().strftime("%H%M%S%f")
+    location = f"Cursor Street {suffix}"
+    case_numbers = []
+    for number in range(5):
+        case = build_case(f"CP-{number}-{suffix}", f"C{number}{suffix}", 1, charge_ids)
+        case["violation_location"] = location
+        case_numbers.append(case["case_number"])
+        await controller.create_case_records(CaseRecordCreate(**case))
+
+    query = dict(
+        violation_location=location,
+        violation_start_date=date.today(),
+        violation_end_date=date.today(),
+        pagination="cursor",
+        num_of_records=2,
+    )
+    pages = []
+    cursor = None
+    while True:
+        page = await controller.search_case_records(
+            CaseSearchQuery(**query, cursor=cursor)
+        )
+        pages.append([row["case_number"] for row in page["result"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    # Same violation date, so the pages follow created_on, newest first
+    assert pages == [
+        case_numbers[4:2:-1],
+        case_numbers[2:0:-1],
+        case_numbers[:1],
+    ]
+
+
+def count_query(**filters) -> CaseSearchQuery:
+    return CaseSearchQuery(
+        violation_start_date=date(2026, 1, 1),
+        violation_end_date=date(2026, 1, 31),
+        **filters,
+    )
+
+
+async def test_counts_are_retired_by_a_write():
+    controller = CaseRecordsController(None, TEST_AGENCY, None, None)
+    counts = iter([3, 4])
+
+    async def fetch_total_records(session, filters):
+        return next(counts)
+
+    controller.fetch_total_records = fetch_total_records
+
+    assert await controller.count_records(None, count_query(), []) == (3, True)
+    assert await controller.count_records(None, count_query(), []) == (3, True)
+
+    invalidate_count_cache(TEST_AGENCY)
+
+    assert await controller.count_records(None, count_query(), []) == (4, True)
+
+
+async def test_a_count_raced_by_a_write_is_not_cached():
+    controller = CaseRecordsController(None, TEST_AGENCY, None, None)
+    counts = iter([5, 6])
+
+    async def fetch_total_records(session, filters):
+        # A write commits while the count runs
+        invalidate_count_cache(TEST_AGENCY)
+        return next(counts)
+
+    controller.fetch_total_records = fetch_total_records
+    query = count_query(case_number="raced")
+
+    assert await controller.count_records(None, query, []) == (5, True)
+    assert await controller.count_records(None, query, []) == (6, True)
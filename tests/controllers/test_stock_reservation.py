@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+
+from ekart_inventory_api.core.controllers.products import stock_reservation
+from ekart_inventory_api.core.controllers.products.stock_reservation import (
+    RESERVATION_USER,
+    ReservationStatus,
+    StockReservationController,
+    allocate_stock,
+)
+from ekart_inventory_api.core.models.products.products import (
+    Category,
+    ProductInventory,
+)
+from ekart_inventory_api.utils.database.session_context_manager import (
+    session_context,
+)
+
+from ..conftest import TEST_AGENCY
+
+
+def test_denied_requests_take_no_stock():
+    stock = {1: 5, 2: 1}
+
+    granted = allocate_stock([(1, 6), (1, 2), (3, 1), (1, 3), (2, 1), (1, 1)], stock)
+
+    assert granted == [False, True, None, True, True, False]
+    assert stock == {1: 0, 2: 0}
+
+
+async def test_shard_is_refused_while_sharding_is_disabled(monkeypatch):
+    monkeypatch.setattr(stock_reservation, "settings", {"STOCK_SHARDING": False})
+    controller = StockReservationController(None, TEST_AGENCY)
+
+    with pytest.raises(HTTPException) as raised:
+        await controller.shard(1, 4)
+
+    assert raised.value.status_code == 409
+
+
+@pytest.fixture
+async def product(async_engine, request_context):
+    async def seed(quantity: int) -> int:
+        async with session_context(async_engine, TEST_AGENCY) as session:
+            category_id = await session.scalar(
+                insert(Category)
+                .values(name=f"Reservation load {id(session)}")
+                .returning(Category.id)
+            )
+            product_id = await session.scalar(
+                insert(ProductInventory)
+                .values(
+                    product_name="Contended product",
+                    quantity=quantity,
+                    category_id=category_id,
+                )
+                .returning(ProductInventory.id)
+            )
+            await session.commit()
+        return product_id
+
+    return seed
+
+
+async def read_product(async_engine, product_id: int):
+    async with session_context(async_engine, TEST_AGENCY) as session:
+        result = await session.execute(
+            select(ProductInventory.quantity, ProductInventory.modified_by).where(
+                ProductInventory.id == product_id
+            )
+        )
+        return result.one()
+
+
+@pytest.mark.usefixtures("request_context")
+async def test_oversized_request_does_not_block_later_ones(async_engine, product):
+    product_id = await product(5)
+    controller = StockReservationController(async_engine, TEST_AGENCY)
+
+    outcomes = await controller.reserve_many(
+        [(product_id, 6), (product_id, 2), (product_id, 3)]
+    )
+
+    assert [outcome["status"] for outcome in outcomes] == [
+        ReservationStatus.INSUFFICIENT_STOCK,
+        ReservationStatus.RESERVED,
+        ReservationStatus.RESERVED,
+    ]
+    assert (await read_product(async_engine, product_id)).quantity == 0
+
+
+@pytest.mark.usefixtures("request_context")
+async def test_concurrent_reservations_never_oversell(async_engine, product):
+    stock, buyers = 100, 400
+    product_id = await product(stock)
+    controller = StockReservationController(async_engine, TEST_AGENCY)
+
+    try:
+        outcomes = await asyncio.gather(
+            *(
+                controller.reserve(product_id, 1 if buyer % 10 else 1000)
+                for buyer in range(buyers)
+            )
+        )
+    finally:
+        stock_reservation.shutdown_stock_reservations()
+
+    reserved = [o for o in outcomes if o["status"] == ReservationStatus.RESERVED]
+    assert len(reserved) == stock
+    assert all(o["quantity"] == 1 for o in reserved)
+    row = await read_product(async_engine, product_id)
+    assert row.quantity == 0
+    # Batches are shared by many requests, so none of them is the writer
+    assert row.modified_by == RESERVATION_USER
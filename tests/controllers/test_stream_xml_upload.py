@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from starlette_context import context
+
+from ekart_inventory_api.core.controllers.products import product_management
+from ekart_inventory_api.core.controllers.products.product_management import (
+    CaseRecordsController,
+)
+from ekart_inventory_api.utils.aws import s3
+from ekart_inventory_api.utils.aws.s3 import MultipartUpload
+
+from ..conftest import TEST_AGENCY
+
+PART_SIZE = 64
+
+DOCUMENT = (
+    b'<jsi:Citation xmlns:jsi="http://www.justicesystems.com/iepd" '
+    b'xmlns:j="http://niem.gov/niem/domains/jxdm/4.0" '
+    b'xmlns:nc="http://niem.gov/niem/niem-core/2.0">'
+    b"<j:Citation><nc:ActivityIdentification>"
+    b"<nc:IdentificationID>CN-42</nc:IdentificationID>"
+    b"</nc:ActivityIdentification></j:Citation>"
+    + b"<nc:Note>padding</nc:Note>" * 20
+    + b"</jsi:Citation>"
+)
+
+
+class FakeS3Client:
+    _service_model = SimpleNamespace(service_name="s3")
+
+    def __init__(self, fail_part: bool = False, fail_abort: bool = False) -> None:
+        self.fail_part = fail_part
+        self.fail_abort = fail_abort
+        self.parts: list[bytes] = []
+        self.calls: list[str] = []
+
+    async def create_multipart_upload(self, **params):
+        self.calls.append("create")
+        self.key = params["Key"]
+        return {"UploadId": "upload-1"}
+
+    async def upload_part(self, **params):
+        self.calls.append("part")
+        if self.fail_part:
+            raise ConnectionError("connection reset")
+        self.parts.append(params["Body"])
+        return {"ETag": f"etag-{params['PartNumber']}"}
+
+    async def complete_multipart_upload(self, **params):
+        self.calls.append("complete")
+        assert [part["PartNumber"] for part in params["MultipartUpload"]["Parts"]] == [
+            number + 1 for number in range(len(self.parts))
+        ]
+
+    async def abort_multipart_upload(self, **params):
+        self.calls.append("abort")
+        if self.fail_abort:
+            raise ConnectionError("connection reset")
+
+    async def put_object(self, **params):
+        self.calls.append("put")
+
+
+@pytest.fixture
+def small_parts(monkeypatch, request_context):
+    monkeypatch.setattr(MultipartUpload, "MIN_PART_SIZE", PART_SIZE)
+    monkeypatch.setattr(product_management, "settings", {})
+    monkeypatch.setattr(s3, "settings", SimpleNamespace(S3_BUCKET="bucket"))
+    context["config"] = {
+        "S3_connection": {"tenant_id": TEST_AGENCY, "integration": "citations"}
+    }
+
+
+async def chunks_of(document: bytes, size: int):
+    for offset in range(0, len(document), size):
+        yield document[offset : offset + size]
+
+
+def controller_for(s3_client) -> CaseRecordsController:
+    return CaseRecordsController(
+        async_engine=None, agency=TEST_AGENCY, s3_client=s3_client, search_backend=None
+    )
+
+
+@pytest.mark.usefixtures("small_parts")
+async def test_bodies_over_one_part_are_sent_in_parts():
+    s3_client = FakeS3Client()
+
+    result = await controller_for(s3_client).stream_xml_to_s3(
+        chunks_of(DOCUMENT, 16), "citation.xml", "2026-10-17"
+    )
+
+    assert result["case_number"] == "CN-42"
+    assert result["size"] == len(DOCUMENT)
+    assert s3_client.calls[0] == "create" and s3_client.calls[-1] == "complete"
+    assert b"".join(s3_client.parts) == DOCUMENT
+    assert all(len(part) >= PART_SIZE for part in s3_client.parts[:-1])
+    assert s3_client.key.endswith("Case/XML/2026-10-17/CN-42.xml")
+
+
+@pytest.mark.usefixtures("small_parts")
+async def test_a_failed_abort_keeps_the_upload_error():
+    s3_client = FakeS3Client(fail_part=True, fail_abort=True)
+
+    with pytest.raises(HTTPException) as raised:
+        await controller_for(s3_client).stream_xml_to_s3(
+            chunks_of(DOCUMENT, 16), "citation.xml", "2026-10-17"
+        )
+
+    assert "Failed to upload part" in raised.value.detail
+    assert s3_client.calls[-1] == "abort"
@@ -0,0 +1,57 @@
+import asyncio
+
+from sqlalchemy import func, select
+
+from ekart_inventory_api.core.controllers.tenant_cache import (
+    CacheInvalidationListener,
+    CacheKinds,
+    TenantCache,
+)
+
+from ..conftest import TEST_AGENCY
+
+
+async def test_invalidation_during_a_load_keeps_cached_roles(monkeypatch):
+    cache = TenantCache(maxsize=10)
+    cache.entries[CacheKinds.PERMISSIONS][(TEST_AGENCY, "clerk")] = frozenset(
+        {("read", "cases")}
+    )
+
+    async def load_permissions(agency, async_engine, roles):
+        # A notification lands while the query is in flight
+        cache.invalidate(CacheKinds.PERMISSIONS, agency=TEST_AGENCY)
+        return {"viewer": frozenset({("read", "charges")})}
+
+    monkeypatch.setattr(cache, "load_permissions", load_permissions)
+
+    permissions = await cache.get_permissions(
+        TEST_AGENCY, ["clerk", "viewer"], async_engine=None
+    )
+
+    assert permissions == {("read", "cases"), ("read", "charges")}
+    # Loaded before the invalidation, so neither result is kept
+    assert not cache.entries[CacheKinds.PERMISSIONS]
+    assert not cache.combinations
+
+
+async def test_reconnect_discards_the_dropped_connection(async_engine):
+    cache = TenantCache(maxsize=10)
+    listener = CacheInvalidationListener(cache, async_engine)
+    await listener.start()
+    dropped = listener.connection
+    raw_connection = await dropped.get_raw_connection()
+    pid = raw_connection.driver_connection.get_server_pid()
+    try:
+        async with async_engine.connect() as connection:
+            await connection.execute(select(func.pg_terminate_backend(pid)))
+        for _ in range(50):
+            if listener.connection not in (None, dropped):
+                break
+            await asyncio.sleep(0.1)
+
+        assert listener.connection not in (None, dropped)
+        assert dropped.invalidated or dropped.closed
+        # Only the replacement stays checked out of the pool
+        assert async_engine.pool.checkedout() == 1
+    finally:
+        await listener.stop()
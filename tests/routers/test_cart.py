@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+import pytest
+
+from ekart_inventory_api.core.controllers.products import cart_store
+from ekart_inventory_api.core.controllers.products.cart_store import CartController
+from ekart_inventory_api.core.controllers.products.checkout import CheckoutController
+from ekart_inventory_api.routers.products import _cart_router
+from ekart_inventory_api.utils.auth.auth_token_decoder import auth
+from ekart_inventory_api.utils.database.connections import get_async_engine
+
+OWNER_ID = 7
+
+
+class FakeCartController:
+    async def get_cart(self, user_id: int) -> dict:
+        return {"user_id": user_id, "items": []}
+
+    async def add_item(self, user_id: int, product_id: int, quantity: int) -> dict:
+        return {"user_id": user_id, "items": []}
+
+    async def set_item(self, user_id: int, product_id: int, quantity: int) -> dict:
+        return {"user_id": user_id, "items": []}
+
+
+class FakeCheckoutController:
+    async def checkout(self, user_id: int, idempotency_key: str) -> dict:
+        return {"user_id": user_id, "orders": []}
+
+
+@pytest.fixture
+def client(make_client, monkeypatch):
+    async def lookup_user_id(async_engine, agency, user_name):
+        return OWNER_ID if user_name == "owner" else None
+
+    monkeypatch.setattr(cart_store, "lookup_user_id", lookup_user_id)
+    return make_client(
+        _cart_router,
+        {
+            CartController: FakeCartController,
+            CheckoutController: FakeCheckoutController,
+            auth: lambda: SimpleNamespace(user_name="owner"),
+            get_async_engine: lambda: None,
+        },
+    )
+
+
+ITEM = {"product_id": 1, "quantity": 2}
+
+
+@pytest.mark.parametrize(
+    "method, path, body",
+    [
+        ("get", "/v1/cart/{}", None),
+        ("post", "/v1/cart/{}/items", ITEM),
+        ("put", "/v1/cart/{}/items", ITEM),
+    ],
+)
+def test_cart_routes_only_serve_the_callers_cart(client, method, path, body):
+    own = client.request(method, path.format(OWNER_ID), json=body)
+    other = client.request(method, path.format(OWNER_ID + 1), json=body)
+
+    assert own.status_code == 200
+    assert own.json()["user_id"] == OWNER_ID
+    assert other.status_code == 403
+
+
+def test_checkout_only_places_the_callers_cart(client):
+    headers = {"Idempotency-Key": "key-1"}
+
+    own = client.post(f"/v1/cart/{OWNER_ID}/checkout", headers=headers)
+    other = client.post(f"/v1/cart/{OWNER_ID + 1}/checkout", headers=headers)
+
+    assert own.status_code == 200
+    assert other.status_code == 403
@@ -0,0 +1,76 @@
+import pytest
+
+from ekart_inventory_api.core.controllers.products.product_management import (
+    CaseRecordsController,
+)
+from ekart_inventory_api.core.schemas.products.case_search import CaseSearchQuery
+from ekart_inventory_api.routers.products import _case_router
+
+DATES = {"violation_start_date": "2024-01-01", "violation_end_date": "2024-12-31"}
+
+
+class FakeCaseRecordsController:
+    queries: list[CaseSearchQuery] = []
+
+    async def search_case_records(self, query: CaseSearchQuery) -> dict:
+        self.queries.append(query)
+        return {"result": []}
+
+
+@pytest.fixture
+def client(make_client):
+    FakeCaseRecordsController.queries = []
+    return make_client(_case_router, {CaseRecordsController: FakeCaseRecordsController})
+
+
+def test_search_defaults_to_page_mode(client):
+    response = client.get("/v1/product_management/cases", params=DATES)
+
+    assert response.status_code == 200
+    (query,) = FakeCaseRecordsController.queries
+    assert query.pagination == "page"
+    assert query.page == 1
+    assert query.include_total is False
+    assert query.count_strategy == "exact"
+
+
+def test_search_passes_cursor_options(client):
+    params = {
+        **DATES,
+        "pagination": "cursor",
+        "cursor": "abc",
+        "include_total": "true",
+        "count_strategy": "capped",
+        "num_of_records": 25,
+    }
+    response = client.get("/v1/product_management/cases", params=params)
+
+    assert response.status_code == 200
+    (query,) = FakeCaseRecordsController.queries
+    assert query.pagination == "cursor"
+    assert query.cursor == "abc"
+    assert query.include_total is True
+    assert query.count_strategy == "capped"
+    assert query.num_of_records == 25
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"pagination": "offset"},
+        {"count_strategy": "guess"},
+        {"page": 0},
+        {"num_of_records": 0},
+    ],
+)
+def test_search_rejects_invalid_options(client, params):
+    response = client.get("/v1/product_management/cases", params={**DATES, **params})
+
+    assert response.status_code == 422
+    assert FakeCaseRecordsController.queries == []
+
+
+def test_search_requires_violation_dates(client):
+    response = client.get("/v1/product_management/cases")
+
+    assert response.status_code == 422
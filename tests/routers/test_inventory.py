@@ -0,0 +1,70 @@
+import pytest
+from fastapi import Request
+
+from ekart_inventory_api.core.controllers.manage_cache_dependency import (
+    manage_request_state,
+)
+from ekart_inventory_api.core.controllers.products.stock_reservation import (
+    StockReservationController,
+)
+from ekart_inventory_api.core.schemas.products.stock_reservation import (
+    MAX_BULK_RESERVATIONS,
+)
+from ekart_inventory_api.routers.products import INVENTORY_ADMIN, _inventory_router
+
+
+class FakeStockReservationController:
+    async def shard(self, product_id: int, shards: int | None) -> dict:
+        return {"product_id": product_id, "shards": shards}
+
+    async def unshard(self, product_id: int) -> dict:
+        return {"product_id": product_id}
+
+
+def client_with(make_client, permissions):
+    def set_permissions(request: Request):
+        request.state.permissions = frozenset(permissions)
+
+    return make_client(
+        _inventory_router,
+        {
+            StockReservationController: FakeStockReservationController,
+            manage_request_state: set_permissions,
+        },
+    )
+
+
+@pytest.mark.parametrize("method", ["post", "delete"])
+def test_sharding_requires_inventory_admin(make_client, method):
+    path = "/v1/inventory/stock/1/shards"
+
+    denied = client_with(make_client, [("read", "inventory")])
+    assert denied.request(method, path).status_code == 403
+
+    allowed = client_with(make_client, INVENTORY_ADMIN)
+    response = allowed.request(method, path)
+    assert response.status_code == 200
+    assert response.json()["product_id"] == 1
+
+
+class FakeBulkController:
+    async def reserve_many(self, requests) -> list:
+        return ["reserved"] * len(requests)
+
+
+def test_bulk_reservation_is_capped(make_client):
+    client = make_client(
+        _inventory_router, {StockReservationController: FakeBulkController}
+    )
+    entry = {"product_id": 1, "quantity": 1}
+
+    full = client.post(
+        "/v1/inventory/stock/reserve/bulk", json=[entry] * MAX_BULK_RESERVATIONS
+    )
+    assert full.status_code == 200
+
+    over = client.post(
+        "/v1/inventory/stock/reserve/bulk",
+        json=[entry] * (MAX_BULK_RESERVATIONS + 1),
+    )
+    assert over.status_code == 422
@@ -0,0 +1,44 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from ekart_inventory_api.routers import metrics
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(metrics.metrics_router)
+    return TestClient(app)
+
+
+def test_metrics_are_hidden_without_a_configured_token(client, monkeypatch):
+    monkeypatch.setattr(metrics, "settings", {})
+
+    response = client.get(
+        "/metrics/tenant-cache", headers={"Authorization": "Bearer anything"}
+    )
+
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [{}, {"Authorization": "Bearer wrong"}, {"Authorization": "secret"}],
+)
+def test_metrics_require_the_token(client, monkeypatch, headers):
+    monkeypatch.setattr(metrics, "settings", {"METRICS_TOKEN": "secret"})
+
+    for path in ("aws-clients", "db-pool", "tenant-cache", "cart-store"):
+        assert client.get(f"/metrics/{path}", headers=headers).status_code == 401
+
+
+def test_metrics_are_served_with_the_token(client, monkeypatch):
+    monkeypatch.setattr(metrics, "settings", {"METRICS_TOKEN": "secret"})
+
+    response = client.get(
+        "/metrics/tenant-cache", headers={"Authorization": "Bearer secret"}
+    )
+
+    assert response.status_code == 200
+    assert set(response.json()) == {"permissions"}
@@ -0,0 +1,39 @@
+import enum
+import json
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from ekart_inventory_api.utils.responses import FastJSONResponse
+
+
+class Status(enum.Enum):
+    ACTIVE = "active"
+
+
+class Level(int, enum.Enum):
+    HIGH = 3
+
+
+def test_renders_what_the_default_response_renders():
+    content = {
+        "price": Decimal("19.99"),
+        "quantity": Decimal("3"),
+        "status": Status.ACTIVE,
+        "level": Level.HIGH,
+        "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "created_on": datetime(2026, 1, 2, 3, 4, 5, 600, tzinfo=timezone.utc),
+        "violation_date": date(2026, 1, 2),
+        "hearing_time": time(9, 30),
+        "window": timedelta(minutes=5),
+        "tags": {"a"},
+        "nested": [{"price": Decimal("0.5"), "name": "Süß"}],
+        "missing": None,
+    }
+
+    expected = JSONResponse(jsonable_encoder(content)).body
+
+    assert json.loads(FastJSONResponse(content).body) == json.loads(expected)